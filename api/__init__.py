@@ -0,0 +1,7 @@
+"""
+API HTTP de solo lectura (JSON) para otras herramientas internas
+Usa solo config, db y models: nunca importa PyQt6
+
+Uso:
+    python -m cli serve --port 8080
+"""
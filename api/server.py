@@ -0,0 +1,268 @@
+"""
+API HTTP de solo lectura sobre los repositorios (JSON)
+Servidor de la biblioteca estándar con un pool fijo de hilos; cada hilo
+reutiliza su conexión a la base (DatabaseConfig.use_thread_connection).
+    
+    GET /companies[?after=ID&limit=N]
+    GET /companies/ID
+    GET /companies/ID/employees[?after=ID&limit=N]
+    GET /employees[?after=ID&limit=N&company=ID&position=P&domain=D&since=AAAA-MM-DD&until=AAAA-MM-DD]
+    GET /employees/ID
+
+Los listados se paginan por clave (ID): la respuesta trae "next", el
+valor de after para la página siguiente (null en la última). Las
+respuestas llevan un ETag fuerte calculado con la versión de cada fila
+(ChangeRepository.versions): con If-None-Match igual se responde 304 sin
+serializar ni enviar nada. Con Accept-Encoding: gzip se comprimen.
+"""
+import gzip
+import hashlib
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from config.database import DatabaseConfig
+from config.metrics import API_REQUEST_SECONDS
+from db.repository import ChangeRepository, CompanyRepository, EmployeeRepository, SegmentRepository
+from models.segment import Segment, is_date
+
+# Tamaño de página por defecto y máximo
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Por debajo de este tamaño comprimir no compensa
+MIN_GZIP_BYTES = 1024
+
+# Sufijo del ETag de la representación comprimida (cada codificación tiene el suyo)
+GZIP_ETAG_SUFFIX = "-gz"
+
+# Filtros de /employees -> campo de Segment
+EMPLOYEE_FILTERS = {"company": "company_ids", "position": "positions", "domain": "domains"}
+
+_ROUTES = [
+    ("companies", re.compile(r"^/companies/?$")),
+    ("company", re.compile(r"^/companies/(\d+)/?$")),
+    ("company_employees", re.compile(r"^/companies/(\d+)/employees/?$")),
+    ("employees", re.compile(r"^/employees/?$")),
+    ("employee", re.compile(r"^/employees/(\d+)/?$")),
+]
+
+
+class ApiError(Exception):
+    """Error que se responde con un código HTTP y un JSON {"error": mensaje}"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _int_param(params: Dict[str, List[str]], name: str, default: Optional[int] = None) -> Optional[int]:
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        return int(values[-1])
+    except ValueError:
+        raise ApiError(400, f"{name} debe ser un número entero")
+
+
+def _date_param(params: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = params.get(name)
+    if not values:
+        return None
+    if not is_date(values[-1]):
+        raise ApiError(400, f"{name} debe ser una fecha AAAA-MM-DD")
+    return values[-1]
+
+
+def _page_params(params: Dict[str, List[str]]) -> Tuple[int, int]:
+    """(after, limit) de un listado"""
+    after = _int_param(params, "after", 0)
+    limit = _int_param(params, "limit", DEFAULT_LIMIT)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(400, f"limit debe estar entre 1 y {MAX_LIMIT}")
+    return after, limit
+
+
+def _etag(entity: str, key: str, row_ids: List[int]) -> str:
+    """
+    ETag fuerte de una respuesta: cambia si cambia alguna de sus filas
+    
+    Se calcula con la consulta (key), los IDs devueltos y la versión de
+    cada uno; un alta o una baja cambia los IDs de la página y una
+    modificación, la versión de la fila.
+    """
+    horizon, versions = ChangeRepository.versions(entity, row_ids)
+    digest = hashlib.sha1(f"{entity}|{key}|{horizon}".encode("utf-8"))
+    for row_id in row_ids:
+        digest.update(f"|{row_id}:{versions.get(row_id, 0)}".encode("ascii"))
+    return digest.hexdigest()[:32]
+
+
+def _matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match coincide con el ETag (en cualquiera de sus codificaciones)"""
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        candidate = candidate.removeprefix("W/").strip('"').removesuffix(GZIP_ETAG_SUFFIX)
+        if candidate == etag:
+            return True
+    return False
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Atiende un pedido (HTTP/1.0: una conexión por pedido, así no retiene un hilo del pool)"""
+    
+    server_version = "EmpresasAPI/1.0"
+    
+    def do_GET(self):
+        url = urlsplit(self.path)
+        route = "?"
+        start = time.perf_counter()
+        try:
+            route, args = self._route(url.path)
+            params = parse_qs(url.query)
+            # Filas y versiones de la misma instantánea: una escritura entre
+            # las dos lecturas daría un ETag de datos más nuevos que el cuerpo
+            with DatabaseConfig.read_snapshot():
+                entity, key, row_ids, build = getattr(self, f"_get_{route}")(*args, params)
+                etag = _etag(entity, key, row_ids)
+            if _matches(self.headers.get("If-None-Match"), etag):
+                self._send(304, None, etag)
+            else:
+                self._send(200, build(), etag)
+        except ApiError as e:
+            self._send(e.status, {"error": str(e)})
+        except Exception as e:
+            print(f"⚠ API {self.path}: {e}", file=sys.stderr)
+            self._send(500, {"error": "Error interno"})
+        finally:
+            API_REQUEST_SECONDS.observe(time.perf_counter() - start, route=route)
+    
+    def _route(self, path: str) -> Tuple[str, tuple]:
+        for name, pattern in _ROUTES:
+            match = pattern.match(path)
+            if match:
+                return name, tuple(int(group) for group in match.groups())
+        raise ApiError(404, f"No existe {path}")
+    
+    # ---- Rutas: cada una retorna (entidad, clave de la consulta, IDs, función que arma el cuerpo)
+    
+    def _get_companies(self, params):
+        after, limit = _page_params(params)
+        companies = CompanyRepository.read_page((after, after), limit, sort="id")
+        key = f"after={after}&limit={limit}"
+        return "company", key, [c.id for c in companies], lambda: _page_body(companies, limit)
+    
+    def _get_company(self, company_id: int, params):
+        company = CompanyRepository.read(company_id)
+        if company is None:
+            raise ApiError(404, f"No existe la empresa {company_id}")
+        return "company", "company", [company.id], company.to_dict
+    
+    def _get_company_employees(self, company_id: int, params):
+        after, limit = _page_params(params)
+        if CompanyRepository.read(company_id) is None:
+            raise ApiError(404, f"No existe la empresa {company_id}")
+        employees = EmployeeRepository.read_page_by_company(company_id, (after, after), limit, sort="id")
+        key = f"company={company_id}&after={after}&limit={limit}"
+        return "employee", key, [e.id for e in employees], lambda: _page_body(employees, limit)
+    
+    def _get_employees(self, params):
+        after, limit = _page_params(params)
+        segment = Segment(
+            created_from=_date_param(params, "since"),
+            created_to=_date_param(params, "until")
+        )
+        for name, attribute in EMPLOYEE_FILTERS.items():
+            setattr(segment, attribute, params.get(name, []))
+        try:
+            segment.company_ids = [int(value) for value in segment.company_ids]
+        except ValueError:
+            raise ApiError(400, "company debe ser un ID")
+        employees = SegmentRepository.read_page(segment, after, limit)
+        key = json.dumps([segment.to_dict(), after, limit], sort_keys=True)
+        return "employee", key, [e.id for e in employees], lambda: _page_body(employees, limit)
+    
+    def _get_employee(self, employee_id: int, params):
+        employee = EmployeeRepository.read(employee_id)
+        if employee is None:
+            raise ApiError(404, f"No existe el empleado {employee_id}")
+        return "employee", "employee", [employee.id], employee.to_dict
+    
+    # ---- Respuesta
+    
+    def _send(self, status: int, data, etag: Optional[str] = None):
+        body = b""
+        encoding = None
+        if data is not None:
+            body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            if len(body) >= MIN_GZIP_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body, compresslevel=5)
+                encoding = "gzip"
+        elif status == 304 and "gzip" in self.headers.get("Accept-Encoding", ""):
+            encoding = "gzip"
+        
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", f'"{etag}{GZIP_ETAG_SUFFIX if encoding else ""}"')
+            self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def _page_body(items: list, limit: int) -> dict:
+    """Cuerpo de un listado: las filas y el after de la página siguiente"""
+    return {
+        "items": [item.to_dict() for item in items],
+        "next": items[-1].id if len(items) == limit else None,
+    }
+
+
+class ApiServer(HTTPServer):
+    """
+    HTTPServer con un pool fijo de hilos
+    
+    A diferencia de ThreadingHTTPServer (un hilo nuevo por pedido), los
+    hilos duran lo que el servidor y cada uno conserva su conexión a la
+    base entre pedidos.
+    """
+    
+    def __init__(self, address: Tuple[str, int], workers: int = 8):
+        super().__init__(address, ApiHandler)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="api",
+            initializer=DatabaseConfig.use_thread_connection
+        )
+    
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process, request, client_address)
+    
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+    
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
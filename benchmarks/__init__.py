@@ -0,0 +1,7 @@
+"""
+Suite de benchmarks reproducibles
+
+Uso:
+    python -m benchmarks run --output base.json
+    python -m benchmarks compare base.json nuevo.json
+"""
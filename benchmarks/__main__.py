@@ -0,0 +1,104 @@
+"""
+Línea de comandos de los benchmarks
+    
+    python -m benchmarks run [--companies N] [--employees M] [--storage dict] [--output archivo.json]
+    python -m benchmarks compare base.json nuevo.json [--threshold 0.20]
+    python -m benchmarks archive-size [--messages 100000] [--template-file F] [--output archivo.json]
+"""
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.compare import compare
+from benchmarks.suite import Settings, run
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    run_parser = commands.add_parser("run", help="Genera datos de prueba y mide")
+    run_parser.add_argument("--companies", type=int, default=Settings.companies)
+    run_parser.add_argument("--employees", type=int, default=Settings.employees_per_company,
+                            help="Empleados por empresa")
+    run_parser.add_argument("--seed", type=int, default=Settings.seed)
+    run_parser.add_argument("--repeat", type=int, default=Settings.repeat)
+    run_parser.add_argument("--batch", type=int, default=Settings.batch)
+    run_parser.add_argument("--db", type=Path, help="Base de datos de prueba (por defecto temporal)")
+    run_parser.add_argument("--storage", choices=["sqlite", "memory", "dict"], default=Settings.storage,
+                            help="Motor de almacenamiento a medir")
+    run_parser.add_argument("--only", nargs="*", help="Prefijos de casos a ejecutar")
+    run_parser.add_argument("--output", type=Path, help="Archivo JSON de resultados")
+    
+    compare_parser = commands.add_parser("compare", help="Compara dos corridas")
+    compare_parser.add_argument("base", type=Path)
+    compare_parser.add_argument("new", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=0.20,
+                                help="Aumento relativo tolerado de la mediana (0.20 = 20%%)")
+    
+    archive_parser = commands.add_parser(
+        "archive-size", help="Espacio del archivo de mensajes (template + variables vs texto completo)"
+    )
+    archive_parser.add_argument("--messages", type=int, default=100_000)
+    archive_parser.add_argument("--seed", type=int, default=Settings.seed)
+    archive_parser.add_argument("--template-file", type=Path,
+                                help="Template a archivar (por defecto el de la suite)")
+    archive_parser.add_argument("--db", type=Path, help="Base de datos de prueba (por defecto temporal)")
+    archive_parser.add_argument("--output", type=Path, help="Archivo JSON de resultados")
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == "archive-size":
+        from benchmarks.archive_size import measure
+        options = {"seed": args.seed}
+        if args.template_file:
+            options["template"] = args.template_file.read_text(encoding="utf-8")
+        with tempfile.TemporaryDirectory() as tmp:
+            report = measure(args.db or Path(tmp) / "archive.db", args.messages, **options)
+        print(
+            f"{report['messages']} mensajes: template + variables {report['archive_bytes'] / 1048576:.1f} MB, "
+            f"texto completo {report['full_body_bytes'] / 1048576:.1f} MB ({report['ratio']:.0%}); "
+            f"leer y renderizar {report['read_render_messages']}: {report['read_render_ms']:.1f} ms",
+            file=sys.stderr
+        )
+        output = json.dumps(report, indent=2)
+        if args.output:
+            args.output.write_text(output + "\n", encoding="utf-8")
+        else:
+            print(output)
+        return 0
+    
+    if args.command == "run":
+        settings = Settings(
+            args.companies, args.employees, args.seed, args.repeat, args.batch, args.storage
+        )
+        
+        def progress(name, result):
+            print(f"{name:<36} {result['median_ms']:>10.3f} ms (mediana de {result['repeat']})",
+                  file=sys.stderr)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = args.db or Path(tmp) / "benchmark.db"
+            report = run(db_path, settings, args.only, progress)
+        
+        output = json.dumps(report, indent=2)
+        if args.output:
+            args.output.write_text(output + "\n", encoding="utf-8")
+        else:
+            print(output)
+        return 0
+    
+    base = json.loads(args.base.read_text(encoding="utf-8"))
+    new = json.loads(args.new.read_text(encoding="utf-8"))
+    lines, regressions = compare(base, new, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regresión(es): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
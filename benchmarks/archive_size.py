@@ -0,0 +1,115 @@
+"""
+Tamaño del archivo de mensajes enviados
+Archiva los mismos mensajes de dos formas, template + variables
+(MessageArchiveRepository) y texto completo por mensaje, y compara el
+espacio de cada una (tablas más índices, con la tabla virtual dbstat).
+"""
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Union
+
+from benchmarks.generator import generate, use_database
+from benchmarks.suite import TEMPLATE
+from db.repository import CompanyRepository, EmployeeRepository, MessageArchiveRepository
+from services.message_archive import archive_messages, render
+from services.message_service import MessageService
+
+# Alternativa medida: el texto completo con las mismas columnas e índices que sent_messages
+FULL_BODY_SCHEMA = [
+    """
+    CREATE TABLE full_body_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        campaign_id INTEGER,
+        company_id INTEGER NOT NULL,
+        employee_id INTEGER,
+        email TEXT NOT NULL,
+        subject TEXT,
+        body TEXT NOT NULL,
+        sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX idx_full_body_messages_email ON full_body_messages(email)",
+    "CREATE INDEX idx_full_body_messages_campaign ON full_body_messages(campaign_id)",
+]
+ARCHIVE_OBJECTS = [
+    "sent_templates", "sqlite_autoindex_sent_templates_1", "sent_messages",
+    "idx_sent_messages_email", "idx_sent_messages_campaign",
+]
+FULL_BODY_OBJECTS = ["full_body_messages", "idx_full_body_messages_email", "idx_full_body_messages_campaign"]
+
+# Campaña a la que se asignan los mensajes de prueba
+CAMPAIGN_ID = 1
+
+
+def _size(conn: sqlite3.Connection, names: List[str]) -> int:
+    """Bytes de páginas ocupados por tablas e índices"""
+    placeholders = ", ".join("?" for _ in names)
+    row = conn.execute(f"SELECT SUM(pgsize) FROM dbstat WHERE name IN ({placeholders})", names).fetchone()
+    return row[0] or 0
+
+
+def measure(
+    db_path: Union[str, Path],
+    messages: int = 100_000,
+    employees_per_company: int = 50,
+    seed: int = 0,
+    render_sample: int = 1000,
+    template: str = TEMPLATE
+) -> dict:
+    """
+    Genera la base de prueba, archiva `messages` mensajes de las dos formas y mide
+    
+    El ahorro crece con el largo del template (el de la suite es corto).
+    
+    Returns:
+        Dict serializable a JSON con los bytes de cada forma y el costo de re-renderizar
+    """
+    companies = -(-messages // employees_per_company)
+    generate(db_path, companies, employees_per_company, seed)
+    
+    conn = sqlite3.connect(str(db_path))
+    for statement in FULL_BODY_SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    
+    count = 0
+    with use_database(db_path):
+        # read_all y no stream_all: un cursor abierto bloquearía las escrituras
+        for company in CompanyRepository.read_all():
+            if count >= messages:
+                break
+            employees = EmployeeRepository.read_by_company(company.id)[:messages - count]
+            subject = f"Mensaje de {company.name}"
+            rendered = MessageService.render_for_all_employees(template, employees, company.name)
+            archive_messages(template, subject, company, employees, rendered, list(rendered), CAMPAIGN_ID)
+            conn.executemany("""
+                INSERT INTO full_body_messages (campaign_id, company_id, employee_id, email, subject, body)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                (CAMPAIGN_ID, company.id, e.id, e.email, subject, rendered[e.email]) for e in employees
+            ))
+            conn.commit()
+            count += len(employees)
+        
+        # Costo de ver mensajes: leer una página y re-renderizarla
+        start = time.perf_counter()
+        page = MessageArchiveRepository.read_page(limit=render_sample)
+        for message in page:
+            render(message)
+        render_ms = (time.perf_counter() - start) * 1000
+    
+    conn.execute("VACUUM")
+    archive_bytes = _size(conn, ARCHIVE_OBJECTS)
+    full_body_bytes = _size(conn, FULL_BODY_OBJECTS)
+    conn.close()
+    
+    return {
+        "messages": count,
+        "template_chars": len(template),
+        "archive_bytes": archive_bytes,
+        "full_body_bytes": full_body_bytes,
+        "ratio": archive_bytes / full_body_bytes if full_body_bytes else 0.0,
+        "read_render_ms": render_ms,
+        "read_render_messages": len(page),
+    }
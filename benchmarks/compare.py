@@ -0,0 +1,49 @@
+"""
+Comparación de dos corridas de benchmark
+Marca como regresión los casos cuya mediana empeoró más que el umbral
+"""
+from typing import List, Tuple
+
+# Diferencias menores a esto (ms) se consideran ruido aunque superen el umbral
+NOISE_FLOOR_MS = 0.05
+
+
+def compare(base: dict, new: dict, threshold: float = 0.20) -> Tuple[List[str], List[str]]:
+    """
+    Compara las medianas de dos corridas
+    
+    Args:
+        base: Resultado de la corrida de referencia
+        new: Resultado de la corrida nueva
+        threshold: Aumento relativo tolerado (0.20 = 20%)
+    
+    Returns:
+        (líneas del reporte, nombres de los casos con regresión)
+    """
+    lines = [f"{'caso':<36} {'base ms':>10} {'nuevo ms':>10} {'cambio':>9}"]
+    regressions = []
+    
+    for name, new_result in new["results"].items():
+        base_result = base["results"].get(name)
+        if base_result is None:
+            lines.append(f"{name:<36} {'-':>10} {new_result['median_ms']:>10.3f} {'nuevo':>9}")
+            continue
+        
+        before = base_result["median_ms"]
+        after = new_result["median_ms"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold and after - before > NOISE_FLOOR_MS:
+            regressions.append(name)
+            flag = "  ⚠ REGRESIÓN"
+        lines.append(f"{name:<36} {before:>10.3f} {after:>10.3f} {change:>+8.1%}{flag}")
+    
+    for name in base["results"]:
+        if name not in new["results"]:
+            lines.append(f"{name:<36} {base['results'][name]['median_ms']:>10.3f} {'-':>10} {'quitado':>9}")
+    
+    sizes = ("companies", "employees_per_company")
+    if any(base["meta"].get(key) != new["meta"].get(key) for key in sizes):
+        lines.append("\nAtención: las corridas usan tamaños de datos distintos")
+    
+    return lines, regressions
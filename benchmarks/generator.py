@@ -0,0 +1,112 @@
+"""
+Generador determinista de datos sintéticos
+Crea N empresas × M empleados en una base de datos de prueba
+"""
+import random
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Union
+
+from config import database
+
+FIRST_NAMES = [
+    "Ana", "Bruno", "Carla", "Diego", "Elena", "Federico", "Gabriela", "Hugo",
+    "Inés", "Javier", "Lucía", "Martín", "Natalia", "Óscar", "Paula", "Ramiro",
+    "Sofía", "Tomás", "Valeria", "Zoe",
+]
+LAST_NAMES = [
+    "Álvarez", "Benítez", "Castro", "Domínguez", "Fernández", "García", "Herrera",
+    "Ibáñez", "López", "Martínez", "Núñez", "Ortiz", "Pérez", "Quiroga", "Ruiz",
+    "Sánchez", "Torres", "Vega",
+]
+POSITIONS = [
+    "Gerente", "Analista", "Desarrollador", "Diseñadora", "Contador", "Vendedor",
+    "Soporte", "Recursos Humanos", None,
+]
+
+
+@contextmanager
+def use_database(path: Union[str, Path]):
+    """Apunta DatabaseConfig (y con él los repositorios) a otra base de datos"""
+    previous = database.DB_PATH
+    database.DB_PATH = Path(path)
+    try:
+        yield
+    finally:
+        database.DB_PATH = previous
+
+
+def generate(
+    path: Union[str, Path],
+    companies: int,
+    employees_per_company: int,
+    seed: int = 0
+) -> Path:
+    """
+    Crea (o reemplaza) una base de datos con datos sintéticos
+    
+    La misma semilla y tamaños producen siempre el mismo contenido.
+    
+    Args:
+        path: Archivo de la base de datos de prueba
+        companies: Cantidad de empresas
+        employees_per_company: Empleados por empresa
+        seed: Semilla del generador
+    
+    Returns:
+        Ruta de la base de datos creada
+    """
+    path = Path(path)
+    if path.exists():
+        path.unlink()
+    
+    with use_database(path):
+        database.DatabaseConfig.init_database()
+    
+    rng = random.Random(seed)
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.executemany(
+            "INSERT INTO companies (id, name, email, phone, address) VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    c,
+                    f"Empresa {c:05d}",
+                    f"contacto@empresa{c:05d}.com",
+                    f"+54 11 {rng.randint(4000, 4999)}-{rng.randint(0, 9999):04d}",
+                    f"Calle {rng.randint(1, 999)} N° {rng.randint(1, 5000)}",
+                )
+                for c in range(1, companies + 1)
+            )
+        )
+        
+        def employees():
+            employee_id = 0
+            for company_id in range(1, companies + 1):
+                for _ in range(employees_per_company):
+                    employee_id += 1
+                    first_name = rng.choice(FIRST_NAMES)
+                    last_name = rng.choice(LAST_NAMES)
+                    phone = (
+                        f"+54 9 11 {rng.randint(1000, 9999)}-{rng.randint(0, 9999):04d}"
+                        if rng.random() < 0.8 else None
+                    )
+                    yield (
+                        employee_id, first_name, last_name,
+                        f"empleado{employee_id}@empresa{company_id:05d}.com",
+                        phone, company_id, rng.choice(POSITIONS),
+                        # Altas repartidas en los últimos ~2 años (sin consumir la semilla)
+                        f"-{employee_id % 720} days",
+                    )
+        
+        conn.executemany(
+            "INSERT INTO employees (id, first_name, last_name, email, phone, company_id, position, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, datetime('2025-01-01', ?))",
+            employees()
+        )
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return path
@@ -0,0 +1,87 @@
+"""
+Servidor SMTP local de prueba
+Acepta y descarta los mensajes (sin TLS ni autenticación)
+"""
+import socketserver
+import threading
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """Diálogo SMTP mínimo: lo justo para smtplib.SMTP.send_message"""
+    
+    def reply(self, line: str):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+    
+    def handle(self):
+        self.reply("220 sink ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            
+            if command == b"EHLO":
+                self.reply("250-sink")
+                self.reply("250 8BITMIME")
+            elif command == b"DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                for data_line in self.rfile:
+                    if data_line == b".\r\n":
+                        break
+                self.server.count()
+                self.reply("250 OK")
+            elif command == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class _SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SinkHandler)
+        self.lock = threading.Lock()
+        self.received = 0
+    
+    def count(self):
+        with self.lock:
+            self.received += 1
+
+
+class SMTPSink:
+    """
+    Servidor SMTP en 127.0.0.1 (puerto libre) que corre en un hilo
+    
+    Uso:
+        with SMTPSink() as sink:
+            smtplib.SMTP(sink.host, sink.port)
+    """
+    
+    def __init__(self):
+        self._server = _SinkServer()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+    
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+    
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+    
+    @property
+    def received(self) -> int:
+        """Cantidad de mensajes recibidos"""
+        return self._server.received
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
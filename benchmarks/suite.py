@@ -0,0 +1,240 @@
+"""
+Casos de benchmark y ejecución
+Mide repositorios, renderizado de mensajes, armado MIME (con y sin adjuntos) y envío SMTP
+"""
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.generator import generate, use_database
+from benchmarks.smtp_sink import SMTPSink
+from config.database import DatabaseConfig
+from db.repository import CompanyRepository, EmployeeRepository, SegmentRepository
+from db.storage import backend_from_url
+from models.employee import Employee
+from models.segment import Segment
+from services.attachments import Attachment
+from services.email_service import EmailConfig, EmailService
+from services.message_service import MessageService
+
+TEMPLATE = (
+    "Hola {nombre},\n\n"
+    "Te escribimos desde {empresa} para confirmar tus datos:\n"
+    "{nombre_completo} - {posicion}\n"
+    "Email: {email} / Teléfono: {telefono}\n\n"
+    "Saludos"
+)
+
+# Tamaños de los adjuntos de prueba (MB): el armado por mensaje no debería crecer con el tamaño
+ATTACHMENT_SIZES_MB = (1, 8)
+
+
+@dataclass
+class Case:
+    """Un caso de benchmark: fn() hace `ops` operaciones y se repite `repeat` veces"""
+    name: str
+    fn: Callable[[], object]
+    ops: int = 1
+    # Necesita SQL: se omite con el motor dict
+    sql_only: bool = False
+
+
+@dataclass
+class Settings:
+    """Parámetros de una corrida"""
+    companies: int = 200
+    employees_per_company: int = 50
+    seed: int = 0
+    repeat: int = 20
+    # Cantidad de lecturas/escrituras sueltas por repetición
+    batch: int = 100
+    # Motor de almacenamiento: sqlite (archivo), memory o dict (ver db/storage.py)
+    storage: str = "sqlite"
+
+
+def write_attachments(work_dir: Path, seed: int) -> Dict[int, Path]:
+    """Genera los archivos adjuntos de prueba (contenido determinista) -> {MB: ruta}"""
+    rng = random.Random(seed)
+    paths = {}
+    for size_mb in ATTACHMENT_SIZES_MB:
+        path = work_dir / f"benchmark-attachment-{size_mb}mb.bin"
+        path.write_bytes(rng.randbytes(size_mb * 1024 * 1024))
+        paths[size_mb] = path
+    return paths
+
+
+def build_cases(settings: Settings, sink: SMTPSink, work_dir: Path) -> List[Case]:
+    """Arma los casos sobre la base de datos de prueba ya generada (los adjuntos van en work_dir)"""
+    rng = random.Random(settings.seed)
+    company_ids = [rng.randint(1, settings.companies) for _ in range(settings.batch)]
+    total_employees = settings.companies * settings.employees_per_company
+    employee_ids = [rng.randint(1, total_employees) for _ in range(settings.batch)]
+    company_id = company_ids[0]
+    company = CompanyRepository.read(company_id)
+    employees = EmployeeRepository.read_by_company(company_id)
+    recipients = [e.email for e in employees]
+    messages = MessageService.render_for_all_employees(TEMPLATE, employees, company.name)
+    subject = f"Mensaje de {company.name}"
+    
+    email_service = EmailService(EmailConfig("gmail", "benchmark@example.com", ""))
+    # Audiencia entre empresas: una posición en un grupo de empresas, altas recientes
+    segment = Segment(company_ids=sorted(set(company_ids))[:20], positions=["Gerente"], created_from="2024-06-01")
+    
+    def read_companies():
+        for cid in company_ids:
+            CompanyRepository.read(cid)
+    
+    def read_employees():
+        for eid in employee_ids:
+            EmployeeRepository.read(eid)
+    
+    def employee_crud():
+        for i in range(settings.batch):
+            employee = Employee("Bench", "Mark", f"bench{i}@example.com", company_id)
+            employee.id = EmployeeRepository.create(employee)
+            employee.position = "Actualizado"
+            EmployeeRepository.update(employee)
+            EmployeeRepository.delete(employee.id)
+    
+    def build_messages():
+        for email in recipients:
+            email_service.build_message(email, recipients, subject, messages[email], company.name)
+    
+    # Codificados una vez; cada caso mide el armado y la serialización (los
+    # bytes que se envían) de todos los mensajes reutilizándolos
+    attachment_paths = write_attachments(work_dir, settings.seed)
+    attachments = {size_mb: Attachment.load(path) for size_mb, path in attachment_paths.items()}
+    
+    def build_messages_with(attachment: Attachment):
+        def build():
+            for email in recipients:
+                email_service.build_message(
+                    email, recipients, subject, messages[email], company.name,
+                    cc_others=False, attachments=[attachment]
+                ).as_bytes()
+        return build
+    
+    def send_emails():
+        import smtplib
+        email_service.connection = smtplib.SMTP(sink.host, sink.port)
+        try:
+            email_service.send_emails(recipients, subject, messages, company.name)
+        finally:
+            email_service.disconnect()
+    
+    return [
+        Case("company.read", read_companies, ops=settings.batch),
+        Case("company.read_all", CompanyRepository.read_all),
+        Case("company.read_page", lambda: CompanyRepository.read_page(None, 200)),
+        Case("employee.read", read_employees, ops=settings.batch),
+        Case("employee.read_by_company", lambda: EmployeeRepository.read_by_company(company_id)),
+        Case(
+            "employee.read_page_by_company",
+            lambda: EmployeeRepository.read_page_by_company(company_id, None, 200, sort="last_name")
+        ),
+        Case("employee.create_update_delete", employee_crud, ops=settings.batch),
+        Case("segment.count", lambda: SegmentRepository.count(segment), sql_only=True),
+        Case("segment.read_page", lambda: SegmentRepository.read_page(segment, None, 200), sql_only=True),
+        Case(
+            "message.render_for_all_employees",
+            lambda: MessageService.render_for_all_employees(TEMPLATE, employees, company.name),
+            ops=len(employees)
+        ),
+        Case("email.build_message", build_messages, ops=len(recipients)),
+        *[
+            Case(f"email.build_message.attach_{size_mb}mb", build_messages_with(attachment), ops=len(recipients))
+            for size_mb, attachment in attachments.items()
+        ],
+        Case(
+            f"attachment.load_{ATTACHMENT_SIZES_MB[-1]}mb",
+            lambda: Attachment.load(attachment_paths[ATTACHMENT_SIZES_MB[-1]])
+        ),
+        Case("email.send_emails", send_emails, ops=len(recipients)),
+    ]
+
+
+def time_case(case: Case, repeat: int) -> Dict[str, float]:
+    """Ejecuta un caso (una vez de calentamiento + repeat) y resume los tiempos en ms"""
+    case.fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case.fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    
+    return {
+        "ops": case.ops,
+        "repeat": repeat,
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "stdev_ms": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def run(
+    db_path: Path,
+    settings: Settings,
+    only: Optional[List[str]] = None,
+    progress: Optional[Callable[[str, Dict[str, float]], None]] = None
+) -> dict:
+    """
+    Genera la base de datos de prueba y ejecuta los casos
+    
+    Con settings.storage memory o dict los datos generados se copian al
+    motor en memoria antes de medir; los casos que necesitan SQL se omiten
+    con dict.
+    
+    Args:
+        db_path: Archivo de la base de datos de prueba (se reemplaza)
+        settings: Parámetros de la corrida
+        only: Prefijos de nombres de casos a ejecutar (None = todos)
+        progress: Se llama con (nombre, resultado) al terminar cada caso
+    
+    Returns:
+        Dict serializable a JSON con metadatos y resultados por caso
+    """
+    generate(db_path, settings.companies, settings.employees_per_company, settings.seed)
+    
+    backend = backend_from_url(settings.storage, allow_dict=True)
+    if hasattr(backend, "load"):
+        backend.load(db_path)
+    previous = DatabaseConfig.use_backend(backend)
+    
+    results = {}
+    try:
+        with use_database(db_path), SMTPSink() as sink:
+            for case in build_cases(settings, sink, db_path.parent):
+                if only and not any(case.name.startswith(prefix) for prefix in only):
+                    continue
+                if case.sql_only and not backend.uses_sql:
+                    continue
+                results[case.name] = time_case(case, settings.repeat)
+                if progress:
+                    progress(case.name, results[case.name])
+    finally:
+        DatabaseConfig.use_backend(previous)
+        backend.close()
+    
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "companies": settings.companies,
+            "employees_per_company": settings.employees_per_company,
+            "seed": settings.seed,
+            "repeat": settings.repeat,
+            "batch": settings.batch,
+            "storage": settings.storage,
+        },
+        "results": results,
+    }
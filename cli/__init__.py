@@ -0,0 +1,7 @@
+"""
+Línea de comandos sin interfaz gráfica (para cron, servidores y scripts)
+Usa solo config, db, models y services: nunca importa PyQt6
+
+Uso:
+    python -m cli --help
+"""
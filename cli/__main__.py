@@ -0,0 +1,234 @@
+"""
+Punto de entrada de la línea de comandos
+    
+    python -m cli [--db ARCHIVO] import companies|employees ARCHIVO.csv [--company EMPRESA]
+    python -m cli [--db ARCHIVO] export companies|employees [--company EMPRESA] [-o ARCHIVO[.gz]]
+    python -m cli [--db ARCHIVO] render --company EMPRESA (--template T | --template-file F | --text T)
+                                        [-o ARCHIVO[.gz]] [--format csv|jsonl] [--gzip]
+    python -m cli [--db ARCHIVO] send --company EMPRESA (--template ...) [--subject S] [--attach ARCHIVO]
+                                      [--cc] [--dry-run]
+    python -m cli [--db ARCHIVO] count [--company EMPRESA] [--position P] [--domain D]
+                                       [--since AAAA-MM-DD] [--until AAAA-MM-DD]
+
+Opciones globales: --metrics-port PUERTO (endpoint /metrics mientras corre)
+y --metrics-file ARCHIVO (métricas en formato Prometheus al terminar).
+EMPRESA es un ID o un nombre exacto; --company se puede repetir o reemplazar por --all.
+    python -m cli [--db ARCHIVO] schedule add --at 'AAAA-MM-DD HH:MM' [--company ...] (--template ...)
+                                              [--attach ARCHIVO]
+    python -m cli [--db ARCHIVO] schedule list | cancel ID | run
+    python -m cli [--db ARCHIVO] delete|archive --company EMPRESA
+    python -m cli [--db ARCHIVO] restore [ID ...]
+    python -m cli [--db ARCHIVO] maintenance [--purge-orphans]
+    python -m cli [--db ARCHIVO] changes [--since TOKEN | --token-file ARCHIVO] [--limit N] [-o ARCHIVO[.gz]]
+    python -m cli [--db ARCHIVO] changes --current | --prune-through TOKEN
+    python -m cli [--db ARCHIVO] sent [--email EMAIL] [--campaign ID] [--limit N] [--before ID]
+    python -m cli [--db ARCHIVO] bounces ingest BUZÓN ... [--batch-size N]
+    python -m cli [--db ARCHIVO] bounces list [--soft] | reset ID ...
+    python -m cli [--db ARCHIVO] serve [--host H] [--port PUERTO] [--workers N]
+
+count, render, send y schedule add aceptan los filtros de segmento --position, --domain, --since y --until
+(sin --company abarcan todas las empresas).
+Códigos de salida: 0 ok, 1 con filas/envíos fallidos, 2 uso inválido, 3 error SMTP.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from cli import commands
+from config import metrics
+
+
+def _add_audience_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--company", action="append", help="Empresa (ID o nombre); se puede repetir")
+    parser.add_argument("--all", action="store_true", help="Todas las empresas")
+    parser.add_argument("--position", action="append", help="Solo esta posición; se puede repetir")
+    parser.add_argument("--domain", action="append", help="Solo emails de este dominio; se puede repetir")
+    parser.add_argument("--since", metavar="AAAA-MM-DD", help="Solo empleados dados de alta desde esta fecha")
+    parser.add_argument("--until", metavar="AAAA-MM-DD", help="Solo empleados dados de alta hasta esta fecha")
+
+
+def _add_template_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--template", help="Template guardado (ID o nombre)")
+    parser.add_argument("--template-file", help="Archivo con el template")
+    parser.add_argument("--text", help="Template en línea")
+
+
+def _add_attachment_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--attach", action="append", metavar="ARCHIVO",
+                        help="Adjunto para todos los mensajes; se puede repetir")
+
+
+def _add_smtp_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--provider", choices=["gmail", "outlook"], help="Proveedor SMTP (o APP_SMTP_PROVIDER)")
+    parser.add_argument("--from", dest="sender", help="Email remitente (o APP_SMTP_EMAIL)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Gestor de empresas sin interfaz")
+    parser.add_argument("--db", type=Path, help="Base de datos a usar (por defecto database.db)")
+    parser.add_argument("--metrics-port", type=int, help="Expone las métricas en http://127.0.0.1:PUERTO/metrics")
+    parser.add_argument("--metrics-file", type=Path,
+                        help="Guarda las métricas al terminar (textfile collector de node_exporter)")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    
+    import_parser = subcommands.add_parser("import", help="Importa empresas o empleados desde CSV")
+    import_parser.add_argument("entity", choices=["companies", "employees"])
+    import_parser.add_argument("file", help="CSV con encabezado (name,email,phone,address | "
+                                            "first_name,last_name,email,phone,position[,company])")
+    import_parser.add_argument("--company", help="Empresa de todos los empleados importados")
+    import_parser.set_defaults(handler=commands.cmd_import)
+    
+    export_parser = subcommands.add_parser("export", help="Exporta empresas o empleados (CSV/JSONL)")
+    export_parser.add_argument("entity", choices=["companies", "employees"])
+    export_parser.add_argument("--company", help="Empresa (para employees)")
+    export_parser.add_argument("--chunk-size", type=int, default=1000, help="Filas por bloque")
+    export_parser.set_defaults(handler=commands.cmd_export)
+    
+    for name, help_text, handler in [
+        ("count", "Cuenta la audiencia por empresa", commands.cmd_count),
+        ("render", "Renderiza los mensajes (JSONL)", commands.cmd_render),
+        ("send", "Envía los mensajes por SMTP", commands.cmd_send),
+    ]:
+        sub = subcommands.add_parser(name, help=help_text)
+        _add_audience_arguments(sub)
+        sub.set_defaults(handler=handler)
+        if name == "count":
+            continue
+        _add_template_arguments(sub)
+        sub.add_argument("--chunk-size", type=int, default=500, help="Empleados por bloque")
+        if name == "render":
+            render_parser = sub
+        else:
+            sub.add_argument("--subject", help="Asunto (por defecto 'Mensaje de <empresa>')")
+            _add_attachment_arguments(sub)
+            _add_smtp_arguments(sub)
+            sub.add_argument("--cc", action="store_true",
+                             help="Poner al resto de la empresa en CC, como la interfaz")
+            sub.add_argument("--dry-run", action="store_true", help="Renderiza y cuenta sin enviar")
+    
+    schedule_parser = subcommands.add_parser("schedule", help="Campañas programadas")
+    schedule_actions = schedule_parser.add_subparsers(dest="action", required=True)
+    
+    add_parser = schedule_actions.add_parser("add", help="Programa una campaña")
+    add_parser.add_argument("--at", required=True, metavar="'AAAA-MM-DD HH:MM'", help="Fecha y hora local")
+    add_parser.add_argument("--name", help="Nombre de la campaña")
+    add_parser.add_argument("--subject", help="Asunto (por defecto 'Mensaje de <empresa>')")
+    _add_audience_arguments(add_parser)
+    _add_template_arguments(add_parser)
+    _add_attachment_arguments(add_parser)
+    add_parser.set_defaults(handler=commands.cmd_schedule_add)
+    
+    list_parser = schedule_actions.add_parser("list", help="Lista las campañas")
+    list_parser.set_defaults(handler=commands.cmd_schedule_list)
+    
+    cancel_parser = schedule_actions.add_parser("cancel", help="Cancela una campaña pendiente")
+    cancel_parser.add_argument("id", type=int)
+    cancel_parser.set_defaults(handler=commands.cmd_schedule_cancel)
+    
+    run_parser = schedule_actions.add_parser("run", help="Ejecuta las campañas al vencer (hasta Ctrl+C)")
+    _add_smtp_arguments(run_parser)
+    run_parser.add_argument("--chunk-size", type=int, default=500, help="Empleados por bloque")
+    run_parser.set_defaults(handler=commands.cmd_schedule_run)
+    
+    for name, help_text, handler in [
+        ("delete", "Elimina empresas y sus empleados", commands.cmd_delete),
+        ("archive", "Archiva empresas y sus empleados", commands.cmd_archive),
+    ]:
+        sub = subcommands.add_parser(name, help=help_text)
+        sub.add_argument("--company", action="append", required=True,
+                         help="Empresa (ID o nombre); se puede repetir")
+        sub.add_argument("--chunk-size", type=int, default=1000, help="Empleados por transacción")
+        sub.set_defaults(handler=handler)
+    
+    restore_parser = subcommands.add_parser("restore", help="Restaura empresas archivadas (sin IDs las lista)")
+    restore_parser.add_argument("ids", type=int, nargs="*")
+    restore_parser.add_argument("--chunk-size", type=int, default=1000, help="Empleados por transacción")
+    restore_parser.set_defaults(handler=commands.cmd_restore)
+    
+    maintenance_parser = subcommands.add_parser("maintenance", help="Vacuum incremental y PRAGMA optimize")
+    maintenance_parser.add_argument("--purge-orphans", action="store_true",
+                                    help="Borrar antes los empleados de empresas que ya no existen")
+    maintenance_parser.set_defaults(handler=commands.cmd_maintenance)
+    
+    changes_parser = subcommands.add_parser("changes", help="Cambios desde un token (JSONL) para sincronizar")
+    token_source = changes_parser.add_mutually_exclusive_group()
+    token_source.add_argument("--since", type=int, metavar="TOKEN", help="Token de la sincronización anterior")
+    token_source.add_argument("--token-file", help="Lee el token de este archivo y guarda el nuevo al terminar")
+    token_source.add_argument("--current", action="store_true",
+                              help="Solo muestra el token actual (antes de una exportación completa)")
+    token_source.add_argument("--prune-through", type=int, metavar="TOKEN",
+                              help="Borra los cambios hasta TOKEN (ya leídos por todos los sistemas)")
+    changes_parser.add_argument("--limit", type=int, default=1000, help="Cambios por lote")
+    changes_parser.add_argument("-o", "--output", help="Archivo de salida (por defecto stdout; .gz comprime)")
+    changes_parser.add_argument("--gzip", action="store_true", help="Comprimir la salida con gzip")
+    changes_parser.set_defaults(handler=commands.cmd_changes)
+    
+    sent_parser = subcommands.add_parser("sent", help="Mensajes enviados (JSONL, los más recientes primero)")
+    sent_parser.add_argument("--email", help="Solo los enviados a este email")
+    sent_parser.add_argument("--campaign", type=int, help="Solo los de esta campaña")
+    sent_parser.add_argument("--limit", type=int, default=20, help="Cantidad de mensajes")
+    sent_parser.add_argument("--before", type=int, metavar="ID", help="Solo los anteriores a este ID (paginar)")
+    sent_parser.set_defaults(handler=commands.cmd_sent)
+    
+    bounces_parser = subcommands.add_parser("bounces", help="Rebotes (avisos de no entrega)")
+    bounces_actions = bounces_parser.add_subparsers(dest="action", required=True)
+    
+    ingest_parser = bounces_actions.add_parser("ingest", help="Procesa buzones mbox o Maildir con rebotes")
+    ingest_parser.add_argument("paths", nargs="+", metavar="BUZÓN", help="Archivo mbox o directorio Maildir")
+    ingest_parser.add_argument("--batch-size", type=int, default=500, help="Mensajes por transacción")
+    ingest_parser.set_defaults(handler=commands.cmd_bounces_ingest)
+    
+    bounced_parser = bounces_actions.add_parser("list", help="Empleados con rebotes permanentes")
+    bounced_parser.add_argument("--soft", action="store_true", help="Los que tienen rebotes temporales")
+    bounced_parser.set_defaults(handler=commands.cmd_bounces_list)
+    
+    reset_parser = bounces_actions.add_parser("reset", help="Vuelve a habilitar empleados con rebotes")
+    reset_parser.add_argument("ids", type=int, nargs="+", metavar="ID")
+    reset_parser.set_defaults(handler=commands.cmd_bounces_reset)
+    
+    serve_parser = subcommands.add_parser("serve", help="API HTTP de solo lectura (JSON) hasta Ctrl+C")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Dirección (por defecto solo local)")
+    serve_parser.add_argument("--port", type=int, default=8080, help="Puerto")
+    serve_parser.add_argument("--workers", type=int, default=8, help="Hilos que atienden pedidos")
+    serve_parser.set_defaults(handler=commands.cmd_serve)
+    
+    for sub in [export_parser, render_parser]:
+        sub.add_argument("-o", "--output", help="Archivo de salida (por defecto stdout); "
+                                                "el formato sale de la extensión (.csv, .jsonl, .gz)")
+        sub.add_argument("--format", choices=["csv", "jsonl"], help="Formato de salida")
+        sub.add_argument("--gzip", action="store_true", help="Comprimir la salida con gzip")
+    
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    
+    from config import database
+    if args.db:
+        database.DB_PATH = args.db
+    try:
+        database.DatabaseConfig.init_database()
+    except ValueError as e:
+        # APP_STORAGE inválido o dict (sin SQL)
+        print(f"Error: {e}", file=sys.stderr)
+        return commands.EXIT_USAGE
+    if args.metrics_port is not None:
+        metrics.start_http_server(args.metrics_port)
+    
+    try:
+        return args.handler(args)
+    except commands.CommandError as e:
+        commands.progress_done()
+        print(f"Error: {e}", file=sys.stderr)
+        return e.exit_code
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return commands.EXIT_USAGE
+    finally:
+        if args.metrics_file:
+            args.metrics_file.write_text(metrics.registry.render(), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,593 @@
+"""
+Comandos de la línea de comandos: import, export, render y send
+Cada comando recibe los argumentos ya parseados y retorna el código de salida
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from db.repository import (
+    BounceRepository, CampaignRepository, ChangeRepository, CompanyRepository, EmployeeRepository,
+    MessageArchiveRepository, MessageTemplateRepository, SegmentRepository
+)
+from models.bounce import HARD_BOUNCE, SOFT_BOUNCE
+from models.campaign import Campaign, to_due_at
+from models.company import Company
+from models.employee import Employee
+from models.segment import Segment, is_date
+from services.attachments import Attachment, load_attachments
+from services.contact_validator import normalize_email
+from services.delivery import send_to_segment
+from services.email_service import EmailConfig, EmailService
+from services.export import (
+    detect_format, export_companies, export_employees, export_messages, open_export
+)
+from services.message_archive import render
+from services.message_service import MessageService
+
+# Códigos de salida
+EXIT_OK = 0
+EXIT_PARTIAL = 1      # Terminó, pero hubo filas o envíos con error
+EXIT_USAGE = 2        # Argumentos inválidos, empresa/template inexistente (igual que argparse)
+EXIT_SMTP = 3         # No se pudo conectar o autenticar con el servidor SMTP
+
+# Filas por transacción al importar
+IMPORT_BATCH = 500
+
+
+class CommandError(Exception):
+    """Error que termina el comando con un código de salida"""
+    
+    def __init__(self, message: str, exit_code: int = EXIT_USAGE):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+def progress(message: str):
+    """Informa el avance en stderr (en una sola línea si es una terminal)"""
+    if sys.stderr.isatty():
+        sys.stderr.write(f"\r\033[K{message}")
+    else:
+        sys.stderr.write(f"{message}\n")
+    sys.stderr.flush()
+
+
+def progress_done():
+    if sys.stderr.isatty():
+        sys.stderr.write("\n")
+
+
+@contextmanager
+def open_output(path: Optional[str], compress: bool = False) -> Iterator[TextIO]:
+    """Abre el archivo de salida, o stdout si no se indicó (o es '-')"""
+    if path and path != "-":
+        with open_export(path, compress) as out:
+            yield out
+        return
+    
+    if not compress:
+        yield sys.stdout
+        return
+    with io.TextIOWrapper(gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb"), encoding="utf-8",
+                          newline="") as out:
+        yield out
+
+
+def output_format(args, default: str) -> tuple:
+    """(formato, gzip) de --format/--gzip o, si falta, de la extensión de --output"""
+    fmt, compress = default, False
+    if args.output and args.output != "-":
+        try:
+            fmt, compress = detect_format(args.output)
+        except ValueError:
+            pass
+    return args.format or fmt, args.gzip or compress
+
+
+# ========== SELECTORES ==========
+
+def resolve_company(selector: str) -> Company:
+    """Busca una empresa por ID o por nombre exacto"""
+    company = None
+    if selector.isdigit():
+        company = CompanyRepository.read(int(selector))
+    if company is None:
+        company = CompanyRepository.read_by_name(selector)
+    if company is None:
+        raise CommandError(f"Empresa no encontrada: {selector}")
+    return company
+
+
+def resolve_companies(selectors: Optional[List[str]], all_companies: bool = False) -> List[Company]:
+    """Empresas indicadas con --company (se puede repetir) o todas con --all"""
+    if all_companies:
+        return CompanyRepository.read_all()
+    if not selectors:
+        raise CommandError("Indicar al menos una empresa con --company o usar --all")
+    return [resolve_company(selector) for selector in selectors]
+
+
+def resolve_audience(args) -> Tuple[List[Company], Optional[Segment]]:
+    """
+    Empresas a procesar y, si se usó algún filtro de segmento, el segmento
+    
+    Con --position/--domain/--since/--until la audiencia es un segmento
+    (sin --company abarca todas las empresas) y solo se recorren las
+    empresas que tienen empleados en él.
+    """
+    has_filters = args.position or args.domain or args.since or args.until
+    if not has_filters:
+        return resolve_companies(args.company, args.all), None
+    for option, value in (("--since", args.since), ("--until", args.until)):
+        if value and not is_date(value):
+            raise CommandError(f"{option} debe ser una fecha AAAA-MM-DD (ej: 2024-01-31): {value}", EXIT_USAGE)
+    
+    selected = [] if args.all or not args.company else resolve_companies(args.company)
+    segment = Segment(
+        company_ids=[company.id for company in selected],
+        positions=args.position or [],
+        domains=args.domain or [],
+        created_from=args.since,
+        created_to=args.until
+    )
+    return [company for company, _ in SegmentRepository.count_by_company(segment)], segment
+
+
+def resolve_template(args) -> str:
+    """Template indicado por --template (ID o nombre), --template-file o --text"""
+    if args.text is not None:
+        template = args.text
+    elif args.template_file:
+        template = Path(args.template_file).read_text(encoding="utf-8")
+    elif args.template:
+        templates = MessageTemplateRepository.read_all()
+        match = [t for t in templates if str(t[0]) == args.template or t[1] == args.template]
+        if not match:
+            raise CommandError(f"Template no encontrado: {args.template}")
+        template = match[0][2]
+    else:
+        raise CommandError("Indicar el mensaje con --template, --template-file o --text")
+    
+    valid, error = MessageService.validate_template(template)
+    if not valid:
+        raise CommandError(error)
+    return template
+
+
+def resolve_attachments(args) -> List[Attachment]:
+    """Adjuntos de --attach, leídos y codificados una vez para todo el envío"""
+    try:
+        return load_attachments(args.attach or [])
+    except ValueError as e:
+        raise CommandError(str(e))
+
+
+# ========== IMPORT ==========
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _clean(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip()
+    return value or None
+
+
+def cmd_import(args) -> int:
+    """Importa empresas o empleados desde un CSV con encabezado"""
+    with open(args.file, encoding="utf-8-sig", newline="") as source:
+        rows = csv.DictReader(source)
+        if args.entity == "companies":
+            created, skipped = _import_companies(rows)
+        else:
+            created, skipped = _import_employees(rows, args.company)
+    progress_done()
+    
+    print(f"Creados: {created} · Omitidos: {skipped}", file=sys.stderr)
+    return EXIT_PARTIAL if skipped else EXIT_OK
+
+
+def _import_companies(rows) -> tuple:
+    created = skipped = 0
+    for batch in _batches(rows, IMPORT_BATCH):
+        companies = [
+            Company(name=name, email=_clean(row.get("email")),
+                    phone=_clean(row.get("phone")), address=_clean(row.get("address")))
+            for row in batch if (name := _clean(row.get("name")))
+        ]
+        created_now = len(CompanyRepository.create_many(companies))
+        created += created_now
+        skipped += len(batch) - created_now
+        progress(f"Empresas: {created} creadas, {skipped} omitidas")
+    return created, skipped
+
+
+def _import_employees(rows, company_selector: Optional[str]) -> tuple:
+    """Empleados del CSV; la empresa sale de --company o de la columna company (se crea si falta)"""
+    default_company = resolve_company(company_selector) if company_selector else None
+    company_ids = {}
+    created = skipped = 0
+    
+    def company_id_for(row) -> Optional[int]:
+        if default_company is not None:
+            return default_company.id
+        name = _clean(row.get("company"))
+        if name is None:
+            return None
+        if name not in company_ids:
+            company = CompanyRepository.read_by_name(name)
+            company_ids[name] = company.id if company else CompanyRepository.create(Company(name=name))
+        return company_ids[name]
+    
+    for batch in _batches(rows, IMPORT_BATCH):
+        employees = []
+        for row in batch:
+            first_name = _clean(row.get("first_name"))
+            last_name = _clean(row.get("last_name"))
+            email = normalize_email(row.get("email") or "")
+            company_id = company_id_for(row)
+            if not (first_name and last_name and company_id) or not EmailService.validate_email(email):
+                continue
+            employees.append(Employee(
+                first_name=first_name, last_name=last_name, email=email,
+                company_id=company_id, phone=_clean(row.get("phone")),
+                position=_clean(row.get("position"))
+            ))
+        
+        created_now = len(EmployeeRepository.create_many(employees))
+        created += created_now
+        skipped += len(batch) - created_now
+        progress(f"Empleados: {created} creados, {skipped} omitidos")
+    return created, skipped
+
+
+# ========== EXPORT ==========
+
+def cmd_export(args) -> int:
+    """Exporta empresas o los empleados de una empresa (CSV o JSONL, con gzip opcional)"""
+    fmt, compress = output_format(args, "csv")
+    # Sin terminal solo queda el total final (el avance repetiría la misma cuenta)
+    on_progress = (lambda count: progress(f"Filas exportadas: {count}")) if sys.stderr.isatty() else None
+    
+    if args.entity == "companies":
+        export = lambda out: export_companies(out, fmt, args.chunk_size, on_progress)
+    else:
+        if not args.company:
+            raise CommandError("Indicar la empresa con --company")
+        company = resolve_company(args.company)
+        export = lambda out: export_employees(company.id, out, fmt, args.chunk_size, on_progress)
+    
+    with open_output(args.output, compress) as out:
+        count = export(out)
+    progress_done()
+    print(f"Filas exportadas: {count}", file=sys.stderr)
+    return EXIT_OK
+
+
+# ========== RENDER ==========
+
+def cmd_render(args) -> int:
+    """Renderiza el template para cada empleado y escribe {company, email, message} (JSONL o CSV)"""
+    template = resolve_template(args)
+    companies, segment = resolve_audience(args)
+    fmt, compress = output_format(args, "jsonl")
+    on_progress = (lambda total: progress(f"Mensajes renderizados: {total}")) if sys.stderr.isatty() else None
+    
+    with open_output(args.output, compress) as out:
+        count = export_messages(template, companies, out, fmt, args.chunk_size, on_progress, segment)
+    progress_done()
+    print(f"Mensajes renderizados: {count}", file=sys.stderr)
+    return EXIT_OK
+
+
+# ========== COUNT ==========
+
+def cmd_count(args) -> int:
+    """Tamaño de la audiencia (por empresa y total) sin renderizar ni enviar"""
+    companies, segment = resolve_audience(args)
+    if segment is None:
+        segment = Segment(company_ids=[company.id for company in companies])
+    
+    total = 0
+    for company, count in SegmentRepository.count_by_company(segment):
+        print(f"{count}\t{company.name}")
+        total += count
+    print(f"Total: {total} empleados ({segment.describe()})", file=sys.stderr)
+    return EXIT_OK
+
+
+# ========== DELETE / ARCHIVE ==========
+
+def cmd_delete(args) -> int:
+    """Elimina empresas con sus empleados (por bloques)"""
+    companies = resolve_companies(args.company)
+    count = CompanyRepository.delete_many([c.id for c in companies], args.chunk_size)
+    print(f"Empresas eliminadas: {count}", file=sys.stderr)
+    return EXIT_OK
+
+
+def cmd_archive(args) -> int:
+    """Mueve empresas y sus empleados a las tablas de archivo"""
+    companies = resolve_companies(args.company)
+    count = CompanyRepository.archive_many([c.id for c in companies], args.chunk_size)
+    for company in companies:
+        print(f"{company.id}\t{company.name}")
+    print(f"Empresas archivadas: {count}", file=sys.stderr)
+    return EXIT_OK
+
+
+def cmd_restore(args) -> int:
+    """Devuelve empresas archivadas a las tablas activas (sin IDs: lista las archivadas)"""
+    if not args.ids:
+        for company in CompanyRepository.read_archived():
+            print(f"{company.id}\t{company.name}")
+        return EXIT_OK
+    for company_id in args.ids:
+        if not CompanyRepository.restore(company_id, args.chunk_size):
+            raise CommandError(f"La empresa {company_id} no está archivada")
+        print(f"Empresa {company_id} restaurada", file=sys.stderr)
+    return EXIT_OK
+
+
+def cmd_maintenance(args) -> int:
+    """Vacuum incremental y PRAGMA optimize (y huérfanos con --purge-orphans)"""
+    from services.maintenance import MaintenanceTask
+    report = MaintenanceTask().run_once(purge_orphans=args.purge_orphans)
+    print(report.summary(), file=sys.stderr)
+    return EXIT_OK
+
+
+# ========== CHANGES ==========
+
+def cmd_changes(args) -> int:
+    """
+    Escribe en JSONL los cambios posteriores a un token, lote por lote
+    
+    El token de partida sale de --since o de --token-file; al terminar
+    se guarda el nuevo en --token-file (si se indicó) y se informa en stderr.
+    """
+    if args.prune_through is not None:
+        count = ChangeRepository.prune(args.prune_through)
+        print(f"Cambios borrados: {count}", file=sys.stderr)
+        return EXIT_OK
+    if args.current:
+        print(ChangeRepository.current_token())
+        return EXIT_OK
+    
+    token_file = Path(args.token_file) if args.token_file else None
+    token = args.since
+    if token is None and token_file is not None and token_file.exists():
+        try:
+            token = int(token_file.read_text(encoding="utf-8").strip() or 0)
+        except ValueError:
+            raise CommandError(f"Token inválido en {token_file}")
+    token = token or 0
+    
+    # Hasta los cambios existentes al empezar (los siguientes quedan para la próxima vez)
+    until = ChangeRepository.current_token()
+    count = 0
+    compress = args.gzip or bool(args.output and args.output.endswith(".gz"))
+    with open_output(args.output, compress) as out:
+        while token < until:
+            try:
+                changes, token = ChangeRepository.changes_since(token, args.limit)
+            except ValueError as e:
+                raise CommandError(str(e))
+            out.write("".join(
+                json.dumps(change.to_dict(), ensure_ascii=False) + "\n" for change in changes
+            ))
+            count += len(changes)
+            progress(f"Cambios: {count}")
+    progress_done()
+    
+    if token_file is not None:
+        partial = token_file.with_name(token_file.name + ".tmp")
+        partial.write_text(f"{token}\n", encoding="utf-8")
+        partial.replace(token_file)
+    print(f"Cambios: {count}, token: {token}", file=sys.stderr)
+    return EXIT_OK
+
+
+# ========== SENT ==========
+
+def cmd_sent(args) -> int:
+    """Mensajes enviados (los más recientes primero) en JSONL, re-renderizados desde el archivo"""
+    messages = MessageArchiveRepository.read_page(
+        args.before, args.limit, email=args.email, campaign_id=args.campaign
+    )
+    for message in messages:
+        print(json.dumps({
+            "id": message.id,
+            "sent_at": message.sent_at,
+            "campaign_id": message.campaign_id,
+            "email": message.email,
+            "subject": message.subject,
+            "message": render(message)
+        }, ensure_ascii=False))
+    print(f"Mensajes: {len(messages)}", file=sys.stderr)
+    return EXIT_OK
+
+
+# ========== BOUNCES ==========
+
+def cmd_bounces_ingest(args) -> int:
+    """Marca el estado de entrega de los empleados según los rebotes de los buzones"""
+    from services.bounces import BounceProcessor
+    processor = BounceProcessor(batch_size=args.batch_size)
+    for path in args.paths:
+        report = processor.ingest(path)
+        print(f"{path}:\n{report.summary()}", file=sys.stderr)
+    return EXIT_OK
+
+
+def cmd_bounces_list(args) -> int:
+    """Empleados con rebotes (ID, email, fecha y detalle del último), por bloques"""
+    kind = SOFT_BOUNCE if args.soft else HARD_BOUNCE
+    count = 0
+    after_id = 0
+    while True:
+        page = BounceRepository.read_bounced(kind, after_id)
+        if not page:
+            break
+        for employee, bounced_at, detail in page:
+            print("\t".join([str(employee.id), employee.email, bounced_at or "", detail or ""]))
+        count += len(page)
+        after_id = page[-1][0].id
+    print(f"Empleados: {count}", file=sys.stderr)
+    return EXIT_OK
+
+
+def cmd_bounces_reset(args) -> int:
+    """Vuelve a habilitar el envío a empleados marcados por rebotes"""
+    count = BounceRepository.reset(args.ids)
+    print(f"Empleados habilitados: {count}", file=sys.stderr)
+    return EXIT_OK
+
+
+# ========== SERVE ==========
+
+def cmd_serve(args) -> int:
+    """Atiende la API HTTP de solo lectura hasta Ctrl+C"""
+    from api.server import ApiServer
+    server = ApiServer((args.host, args.port), args.workers)
+    print(f"API en http://{args.host}:{server.server_port}/ ({args.workers} hilos). Ctrl+C para salir",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return EXIT_OK
+
+
+# ========== SCHEDULE ==========
+
+def cmd_schedule_add(args) -> int:
+    """Programa una campaña para el segmento indicado"""
+    try:
+        when = datetime.strptime(args.at, "%Y-%m-%d %H:%M")
+    except ValueError:
+        raise CommandError(f"Fecha inválida: {args.at} (usar 'AAAA-MM-DD HH:MM')")
+    template = resolve_template(args)
+    companies, segment = resolve_audience(args)
+    if segment is None:
+        segment = Segment(company_ids=[] if args.all else [company.id for company in companies])
+    # Se validan ahora; el programador los vuelve a leer al enviar
+    attachments = resolve_attachments(args)
+    
+    campaign = Campaign(
+        name=args.name or f"Campaña {args.at}",
+        template=template,
+        segment=segment,
+        due_at=to_due_at(when),
+        subject=args.subject,
+        attachments=[attachment.path for attachment in attachments]
+    )
+    campaign_id = CampaignRepository.create(campaign)
+    print(campaign_id)
+    print(
+        f"Campaña {campaign_id} programada para {campaign.local_due_at()} "
+        f"({SegmentRepository.count(segment)} empleados hoy)",
+        file=sys.stderr
+    )
+    return EXIT_OK
+
+
+def cmd_schedule_list(args) -> int:
+    """Lista las campañas (más recientes primero)"""
+    for campaign in CampaignRepository.read_all():
+        print("\t".join(str(value) for value in [
+            campaign.id, campaign.local_due_at(), campaign.status, campaign.sent,
+            campaign.failed, campaign.excluded, campaign.name, campaign.error or ""
+        ]))
+    return EXIT_OK
+
+
+def cmd_schedule_cancel(args) -> int:
+    """Cancela una campaña pendiente"""
+    if not CampaignRepository.cancel(args.id):
+        raise CommandError(f"La campaña {args.id} no existe o ya no está pendiente")
+    print(f"Campaña {args.id} cancelada", file=sys.stderr)
+    return EXIT_OK
+
+
+def cmd_schedule_run(args) -> int:
+    """Ejecuta las campañas al vencer, hasta Ctrl+C (credenciales por entorno)"""
+    from services.scheduler import CampaignScheduler
+    config = _email_config(args)
+    scheduler = CampaignScheduler(lambda: config, chunk_size=args.chunk_size)
+    scheduler.start()
+    
+    pending = len(CampaignRepository.read_pending())
+    print(f"Programador iniciado: {pending} campaña(s) pendiente(s). Ctrl+C para salir", file=sys.stderr)
+    try:
+        scheduler.join()
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return EXIT_OK
+
+
+# ========== SEND ==========
+
+def _email_config(args) -> EmailConfig:
+    """Credenciales SMTP: argumentos o variables de entorno (la contraseña solo por entorno)"""
+    provider = args.provider or os.environ.get("APP_SMTP_PROVIDER", "gmail")
+    sender = args.sender or os.environ.get("APP_SMTP_EMAIL")
+    password = os.environ.get("APP_SMTP_PASSWORD")
+    if not (sender and password):
+        raise CommandError("Definir --from (o APP_SMTP_EMAIL) y APP_SMTP_PASSWORD")
+    return EmailConfig(provider=provider, email=sender, password=password)
+
+
+def cmd_send(args) -> int:
+    """
+    Envía el template a los empleados de las empresas indicadas
+    
+    Sin --cc cada empleado recibe solo su mensaje y la audiencia se procesa
+    por bloques. Con --cc (como la interfaz) cada mensaje lleva al resto de
+    la empresa en CC, por lo que la empresa se envía en un único bloque.
+    """
+    template = resolve_template(args)
+    companies, segment = resolve_audience(args)
+    if segment is None:
+        segment = Segment(company_ids=[] if args.all else [company.id for company in companies])
+    attachments = resolve_attachments(args)
+    
+    service = None
+    if not args.dry_run:
+        service = EmailService(_email_config(args))
+        success, message = service.connect()
+        if not success:
+            raise CommandError(message, EXIT_SMTP)
+    
+    try:
+        result = send_to_segment(
+            service, template, segment, args.subject, args.chunk_size,
+            on_progress=lambda totals, company: progress(
+                f"{company.name}: {totals.sent} enviados, {totals.failed} fallidos, {totals.excluded} excluidos"
+            ),
+            attachments=attachments, cc=args.cc, dry_run=args.dry_run
+        )
+    finally:
+        if service is not None:
+            service.disconnect()
+    progress_done()
+    
+    verb = "Se enviarían" if args.dry_run else "Enviados"
+    print(f"{verb}: {result.sent} · Fallidos: {result.failed} · Excluidos: {result.excluded}", file=sys.stderr)
+    return EXIT_PARTIAL if result.failed else EXIT_OK
@@ -1,30 +1,228 @@
 """
 Configuración de base de datos SQLite3
 """
+import functools
 import sqlite3
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Optional, Tuple
+
+from db.events import INSERTED, UPDATED, DELETED
+from db.query_log import query_log, InstrumentedConnection
+from db.storage import SQLiteBackend, StorageBackend, backend_from_url
 
 # Ruta de la base de datos
 DB_PATH = Path(__file__).parent.parent / "database.db"
 
+# Versión del schema guardada en PRAGMA user_version
+# (incrementarla al cambiar las tablas o índices de init_database)
+SCHEMA_VERSION = 14
+
+# Entidades con registro de cambios (tabla changes) -> tabla
+CHANGE_TABLES = {
+    "company": "companies",
+    "employee": "employees",
+    "template": "message_templates",
+}
+
+
+# Tabla de Empleados. Las columnas generadas (STORED, con índice) evitan
+# lower()/substr() sobre toda la tabla en búsquedas por email y dominio
+EMPLOYEES_TABLE = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email TEXT NOT NULL UNIQUE,
+        phone TEXT,
+        company_id INTEGER NOT NULL,
+        position TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        email_norm TEXT GENERATED ALWAYS AS (lower(trim(email))) STORED,
+        domain TEXT GENERATED ALWAYS AS (substr(email_norm, instr(email_norm, '@') + 1)) STORED,
+        full_name TEXT GENERATED ALWAYS AS (trim(first_name || ' ' || last_name)) STORED,
+        deliverability TEXT,
+        soft_bounces INTEGER NOT NULL DEFAULT 0,
+        bounced_at TIMESTAMP,
+        bounce_detail TEXT,
+        FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE
+    )
+"""
+EMPLOYEE_BASE_COLUMNS = "id, first_name, last_name, email, phone, company_id, position, created_at"
+
+# Estado de entrega (rebotes, ver BounceRepository): columnas agregadas a bases existentes
+EMPLOYEE_BOUNCE_COLUMNS = [
+    ("deliverability", "TEXT"),
+    ("soft_bounces", "INTEGER NOT NULL DEFAULT 0"),
+    ("bounced_at", "TIMESTAMP"),
+    ("bounce_detail", "TEXT"),
+]
+
+# Conexión reutilizada por los hilos que la pidieron (ver DatabaseConfig.use_thread_connection)
+_thread_connection = threading.local()
+
+
+@functools.lru_cache(maxsize=None)
+def _reusable(factory: type) -> type:
+    """Subclase de la conexión cuyo close() no la cierra (la reutiliza el mismo hilo)"""
+    
+    class ThreadConnection(factory):
+        def close(self):
+            # Igual que al cerrar: lo no confirmado se descarta (salvo dentro de read_snapshot)
+            if self.in_transaction and not getattr(_thread_connection, "snapshot", False):
+                self.rollback()
+        
+        def release(self):
+            super().close()
+    
+    return ThreadConnection
+
+
+def _rebuild_employees(conn: sqlite3.Connection):
+    """
+    Recrea employees con las columnas generadas (ALTER TABLE ADD COLUMN solo
+    admite columnas generadas VIRTUAL). Se apagan las foreign_keys durante
+    la copia: DROP TABLE borraría en cascada los contact_issues.
+    """
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        conn.execute("BEGIN")
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'employees'").fetchone()
+        conn.execute(EMPLOYEES_TABLE.format(name="employees_new"))
+        conn.execute(f"""
+            INSERT INTO employees_new ({EMPLOYEE_BASE_COLUMNS})
+            SELECT {EMPLOYEE_BASE_COLUMNS} FROM employees
+        """)
+        conn.execute("DROP TABLE employees")
+        conn.execute("ALTER TABLE employees_new RENAME TO employees")
+        if row:
+            # Conservar la secuencia de AUTOINCREMENT (no reutilizar IDs borrados)
+            conn.execute(
+                "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'employees'", (row[0],)
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+
+
+def _env_backend() -> Tuple[StorageBackend, Optional[str]]:
+    """Motor de APP_STORAGE y, si no es válido, el error (se informa en init_database, no al importar)"""
+    url = os.environ.get("APP_STORAGE", "sqlite")
+    try:
+        return backend_from_url(url), None
+    except ValueError as e:
+        return SQLiteBackend(), f"APP_STORAGE={url}: {e}"
+
 
 class DatabaseConfig:
     """Configuración y conexión a SQLite"""
     
+    # Motor activo (ver db/storage.py); APP_STORAGE lo elige al arrancar
+    backend, backend_error = _env_backend()
+    
+    @staticmethod
+    def use_backend(backend: StorageBackend) -> StorageBackend:
+        """Cambia el motor de almacenamiento, retorna el anterior"""
+        previous = DatabaseConfig.backend
+        DatabaseConfig.backend = backend
+        return previous
+    
     @staticmethod
     def get_connection():
-        """Obtiene conexión a BD"""
-        conn = sqlite3.connect(str(DB_PATH))
+        """Obtiene conexión a BD (instrumentada si query_log está activo)"""
+        factory = InstrumentedConnection if query_log.enabled else sqlite3.Connection
+        reuse = getattr(_thread_connection, "enabled", False)
+        if reuse:
+            key = (DB_PATH, DatabaseConfig.backend, factory)
+            conn = getattr(_thread_connection, "conn", None)
+            if conn is not None and _thread_connection.key == key:
+                return conn
+            DatabaseConfig.close_thread_connection()
+            factory = _reusable(factory)
+        
+        conn = DatabaseConfig.backend.connect(DB_PATH, factory)
         conn.row_factory = sqlite3.Row  # Permite acceder por nombre de columna
+        # Sin esto SQLite ignora las FOREIGN KEY (y sus ON DELETE CASCADE)
+        conn.execute("PRAGMA foreign_keys = ON")
+        if reuse:
+            _thread_connection.conn, _thread_connection.key = conn, key
         return conn
     
+    @staticmethod
+    def use_thread_connection():
+        """
+        Hace que get_connection() reutilice una conexión en el hilo actual
+        
+        Para hilos de un pool que atienden muchas consultas cortas (ver
+        api/server.py): se ahorra abrir la base y preparar la conexión en
+        cada llamada. close() de los repositorios descarta lo no confirmado
+        y deja la conexión abierta; se abre una nueva si cambia DB_PATH o el motor.
+        """
+        _thread_connection.enabled = True
+    
+    @staticmethod
+    @contextmanager
+    def read_snapshot():
+        """
+        Varias lecturas del hilo actual sobre una misma instantánea de la base
+        
+        Abre una transacción en la conexión reutilizada del hilo (requiere
+        use_thread_connection) y la mantiene entre los close() de los
+        repositorios: todas las consultas del bloque ven la base como estaba
+        en la primera. Solo para lecturas: al salir se descarta.
+        """
+        if not getattr(_thread_connection, "enabled", False):
+            raise RuntimeError("read_snapshot requiere use_thread_connection() en este hilo")
+        conn = DatabaseConfig.get_connection()
+        conn.execute("BEGIN")
+        _thread_connection.snapshot = True
+        try:
+            yield conn
+        finally:
+            _thread_connection.snapshot = False
+            conn.rollback()
+    
+    @staticmethod
+    def close_thread_connection():
+        """Cierra la conexión reutilizada por el hilo actual (si hay una)"""
+        conn = getattr(_thread_connection, "conn", None)
+        if conn is not None:
+            _thread_connection.conn = None
+            conn.release()
+    
     @staticmethod
     def init_database():
-        """Inicializa schema de BD si no existe"""
+        """
+        Inicializa schema de BD si no existe
+        
+        Raises:
+            ValueError: Si APP_STORAGE no es un motor válido para la aplicación
+        """
+        if DatabaseConfig.backend_error:
+            raise ValueError(DatabaseConfig.backend_error)
+        if not DatabaseConfig.backend.uses_sql:
+            return
         conn = DatabaseConfig.get_connection()
         cursor = conn.cursor()
         
+        # Schema al día: evitar repetir todo el DDL en cada arranque
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            conn.close()
+            return
+        
+        # El espacio de los borrados se devuelve de a poco (ver services/maintenance.py).
+        # En una base existente el cambio recién aplica después de un VACUUM completo
+        if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            cursor.execute("VACUUM")
+        
         # Tabla de Empresas
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS companies (
@@ -37,20 +235,95 @@ class DatabaseConfig:
             )
         """)
         
-        # Tabla de Empleados
+        # Tabla de Empleados (las bases anteriores a las columnas generadas se recrean)
+        cursor.execute(EMPLOYEES_TABLE.format(name="employees"))
+        columns = {row[1] for row in cursor.execute("PRAGMA table_xinfo(employees)")}
+        if "email_norm" not in columns:
+            _rebuild_employees(conn)
+            columns = {row[1] for row in cursor.execute("PRAGMA table_xinfo(employees)")}
+        for name, definition in EMPLOYEE_BOUNCE_COLUMNS:
+            if name not in columns:
+                cursor.execute(f"ALTER TABLE employees ADD COLUMN {name} {definition}")
+        # Un email nuevo no hereda los rebotes del anterior
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS employees (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            CREATE TRIGGER IF NOT EXISTS trg_employees_email_bounces
+            AFTER UPDATE OF email ON employees
+            WHEN OLD.email_norm IS NOT NEW.email_norm AND OLD.deliverability IS NOT NULL
+            BEGIN
+                UPDATE employees
+                SET deliverability = NULL, soft_bounces = 0, bounced_at = NULL, bounce_detail = NULL
+                WHERE id = NEW.id;
+            END
+        """)
+        # Solo las direcciones con rebotes (para listarlas)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_employees_deliverability
+            ON employees(deliverability, id) WHERE deliverability IS NOT NULL
+        """)
+        
+        # Índices para listar empleados por empresa paginando en cada orden
+        # (las expresiones IFNULL coinciden con EMPLOYEE_SORT_COLUMNS)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_employees_company_name
+            ON employees(company_id, first_name, id)
+        """)
+        for name, expr in [
+            ("company", "company_id"),
+            ("company_last_name", "company_id, last_name"),
+            ("company_email", "company_id, email"),
+            ("company_phone", "company_id, IFNULL(phone, '')"),
+            ("company_position", "company_id, IFNULL(position, '')"),
+        ]:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_employees_{name} ON employees({expr})")
+        
+        # Índices de los filtros de segmentos entre empresas
+        # (las expresiones coinciden con _segment_clauses en db/repository.py)
+        # y de las búsquedas por email normalizado y nombre completo
+        for name, expr in [
+            ("position", "IFNULL(position, '')"),
+            ("created_at", "created_at"),
+            ("domain", "domain"),
+            ("email_norm", "email_norm"),
+            ("full_name", "full_name"),
+        ]:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_employees_{name} ON employees({expr})")
+        
+        # Índices para ordenar empresas (name ya tiene el índice de UNIQUE)
+        for name, expr in [
+            ("email", "IFNULL(email, '')"),
+            ("phone", "IFNULL(phone, '')"),
+            ("address", "IFNULL(address, '')"),
+        ]:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_companies_{name} ON companies({expr})")
+        
+        # Empresas y empleados archivados (mismos IDs que tenían en las tablas activas)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS archived_companies (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                email TEXT,
+                phone TEXT,
+                address TEXT,
+                created_at TIMESTAMP,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS archived_employees (
+                id INTEGER PRIMARY KEY,
                 first_name TEXT NOT NULL,
                 last_name TEXT NOT NULL,
-                email TEXT NOT NULL UNIQUE,
+                email TEXT NOT NULL,
                 phone TEXT,
                 company_id INTEGER NOT NULL,
                 position TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE
+                created_at TIMESTAMP,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_archived_employees_company ON archived_employees(company_id, id)"
+        )
         
         # Tabla de Templates de Mensajes
         cursor.execute("""
@@ -62,6 +335,203 @@ class DatabaseConfig:
             )
         """)
         
+        # Tabla de problemas de contacto (resultado de la validación masiva)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS contact_issues (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                employee_id INTEGER NOT NULL,
+                email TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                detail TEXT,
+                detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (employee_id) REFERENCES employees(id) ON DELETE CASCADE
+            )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_contact_issues_email ON contact_issues(email, kind)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_contact_issues_employee ON contact_issues(employee_id)"
+        )
+        
+        # Campañas programadas (segment es el Segment en JSON, due_at en UTC)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scheduled_campaigns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                template TEXT NOT NULL,
+                subject TEXT,
+                segment TEXT NOT NULL,
+                due_at TIMESTAMP NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                sent INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                excluded INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                attachments TEXT
+            )
+        """)
+        # Rutas de los adjuntos en JSON (NULL = sin adjuntos)
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(scheduled_campaigns)")}
+        if "attachments" not in columns:
+            cursor.execute("ALTER TABLE scheduled_campaigns ADD COLUMN attachments TEXT")
+        # Programador que envía cada campaña en curso y su último latido (ver CampaignRepository.claim)
+        if "claimed_by" not in columns:
+            cursor.execute("ALTER TABLE scheduled_campaigns ADD COLUMN claimed_by TEXT")
+        if "heartbeat_at" not in columns:
+            cursor.execute("ALTER TABLE scheduled_campaigns ADD COLUMN heartbeat_at TIMESTAMP")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_scheduled_campaigns_status ON scheduled_campaigns(status, due_at)"
+        )
+        
+        # Registro de envíos: un destinatario por fila (sin FOREIGN KEY, sobrevive a los borrados)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS delivery_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                campaign_id INTEGER,
+                company_id INTEGER NOT NULL,
+                employee_id INTEGER,
+                email TEXT NOT NULL,
+                status TEXT NOT NULL,
+                sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_delivery_log_campaign ON delivery_log(campaign_id)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_delivery_log_employee ON delivery_log(employee_id)"
+        )
+        
+        # Resúmenes de delivery_log (los mantiene DeliveryRepository.record)
+        totals = """
+            sent INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            excluded INTEGER NOT NULL DEFAULT 0
+        """
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS delivery_stats_campaign (
+                campaign_id INTEGER PRIMARY KEY,
+                {totals}
+            )
+        """)
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS delivery_stats_company_day (
+                company_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                {totals},
+                PRIMARY KEY (company_id, day)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_delivery_stats_company_day_day ON delivery_stats_company_day(day)"
+        )
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS delivery_stats_day (
+                day TEXT PRIMARY KEY,
+                {totals}
+            ) WITHOUT ROWID
+        """)
+        
+        # Archivo de mensajes enviados: cada template (con su asunto y las variables
+        # comunes) una vez y, por mensaje, los valores de sus variables en JSON
+        # (ver MessageArchiveRepository)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sent_templates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                digest TEXT NOT NULL UNIQUE,
+                subject TEXT,
+                template TEXT NOT NULL,
+                variable_names TEXT NOT NULL,
+                shared_variables TEXT NOT NULL,
+                cc TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Envíos con el resto de los destinatarios en CC (ver MessageArchiveRepository.record)
+        if "cc" not in {row[1] for row in cursor.execute("PRAGMA table_info(sent_templates)")}:
+            cursor.execute("ALTER TABLE sent_templates ADD COLUMN cc TEXT")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sent_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                template_id INTEGER NOT NULL,
+                campaign_id INTEGER,
+                company_id INTEGER NOT NULL,
+                employee_id INTEGER,
+                email TEXT NOT NULL,
+                variable_values TEXT,
+                body BLOB,
+                sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sent_messages_email ON sent_messages(email)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sent_messages_campaign ON sent_messages(campaign_id)"
+        )
+        
+        # Posición de lectura de cada buzón mbox de rebotes (ver services/bounces.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bounce_sources (
+                path TEXT PRIMARY KEY,
+                inode INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Registro de cambios para sincronizar por deltas (ver ChangeRepository).
+        # Lo llenan triggers, así cuentan también los borrados en cascada, el
+        # archivo y los cambios hechos por otros procesos
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                entity TEXT NOT NULL,
+                action TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Los rebotes no son parte del empleado que se sincroniza o sirve la
+        # API: una actualización que solo toca esas columnas (BounceRepository
+        # o el reinicio de trg_employees_email_bounces, que corre dentro de la
+        # edición del email) no es un cambio. Solo columnas comunes (hidden = 0)
+        bounce_columns = [name for name, _ in EMPLOYEE_BOUNCE_COLUMNS]
+        employee_columns = [
+            row[1] for row in cursor.execute("PRAGMA table_xinfo(employees)")
+            if row[6] == 0 and row[1] not in bounce_columns
+        ]
+        bounce_only = (
+            " AND ".join(f"OLD.{c} IS NEW.{c}" for c in employee_columns)
+            + " AND (" + " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in bounce_columns) + ")"
+        )
+        for entity, table in CHANGE_TABLES.items():
+            for event, action, row in [
+                ("INSERT", INSERTED, "NEW"),
+                ("UPDATE", UPDATED, "NEW"),
+                ("DELETE", DELETED, "OLD"),
+            ]:
+                when = f"WHEN NOT ({bounce_only})" if (table, event) == ("employees", "UPDATE") else ""
+                # Se recrean: la condición cambia con las columnas
+                cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{event.lower()}_changes")
+                cursor.execute(f"""
+                    CREATE TRIGGER trg_{table}_{event.lower()}_changes
+                    AFTER {event} ON {table}
+                    {when}
+                    BEGIN
+                        INSERT INTO changes (entity, action, row_id) VALUES ('{entity}', '{action}', {row}.id);
+                    END
+                """)
+        # Versión de cada fila: su último seq (ETags de api/server.py)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_changes_entity_row ON changes(entity, row_id, seq)"
+        )
+        
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
         conn.close()
 
@@ -0,0 +1,284 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus
+Contadores e histogramas en memoria; se leen en el proceso con
+registry.render() / registry.value() o por HTTP con start_http_server()
+"""
+import collections.abc
+import functools
+import inspect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Límites (segundos) de los histogramas de latencia
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    """Base de contadores e histogramas: una serie por combinación de etiquetas"""
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: etiquetas esperadas {self.labelnames}, recibidas {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            lines.extend(self._render_series(series))
+        return lines
+    
+    def _render_series(self, series) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contador que solo crece (ej: mensajes enviados)"""
+    kind = "counter"
+    
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Un contador no puede decrecer")
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+    
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+    
+    def _render_series(self, series) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in series
+        ]
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum", "count")
+    
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """Histograma de valores (ej: latencias en segundos) con límites fijos"""
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        # Primer límite >= value (los buckets se acumulan al renderizar)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets))
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+    
+    @contextmanager
+    def time(self, **labels):
+        """Mide la duración del bloque en segundos"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series.count if series else 0
+    
+    def _render_series(self, series) -> List[str]:
+        lines = []
+        for key, data in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, data.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(data.sum)}")
+            lines.append(f"{self.name}_count{labels} {data.count}")
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas que se exponen juntas"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+    
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica duplicada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+    
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+    
+    def value(self, name: str, **labels) -> float:
+        """Valor de un contador o cantidad de observaciones de un histograma (para tests)"""
+        metric = self._metrics[name]
+        return metric.count(**labels) if isinstance(metric, Histogram) else metric.value(**labels)
+    
+    def reset(self):
+        """Vuelve todas las métricas a cero"""
+        for metric in self._metrics.values():
+            metric.reset()
+    
+    def render(self) -> str:
+        """Todas las métricas en formato de texto de Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def timed_methods(histogram: Histogram):
+    """
+    Decorador de clase: mide cada método estático en histogram (etiqueta method)
+    
+    Los métodos que retornan un Iterator se omiten: el tiempo de crear el
+    generador no dice nada de la consulta.
+    """
+    def decorator(cls):
+        for attr_name, attr in list(vars(cls).items()):
+            if not isinstance(attr, staticmethod) or attr_name.startswith("_"):
+                continue
+            fn = attr.__func__
+            returns = inspect.signature(fn).return_annotation
+            if getattr(returns, "__origin__", None) is collections.abc.Iterator:
+                continue
+            setattr(cls, attr_name, staticmethod(_timed(fn, histogram, f"{cls.__name__}.{attr_name}")))
+        return cls
+    return decorator
+
+
+def _timed(fn, histogram: Histogram, method: str):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start, method=method)
+    return wrapper
+
+
+def start_http_server(port: int, host: str = "127.0.0.1", source: Optional[Registry] = None):
+    """
+    Expone las métricas en http://host:port/metrics desde un hilo en segundo plano
+    
+    Returns:
+        El servidor (server.shutdown() lo detiene)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    source = source or registry
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = source.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# Métricas compartidas por toda la aplicación
+registry = Registry()
+
+MESSAGES_RENDERED = registry.counter("app_messages_rendered_total", "Mensajes renderizados")
+MESSAGES_SENT = registry.counter("app_messages_sent_total", "Mensajes enviados por SMTP")
+MESSAGES_FAILED = registry.counter("app_messages_failed_total", "Mensajes cuyo envío falló")
+MESSAGES_DEFERRED = registry.counter(
+    "app_messages_deferred_total", "Mensajes no enviados en este intento", ["reason"]
+)
+SMTP_SECONDS = registry.histogram(
+    "app_smtp_seconds", "Latencia de las operaciones SMTP", ["operation"]
+)
+DB_QUERY_SECONDS = registry.histogram(
+    "app_db_query_seconds", "Latencia de los métodos del repositorio", ["method"], DB_BUCKETS
+)
+API_REQUEST_SECONDS = registry.histogram(
+    "app_api_request_seconds", "Latencia de los pedidos a la API HTTP", ["route"], DB_BUCKETS
+)
+UI_STALL_SECONDS = registry.histogram(
+    "app_ui_stall_seconds", "Duración de los bloqueos del bucle de eventos de la interfaz",
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
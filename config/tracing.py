@@ -0,0 +1,133 @@
+"""
+Trazas de las etapas principales (repositorios, renderizado, MIME, SMTP, tablas)
+Los spans se guardan en un buffer circular y se exportan como Chrome trace JSON
+(se abren en https://ui.perfetto.dev o chrome://tracing)
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Optional, Tuple, Union
+
+
+class _NullSpan:
+    """Span que no hace nada (se usa con las trazas desactivadas)"""
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+    
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: Optional[dict]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+    
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        # deque.append es atómico: no hace falta lock para registrar
+        self.tracer._events.append((
+            self.name, self.category, self.start, end - self.start,
+            threading.get_ident(), self.args
+        ))
+        return False
+
+
+class Tracer:
+    """
+    Registro de spans en un buffer circular (desactivado por defecto)
+    
+    Con las trazas desactivadas span() devuelve un objeto compartido sin
+    estado y traced() llama directo a la función: el costo es una lectura
+    de atributo por llamada.
+    """
+    
+    def __init__(self, capacity: int = 100_000):
+        self.enabled = False
+        self._events: Deque[Tuple[str, str, int, int, int, Optional[dict]]] = deque(maxlen=capacity)
+    
+    def enable(self):
+        self.enabled = True
+    
+    def disable(self):
+        self.enabled = False
+    
+    def clear(self):
+        self._events.clear()
+    
+    def span(self, name: str, category: str = "app", **args):
+        """
+        Context manager que mide un bloque
+        
+        Uso:
+            with tracer.span("smtp.login", server=host):
+                ...
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args or None)
+    
+    def traced(self, name: Optional[str] = None, category: str = "app") -> Callable:
+        """Decorador que mide cada llamada a la función (nombre por defecto: su __qualname__)"""
+        def decorator(fn):
+            span_name = name or fn.__qualname__
+            
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, span_name, category, None):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def to_chrome_trace(self) -> dict:
+        """Spans registrados en formato Chrome trace-event (eventos completos "X")"""
+        pid = os.getpid()
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        events = []
+        threads = set()
+        
+        for name, category, start, duration, tid, args in list(self._events):
+            event = {
+                "name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid,
+                "ts": start / 1000, "dur": duration / 1000,
+            }
+            if args:
+                event["args"] = {key: str(value) for key, value in args.items()}
+            events.append(event)
+            threads.add(tid)
+        
+        for tid in threads:
+            events.append({
+                "name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                "args": {"name": thread_names.get(tid, str(tid))},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+    
+    def export(self, path: Union[str, Path]):
+        """Guarda los spans en un archivo JSON para Perfetto / chrome://tracing"""
+        Path(path).write_text(json.dumps(self.to_chrome_trace()), encoding="utf-8")
+
+
+# Trazas compartidas por toda la aplicación
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
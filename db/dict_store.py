@@ -0,0 +1,565 @@
+"""
+Motor de almacenamiento en diccionarios (sin SQL)
+Reproduce el comportamiento de los repositorios SQL para medir la capa
+de servicios sin el costo de SQLite y para tests sin archivos
+"""
+import bisect
+import heapq
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from db.events import change_bus, INSERTED, UPDATED, DELETED
+from models.company import Company
+from models.employee import Employee
+
+# Columnas de orden/filtro (las mismas de COMPANY_SORT_COLUMNS y EMPLOYEE_SORT_COLUMNS)
+COMPANY_COLUMNS = ("id", "name", "email", "phone", "address")
+EMPLOYEE_COLUMNS = ("id", "first_name", "last_name", "email", "phone", "position")
+
+# LIKE de SQLite solo ignora mayúsculas en ASCII
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def _now() -> str:
+    """Mismo formato que CURRENT_TIMESTAMP (UTC)"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _value(row: dict, column: str):
+    """Valor de orden de una columna (None se ordena como '', igual que IFNULL)"""
+    value = row[column]
+    return "" if value is None else value
+
+
+def _matches(row: dict, filters: Dict[str, str]) -> bool:
+    for column, text in filters.items():
+        if text.translate(_ASCII_LOWER) not in str(_value(row, column)).translate(_ASCII_LOWER):
+            return False
+    return True
+
+
+def _email_norm(row: dict) -> str:
+    """Igual que la columna generada email_norm: lower(trim(email))"""
+    return row["email"].strip(" ").translate(_ASCII_LOWER)
+
+
+def _email_domain(row: dict) -> str:
+    """Igual que la columna generada domain"""
+    norm = _email_norm(row)
+    return norm[norm.find("@") + 1:]
+
+
+def _insert_sorted(ids: List[int], row_id: int):
+    # Los IDs nuevos son los mayores: append, salvo al restaurar archivados
+    if not ids or ids[-1] < row_id:
+        ids.append(row_id)
+    else:
+        bisect.insort(ids, row_id)
+
+
+class _Table:
+    """
+    Filas por ID con un índice único y la lista de IDs ordenada
+    
+    derived son índices no únicos sobre un valor calculado de la fila
+    (como los de las columnas generadas): nombre -> valor -> IDs en orden.
+    Los IDs no se reutilizan (como AUTOINCREMENT).
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        unique: Optional[str] = None,
+        derived: Optional[Dict[str, Callable[[dict], str]]] = None
+    ):
+        self.name = name
+        self.unique = unique
+        self.derived = derived or {}
+        self.rows: Dict[int, dict] = {}
+        self.ids: List[int] = []
+        self.by_unique: Dict[str, int] = {}
+        self.by_derived: Dict[str, Dict[str, List[int]]] = {key: {} for key in self.derived}
+        self.next_id = 1
+    
+    def clear(self):
+        self.rows.clear()
+        self.ids.clear()
+        self.by_unique.clear()
+        for index in self.by_derived.values():
+            index.clear()
+        self.next_id = 1
+    
+    def _index(self, row: dict, add: bool):
+        for key, value_of in self.derived.items():
+            index = self.by_derived[key]
+            value = value_of(row)
+            if add:
+                _insert_sorted(index.setdefault(value, []), row["id"])
+            else:
+                ids = index[value]
+                del ids[bisect.bisect_left(ids, row["id"])]
+                if not ids:
+                    del index[value]
+    
+    def conflicts(self, values: dict, row_id: Optional[int] = None) -> bool:
+        if self.unique is None:
+            return False
+        other = self.by_unique.get(values[self.unique])
+        return other is not None and other != row_id
+    
+    def insert(self, values: dict) -> int:
+        """Inserta una fila (values sin id), retorna su ID"""
+        if self.conflicts(values):
+            raise sqlite3.IntegrityError(f"UNIQUE constraint failed: {self.name}.{self.unique}")
+        row_id = values.get("id") or self.next_id
+        self.next_id = max(self.next_id, row_id + 1)
+        row = dict(values, id=row_id)
+        row.setdefault("created_at", _now())
+        self.rows[row_id] = row
+        _insert_sorted(self.ids, row_id)
+        if self.unique is not None:
+            self.by_unique[row[self.unique]] = row_id
+        self._index(row, add=True)
+        return row_id
+    
+    def update(self, row_id: int, values: dict) -> bool:
+        row = self.rows.get(row_id)
+        if row is None:
+            return False
+        if self.conflicts(values, row_id):
+            raise sqlite3.IntegrityError(f"UNIQUE constraint failed: {self.name}.{self.unique}")
+        if self.unique is not None and self.unique in values:
+            del self.by_unique[row[self.unique]]
+            self.by_unique[values[self.unique]] = row_id
+        self._index(row, add=False)
+        row.update(values)
+        self._index(row, add=True)
+        return True
+    
+    def delete(self, row_id: int) -> Optional[dict]:
+        row = self.rows.pop(row_id, None)
+        if row is None:
+            return None
+        del self.ids[bisect.bisect_left(self.ids, row_id)]
+        if self.unique is not None:
+            del self.by_unique[row[self.unique]]
+        self._index(row, add=False)
+        return row
+    
+    def after(self, last_id: int, limit: int, ids: Optional[List[int]] = None) -> List[dict]:
+        """Hasta limit filas con id > last_id en orden de ID (de ids, por defecto todas)"""
+        ids = self.ids if ids is None else ids
+        start = bisect.bisect_right(ids, last_id)
+        return [self.rows[row_id] for row_id in ids[start:start + limit]]
+
+
+def _page(
+    rows: Iterable[dict],
+    columns: Tuple[str, ...],
+    sort: str,
+    descending: bool,
+    after: Optional[tuple],
+    filters: Optional[Dict[str, str]],
+    ids: Optional[Iterable[int]],
+    limit: int
+) -> List[dict]:
+    """Equivalente de _page_clauses + ORDER BY + LIMIT de db/repository.py"""
+    if sort not in columns:
+        raise ValueError(f"Columna de orden inválida: {sort}")
+    for column in filters or {}:
+        if column not in columns:
+            raise ValueError(f"Columna de filtro inválida: {column}")
+    
+    if ids is not None:
+        wanted = set(ids)
+        rows = (row for row in rows if row["id"] in wanted)
+    if filters:
+        rows = (row for row in rows if _matches(row, filters))
+    
+    def key(row):
+        return (_value(row, sort), row["id"])
+    
+    if after is not None:
+        after = tuple(after)
+        if descending:
+            rows = (row for row in rows if key(row) < after)
+        else:
+            rows = (row for row in rows if key(row) > after)
+    
+    # Sin ordenar todo: alcanza con las `limit` primeras claves
+    pick = heapq.nlargest if descending else heapq.nsmallest
+    return pick(limit, rows, key=key)
+
+
+class DictStore:
+    """Tablas en memoria de empresas, empleados y templates, con un lock compartido"""
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.companies = _Table("companies", unique="name")
+        self.employees = _Table(
+            "employees", unique="email", derived={"email_norm": _email_norm, "domain": _email_domain}
+        )
+        self.templates = _Table("message_templates")
+        # company_id -> IDs de sus empleados en orden
+        self.employees_by_company: Dict[int, List[int]] = {}
+        # Empresas archivadas: id -> (fila, filas de sus empleados)
+        self.archived: Dict[int, Tuple[dict, List[dict]]] = {}
+        self.stores = {
+            "CompanyRepository": CompanyStore(self),
+            "EmployeeRepository": EmployeeStore(self),
+            "MessageTemplateRepository": MessageTemplateStore(self),
+        }
+    
+    def clear(self):
+        with self.lock:
+            for table in (self.companies, self.employees, self.templates):
+                table.clear()
+            self.employees_by_company.clear()
+            self.archived.clear()
+    
+    def insert_employee(self, values: dict) -> int:
+        employee_id = self.employees.insert(values)
+        _insert_sorted(self.employees_by_company.setdefault(values["company_id"], []), employee_id)
+        return employee_id
+    
+    def delete_employee(self, employee_id: int) -> bool:
+        row = self.employees.delete(employee_id)
+        if row is None:
+            return False
+        ids = self.employees_by_company[row["company_id"]]
+        del ids[bisect.bisect_left(ids, employee_id)]
+        return True
+    
+    def load(self, path: Union[str, Path]):
+        """Reemplaza el contenido con las filas de un archivo SQLite (conserva IDs y fechas)"""
+        conn = sqlite3.connect(str(path))
+        conn.row_factory = sqlite3.Row
+        try:
+            with self.lock:
+                self.clear()
+                for row in conn.execute("SELECT * FROM companies ORDER BY id"):
+                    self.companies.insert({k: row[k] for k in ("id", "name", "email", "phone", "address", "created_at")})
+                for row in conn.execute("SELECT * FROM employees ORDER BY id"):
+                    self.insert_employee({k: row[k] for k in (
+                        "id", "first_name", "last_name", "email", "phone", "company_id", "position", "created_at"
+                    )})
+                for row in conn.execute("SELECT * FROM message_templates ORDER BY id"):
+                    self.templates.insert({k: row[k] for k in ("id", "name", "template", "created_at")})
+        finally:
+            conn.close()
+
+
+def _company(row: dict) -> Company:
+    return Company(**row)
+
+
+def _employee(row: dict) -> Employee:
+    return Employee(**row)
+
+
+class CompanyStore:
+    """CompanyRepository sobre DictStore"""
+    
+    def __init__(self, data: DictStore):
+        self.data = data
+        self.table = data.companies
+    
+    @staticmethod
+    def _values(company: Company) -> dict:
+        return {"name": company.name, "email": company.email, "phone": company.phone, "address": company.address}
+    
+    def create(self, company: Company) -> int:
+        with self.data.lock:
+            company_id = self.table.insert(self._values(company))
+        change_bus.publish("company", INSERTED, [company_id])
+        return company_id
+    
+    def create_many(self, companies: Iterable[Company]) -> List[int]:
+        company_ids = []
+        with self.data.lock:
+            for company in companies:
+                values = self._values(company)
+                if not self.table.conflicts(values):
+                    company_ids.append(self.table.insert(values))
+        change_bus.publish("company", INSERTED, company_ids)
+        return company_ids
+    
+    def read(self, company_id: int) -> Optional[Company]:
+        with self.data.lock:
+            row = self.table.rows.get(company_id)
+            return _company(row) if row else None
+    
+    def read_by_name(self, name: str) -> Optional[Company]:
+        with self.data.lock:
+            company_id = self.table.by_unique.get(name)
+            return _company(self.table.rows[company_id]) if company_id is not None else None
+    
+    def read_all(self) -> List[Company]:
+        with self.data.lock:
+            return [_company(self.table.rows[self.table.by_unique[name]]) for name in sorted(self.table.by_unique)]
+    
+    def stream_all(self, chunk_size: int = 1000) -> Iterator[List[Company]]:
+        last_id = 0
+        while True:
+            with self.data.lock:
+                rows = self.table.after(last_id, chunk_size)
+                chunk = [_company(row) for row in rows]
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1].id
+    
+    def read_many(self, company_ids: Iterable[int]) -> List[Company]:
+        with self.data.lock:
+            return [
+                _company(self.table.rows[company_id])
+                for company_id in sorted(set(company_ids)) if company_id in self.table.rows
+            ]
+    
+    def read_page(
+        self,
+        after: Optional[tuple],
+        limit: int,
+        sort: str = "name",
+        descending: bool = False,
+        filters: Optional[Dict[str, str]] = None,
+        ids: Optional[Iterable[int]] = None
+    ) -> List[Company]:
+        with self.data.lock:
+            rows = _page(self.table.rows.values(), COMPANY_COLUMNS, sort, descending, after, filters, ids, limit)
+            return [_company(row) for row in rows]
+    
+    def update(self, company: Company) -> bool:
+        with self.data.lock:
+            success = self.table.update(company.id, self._values(company))
+        if success and company.id is not None:
+            change_bus.publish("company", UPDATED, [company.id])
+        return success
+    
+    def delete(self, company_id: int) -> bool:
+        return self.delete_many([company_id]) > 0
+    
+    def delete_many(self, company_ids: Iterable[int], chunk_size: int = 1000) -> int:
+        return self._remove(company_ids, archive=False)
+    
+    def archive_many(self, company_ids: Iterable[int], chunk_size: int = 1000) -> int:
+        return self._remove(company_ids, archive=True)
+    
+    def _remove(self, company_ids: Iterable[int], archive: bool) -> int:
+        removed = []
+        for company_id in company_ids:
+            with self.data.lock:
+                # Como la cascada de foreign_keys: primero los empleados
+                employee_ids = list(self.data.employees_by_company.pop(company_id, []))
+                employees = [self.data.employees.rows[i] for i in employee_ids]
+                for employee_id in employee_ids:
+                    self.data.employees.delete(employee_id)
+                row = self.table.delete(company_id)
+                if row is not None:
+                    removed.append(company_id)
+                    if archive:
+                        self.data.archived[company_id] = (row, employees)
+            if employee_ids:
+                change_bus.publish("employee", DELETED, employee_ids)
+        if removed:
+            change_bus.publish("company", DELETED, removed)
+        return len(removed)
+    
+    def restore(self, company_id: int, chunk_size: int = 1000) -> bool:
+        with self.data.lock:
+            if company_id not in self.data.archived:
+                return False
+            row, employees = self.data.archived[company_id]
+            self.table.insert(row)
+            del self.data.archived[company_id]
+            for employee in employees:
+                self.data.insert_employee(employee)
+        change_bus.publish("company", INSERTED, [company_id])
+        if employees:
+            change_bus.publish("employee", INSERTED, [e["id"] for e in employees])
+        return True
+    
+    def read_archived(self) -> List[Company]:
+        with self.data.lock:
+            rows = sorted((row for row, _ in self.data.archived.values()), key=lambda row: row["name"])
+            return [_company(row) for row in rows]
+
+
+class EmployeeStore:
+    """EmployeeRepository sobre DictStore"""
+    
+    def __init__(self, data: DictStore):
+        self.data = data
+        self.table = data.employees
+    
+    @staticmethod
+    def _values(employee: Employee) -> dict:
+        return {
+            "first_name": employee.first_name,
+            "last_name": employee.last_name,
+            "email": employee.email,
+            "phone": employee.phone,
+            "company_id": employee.company_id,
+            "position": employee.position,
+        }
+    
+    def _company_rows(self, company_id: int) -> List[dict]:
+        return [self.table.rows[i] for i in self.data.employees_by_company.get(company_id, [])]
+    
+    def create(self, employee: Employee) -> int:
+        with self.data.lock:
+            employee_id = self.data.insert_employee(self._values(employee))
+        change_bus.publish("employee", INSERTED, [employee_id])
+        return employee_id
+    
+    def create_many(self, employees: Iterable[Employee]) -> List[int]:
+        employee_ids = []
+        with self.data.lock:
+            for employee in employees:
+                values = self._values(employee)
+                if not self.table.conflicts(values):
+                    employee_ids.append(self.data.insert_employee(values))
+        change_bus.publish("employee", INSERTED, employee_ids)
+        return employee_ids
+    
+    def read(self, employee_id: int) -> Optional[Employee]:
+        with self.data.lock:
+            row = self.table.rows.get(employee_id)
+            return _employee(row) if row else None
+    
+    def read_all(self) -> List[Employee]:
+        with self.data.lock:
+            rows = sorted(self.table.rows.values(), key=lambda row: row["first_name"])
+            return [_employee(row) for row in rows]
+    
+    def read_by_company(self, company_id: int) -> List[Employee]:
+        with self.data.lock:
+            rows = sorted(self._company_rows(company_id), key=lambda row: row["first_name"])
+            return [_employee(row) for row in rows]
+    
+    def read_page_by_company(
+        self,
+        company_id: int,
+        after: Optional[tuple],
+        limit: int,
+        sort: str = "first_name",
+        descending: bool = False,
+        filters: Optional[Dict[str, str]] = None,
+        ids: Optional[Iterable[int]] = None
+    ) -> List[Employee]:
+        with self.data.lock:
+            if sort == "id" and not descending and not filters and ids is None:
+                # Recorrido por ID: corte directo de la lista ordenada de la empresa
+                rows = self.table.after(
+                    after[1] if after else 0, limit, self.data.employees_by_company.get(company_id, [])
+                )
+            else:
+                rows = _page(
+                    self._company_rows(company_id), EMPLOYEE_COLUMNS, sort, descending, after, filters, ids, limit
+                )
+            return [_employee(row) for row in rows]
+    
+    def stream_by_company(self, company_id: int, chunk_size: int = 1000) -> Iterator[List[Employee]]:
+        return self.iter_by_company(company_id, chunk_size)
+    
+    def iter_by_company(self, company_id: int, chunk_size: int = 500) -> Iterator[List[Employee]]:
+        after = None
+        while True:
+            employees = self.read_page_by_company(company_id, after, chunk_size, sort="id")
+            if not employees:
+                return
+            yield employees
+            if len(employees) < chunk_size:
+                return
+            last = employees[-1]
+            after = (last.id, last.id)
+    
+    def read_by_email(self, email: str) -> Optional[Employee]:
+        with self.data.lock:
+            ids = self.table.by_derived["email_norm"].get(_email_norm({"email": email}))
+            return _employee(self.table.rows[ids[0]]) if ids else None
+    
+    def read_by_domain(self, domain: str, after_id: int = 0, limit: int = 1000) -> List[Employee]:
+        with self.data.lock:
+            ids = self.table.by_derived["domain"].get(domain.strip().lstrip("@").lower(), [])
+            return [_employee(row) for row in self.table.after(after_id, limit, ids)]
+    
+    def count_by_domain(self, limit: int = 100) -> List[Tuple[str, int]]:
+        with self.data.lock:
+            counts = [(domain, len(ids)) for domain, ids in self.table.by_derived["domain"].items()]
+        return sorted(counts, key=lambda item: (-item[1], item[0]))[:limit]
+    
+    def read_positions(self) -> List[str]:
+        with self.data.lock:
+            return sorted({row["position"] for row in self.table.rows.values() if row["position"]})
+    
+    def read_contacts_after(self, last_id: int, limit: int) -> List[tuple]:
+        with self.data.lock:
+            return [(row["id"], row["email"], row["phone"]) for row in self.table.after(last_id, limit)]
+    
+    def update_contacts(self, updates: Iterable[tuple]) -> int:
+        updates = list(updates)
+        updated = 0
+        with self.data.lock:
+            previous = []
+            try:
+                for email, phone, employee_id in updates:
+                    row = self.table.rows.get(employee_id)
+                    if row is None:
+                        continue
+                    previous.append((employee_id, {"email": row["email"], "phone": row["phone"]}))
+                    self.table.update(employee_id, {"email": email, "phone": phone})
+                    updated += 1
+            except sqlite3.IntegrityError:
+                # Como la transacción SQL: un email repetido deshace todo el lote
+                for employee_id, values in reversed(previous[:-1]):
+                    self.table.update(employee_id, values)
+                raise
+        change_bus.publish("employee", UPDATED, [u[2] for u in updates])
+        return updated
+    
+    def update(self, employee: Employee) -> bool:
+        values = self._values(employee)
+        del values["company_id"]
+        with self.data.lock:
+            success = self.table.update(employee.id, values)
+        if success and employee.id is not None:
+            change_bus.publish("employee", UPDATED, [employee.id])
+        return success
+    
+    def delete(self, employee_id: int) -> bool:
+        with self.data.lock:
+            success = self.data.delete_employee(employee_id)
+        if success:
+            change_bus.publish("employee", DELETED, [employee_id])
+        return success
+
+
+class MessageTemplateStore:
+    """MessageTemplateRepository sobre DictStore"""
+    
+    def __init__(self, data: DictStore):
+        self.data = data
+        self.table = data.templates
+    
+    def create(self, name: str, template: str) -> int:
+        with self.data.lock:
+            template_id = self.table.insert({"name": name, "template": template})
+        change_bus.publish("template", INSERTED, [template_id])
+        return template_id
+    
+    def read_all(self) -> List[tuple]:
+        with self.data.lock:
+            rows = sorted(self.table.rows.values(), key=lambda row: row["name"])
+            return [(row["id"], row["name"], row["template"]) for row in rows]
+    
+    def delete(self, template_id: int) -> bool:
+        with self.data.lock:
+            success = self.table.delete(template_id) is not None
+        if success:
+            change_bus.publish("template", DELETED, [template_id])
+        return success
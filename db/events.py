@@ -0,0 +1,95 @@
+"""
+Bus de eventos de cambios en los repositorios
+Permite que las vistas actualicen solo las filas afectadas
+"""
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Acciones posibles
+INSERTED = "inserted"
+UPDATED = "updated"
+DELETED = "deleted"
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """Cambio sobre una o más filas de una entidad"""
+    entity: str  # "company", "employee" o "template"
+    action: str  # INSERTED, UPDATED o DELETED
+    ids: Tuple[int, ...]
+
+
+class ChangeBus:
+    """
+    Bus de eventos en proceso
+    
+    Los suscriptores se llaman en el hilo que publica. Dentro de batch()
+    los eventos del hilo se acumulan y se publican al salir, uno por
+    (entidad, acción), con todos los IDs juntos.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: List[Tuple[Optional[str], Callable[[ChangeEvent], None]]] = []
+        self._local = threading.local()
+    
+    def subscribe(
+        self,
+        callback: Callable[[ChangeEvent], None],
+        entity: Optional[str] = None
+    ) -> Callable[[], None]:
+        """
+        Registra un suscriptor (de una entidad o de todas)
+        Returns: función para cancelar la suscripción
+        """
+        entry = (entity, callback)
+        with self._lock:
+            self._subscribers.append(entry)
+        
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+    
+    def publish(self, entity: str, action: str, ids):
+        """Publica un cambio (o lo acumula si hay un batch activo en el hilo)"""
+        ids = tuple(ids)
+        if not ids:
+            return
+        
+        pending: Optional[Dict[Tuple[str, str], List[int]]] = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending.setdefault((entity, action), []).extend(ids)
+            return
+        
+        self._dispatch(ChangeEvent(entity, action, ids))
+    
+    @contextmanager
+    def batch(self):
+        """Agrupa los eventos publicados en el bloque (se permite anidar)"""
+        if getattr(self._local, "pending", None) is not None:
+            yield
+            return
+        
+        self._local.pending = {}
+        try:
+            yield
+        finally:
+            pending = self._local.pending
+            self._local.pending = None
+            for (entity, action), ids in pending.items():
+                self._dispatch(ChangeEvent(entity, action, tuple(ids)))
+    
+    def _dispatch(self, event: ChangeEvent):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for entity, callback in subscribers:
+            if entity is None or entity == event.entity:
+                callback(event)
+
+
+# Bus compartido por toda la aplicación
+change_bus = ChangeBus()
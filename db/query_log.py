@@ -0,0 +1,232 @@
+"""
+Instrumentación de consultas SQL
+Cuenta consultas, filas y tiempo por acción y registra las consultas lentas
+"""
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, Optional, Tuple, Union
+
+# Acción usada cuando no hay una etiqueta ni un llamador fuera de la capa de datos
+NO_ACTION = "(sin acción)"
+
+# Archivos de la capa de datos (se saltean al buscar la acción que originó la consulta)
+_DATA_LAYER = (
+    "db/repository.py", "db/query_log.py", "config/database.py", "config/tracing.py", "config/metrics.py"
+)
+
+
+@dataclass
+class QueryStats:
+    """Contadores acumulados de una acción o método"""
+    queries: int = 0
+    rows: int = 0
+    ms: float = 0.0
+
+
+@dataclass
+class SlowQuery:
+    """Consulta que superó el umbral de lentitud"""
+    action: str
+    method: str
+    sql: str
+    ms: float
+    rows: int
+    at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+
+def _caller() -> Tuple[str, str]:
+    """
+    Busca en la pila el método del repositorio y la acción que lo llamó
+    
+    Returns:
+        (acción, método): ej ("MainWindow.edit_employee", "EmployeeRepository.read")
+    """
+    method = "?"
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename.replace("\\", "/")
+        if filename.endswith("db/repository.py"):
+            method = frame.f_code.co_qualname
+        elif not filename.endswith(_DATA_LAYER):
+            return frame.f_code.co_qualname, method
+        frame = frame.f_back
+    return NO_ACTION, method
+
+
+class QueryLog:
+    """
+    Registro de consultas SQL (desactivado por defecto)
+    
+    Con el registro activo, DatabaseConfig abre las conexiones con
+    InstrumentedConnection. Las consultas se cuentan con el callback de
+    set_trace_callback (incluye BEGIN/COMMIT implícitos y cada ejecución
+    de executemany); el tiempo y las filas los miden los cursores.
+    
+    Cada consulta se atribuye al método del repositorio que la ejecutó y
+    a una acción: la etiqueta de action() activa en el hilo o, si no hay,
+    el primer llamador fuera de la capa de datos (ej: MainWindow.add_company).
+    """
+    
+    def __init__(self, slow_ms: float = 100.0, max_slow: int = 500):
+        self.enabled = False
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.by_action: Dict[str, QueryStats] = {}
+        self.by_method: Dict[str, QueryStats] = {}
+        self.slow: Deque[SlowQuery] = deque(maxlen=max_slow)
+    
+    def enable(self, slow_ms: Optional[float] = None):
+        """Activa el registro para las conexiones que se abran desde ahora"""
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        self.enabled = True
+    
+    def disable(self):
+        self.enabled = False
+    
+    def reset(self):
+        """Borra los contadores y el log de consultas lentas"""
+        with self._lock:
+            self.by_action.clear()
+            self.by_method.clear()
+            self.slow.clear()
+    
+    @contextmanager
+    def action(self, name: str):
+        """Atribuye las consultas del bloque (en este hilo) a la acción indicada"""
+        previous = getattr(self._local, "action", None)
+        self._local.action = name
+        try:
+            yield
+        finally:
+            self._local.action = previous
+    
+    def _attribution(self) -> Tuple[str, str]:
+        action, method = _caller()
+        return getattr(self._local, "action", None) or action, method
+    
+    def count_statement(self, statement: str):
+        """Callback de set_trace_callback: cuenta cada sentencia que ejecuta SQLite"""
+        action, method = self._attribution()
+        with self._lock:
+            for key, table in ((action, self.by_action), (method, self.by_method)):
+                table.setdefault(key, QueryStats()).queries += 1
+    
+    def start(self, sql: str) -> "_Query":
+        """Registra una consulta que comienza a ejecutarse (para medir tiempo y filas)"""
+        action, method = self._attribution()
+        return _Query(action, method, sql)
+    
+    def add(self, query: "_Query", ms: float, rows: int):
+        """Suma tiempo y filas de una consulta (ejecución o lectura de resultados)"""
+        query.ms += ms
+        query.rows += rows
+        with self._lock:
+            for key, table in ((query.action, self.by_action), (query.method, self.by_method)):
+                stats = table.setdefault(key, QueryStats())
+                stats.ms += ms
+                stats.rows += rows
+            
+            if query.ms >= self.slow_ms:
+                if query.slow is None:
+                    query.slow = SlowQuery(query.action, query.method, " ".join(query.sql.split()), 0.0, 0)
+                    self.slow.append(query.slow)
+                query.slow.ms = round(query.ms, 3)
+                query.slow.rows = query.rows
+    
+    def snapshot(self) -> dict:
+        """Copia de los contadores y las consultas lentas (serializable a JSON)"""
+        with self._lock:
+            return {
+                "slow_ms": self.slow_ms,
+                "by_action": {k: asdict(v) for k, v in self.by_action.items()},
+                "by_method": {k: asdict(v) for k, v in self.by_method.items()},
+                "slow": [asdict(q) for q in self.slow],
+            }
+    
+    def dump(self, path: Union[str, Path]):
+        """Guarda el snapshot en un archivo JSON"""
+        Path(path).write_text(
+            json.dumps(self.snapshot(), indent=2, ensure_ascii=False) + "\n", encoding="utf-8"
+        )
+
+
+class _Query:
+    """Consulta en curso: acumula el tiempo de ejecución y de lectura de filas"""
+    __slots__ = ("action", "method", "sql", "ms", "rows", "slow")
+    
+    def __init__(self, action: str, method: str, sql: str):
+        self.action = action
+        self.method = method
+        self.sql = sql
+        self.ms = 0.0
+        self.rows = 0
+        self.slow: Optional[SlowQuery] = None
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor que mide execute/executemany y la lectura de resultados"""
+    
+    _query: Optional[_Query] = None
+    
+    def _timed(self, sql: str, method, *args):
+        self._query = query_log.start(sql)
+        start = time.perf_counter()
+        try:
+            return method(self, sql, *args)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            query_log.add(self._query, ms, max(self.rowcount, 0))
+    
+    def execute(self, sql, parameters=()):
+        return self._timed(sql, sqlite3.Cursor.execute, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(sql, sqlite3.Cursor.executemany, seq_of_parameters)
+    
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        result = method(self, *args)
+        if self._query is not None:
+            rows = len(result) if isinstance(result, list) else int(result is not None)
+            query_log.add(self._query, (time.perf_counter() - start) * 1000, rows)
+        return result
+    
+    def fetchone(self):
+        return self._fetch(sqlite3.Cursor.fetchone)
+    
+    def fetchmany(self, size=None):
+        return self._fetch(sqlite3.Cursor.fetchmany, size or self.arraysize)
+    
+    def fetchall(self):
+        return self._fetch(sqlite3.Cursor.fetchall)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Conexión cuyos cursores registran cada consulta en query_log"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(query_log.count_statement)
+    
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# Registro compartido por toda la aplicación
+query_log = QueryLog()
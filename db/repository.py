@@ -1,12 +1,276 @@
 """
 Repositorio de acceso a datos (CRUD)
 """
-from typing import List, Optional
-from config.database import DatabaseConfig
+import functools
+import hashlib
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from config.database import CHANGE_TABLES, DatabaseConfig
+from config.metrics import DB_QUERY_SECONDS, timed_methods
+from config.tracing import traced
+from db.events import change_bus, INSERTED, UPDATED, DELETED
+from models.bounce import Bounce, HARD_BOUNCE, SOFT_BOUNCE, SOFT_BOUNCE_LIMIT
+from models.campaign import Campaign, PENDING, RUNNING, FAILED, CANCELLED
+from models.change import Change
 from models.company import Company
+from models.contact_issue import ContactIssue
+from models.delivery import Delivery, DeliveryStats
 from models.employee import Employee
+from models.segment import Segment
+from models.sent_message import SentMessage
 
+# Columnas por las que se puede ordenar/filtrar -> expresión SQL
+# Las expresiones coinciden con las de los índices creados en config/database.py
+COMPANY_SORT_COLUMNS = {
+    "id": "id",
+    "name": "name",
+    "email": "IFNULL(email, '')",
+    "phone": "IFNULL(phone, '')",
+    "address": "IFNULL(address, '')",
+}
 
+EMPLOYEE_SORT_COLUMNS = {
+    "id": "id",
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "email": "email",
+    "phone": "IFNULL(phone, '')",
+    "position": "IFNULL(position, '')",
+}
+
+
+def _page_clauses(
+    columns: Dict[str, str],
+    sort: str,
+    descending: bool,
+    after: Optional[tuple],
+    filters: Optional[Dict[str, str]],
+    ids: Optional[Iterable[int]] = None
+) -> Tuple[List[str], list, str]:
+    """
+    Arma las condiciones y el ORDER BY de una consulta paginada por clave
+    
+    Args:
+        columns: Columnas permitidas (nombre -> expresión SQL)
+        sort: Columna de orden
+        descending: Orden descendente
+        after: Clave (valor de orden, id) de la última fila leída, o None
+        filters: {columna: texto} que debe contener cada columna
+        ids: Restringe la consulta a estos IDs (para actualizar filas sueltas)
+    
+    Returns:
+        (condiciones, parámetros, order_by)
+    """
+    if sort not in columns:
+        raise ValueError(f"Columna de orden inválida: {sort}")
+    expr = columns[sort]
+    conditions: List[str] = []
+    params: list = []
+    
+    for column, text in (filters or {}).items():
+        if column not in columns:
+            raise ValueError(f"Columna de filtro inválida: {column}")
+        escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions.append(f"{columns[column]} LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+    
+    if ids is not None:
+        conditions.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(ids)))
+    
+    if after is not None:
+        # La primera condición acota el rango del índice; la segunda desempata por id
+        op, bound = ("<", "<=") if descending else (">", ">=")
+        conditions.append(f"{expr} {bound} ? AND ({expr}, id) {op} (?, ?)")
+        params.extend([after[0], after[0], after[1]])
+    
+    direction = "DESC" if descending else "ASC"
+    return conditions, params, f"ORDER BY {expr} {direction}, id {direction}"
+
+
+# Dominio del email (columna generada en minúsculas, índice idx_employees_domain)
+EMAIL_DOMAIN_EXPR = "domain"
+
+
+def _segment_clauses(segment: Segment) -> Tuple[List[str], list]:
+    """
+    Condiciones de un segmento sobre employees
+    
+    Cada condición coincide con un índice de config/database.py. Las listas
+    van como IN (?, ?, ...) y no como json_each: con la cantidad de valores
+    a la vista el planificador de SQLite elige el índice en lugar de
+    recorrer la tabla.
+    
+    Returns:
+        (condiciones, parámetros)
+    
+    Raises:
+        ValueError: Si las fechas del segmento no son 'AAAA-MM-DD'
+    """
+    segment.validate()
+    conditions: List[str] = []
+    params: list = []
+    
+    for expr, values in [
+        ("company_id", segment.company_ids),
+        ("IFNULL(position, '')", segment.positions),
+        (EMAIL_DOMAIN_EXPR, [d.strip().lstrip("@").lower() for d in segment.domains]),
+    ]:
+        if values:
+            conditions.append(f"{expr} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+    
+    # created_at es 'AAAA-MM-DD HH:MM:SS': la fecha final se incluye completa
+    if segment.created_from:
+        conditions.append("created_at >= ?")
+        params.append(segment.created_from)
+    if segment.created_to:
+        conditions.append("created_at < date(?, '+1 day')")
+        params.append(segment.created_to)
+    
+    return conditions, params
+
+
+def _where(conditions: List[str]) -> str:
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def _stream_rows(sql: str, params: tuple, chunk_size: int) -> Iterator[list]:
+    """
+    Ejecuta una consulta y entrega las filas por bloques (fetchmany) desde un cursor
+    
+    La conexión queda abierta mientras se consume el generador: la memoria
+    depende de chunk_size y no del total de filas.
+    """
+    conn = DatabaseConfig.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        conn.close()
+
+
+def _dispatch_to_store(cls):
+    """
+    Decorador de clase: si el motor activo tiene un store propio para el
+    repositorio (ej: el motor dict), cada método público se delega a él
+    
+    La decisión se toma en cada llamada, así DatabaseConfig.use_backend()
+    afecta también a los repositorios ya importados.
+    """
+    for attr_name, attr in list(vars(cls).items()):
+        if not isinstance(attr, staticmethod) or attr_name.startswith("_"):
+            continue
+        setattr(cls, attr_name, staticmethod(_dispatched(attr.__func__, cls.__name__, attr_name)))
+    return cls
+
+
+def _dispatched(fn, repository: str, name: str):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        store = DatabaseConfig.backend.store(repository)
+        if store is None:
+            return fn(*args, **kwargs)
+        return getattr(store, name)(*args, **kwargs)
+    return wrapper
+
+
+# Columnas que se copian a las tablas de archivo
+COMPANY_ARCHIVE_COLUMNS = "id, name, email, phone, address, created_at"
+EMPLOYEE_ARCHIVE_COLUMNS = "id, first_name, last_name, email, phone, company_id, position, created_at"
+
+
+def _remove_employees(
+    conn, company_id: int, chunk_size: int, archive: bool = False
+) -> int:
+    """
+    Borra (o mueve a archived_employees) los empleados de una empresa por bloques
+    
+    Cada bloque es una transacción corta: entre bloques otras conexiones
+    pueden escribir. Los contact_issues de cada bloque se borran por la
+    cascada de foreign_keys.
+    
+    Returns:
+        Cantidad de empleados quitados
+    """
+    total = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id FROM employees WHERE company_id = ? ORDER BY id LIMIT ?",
+            (company_id, chunk_size)
+        ).fetchall()
+        if not rows:
+            return total
+        ids = [row['id'] for row in rows]
+        # Rango por (company_id, id) en el índice idx_employees_company
+        params = (company_id, ids[-1])
+        if archive:
+            conn.execute(f"""
+                INSERT OR REPLACE INTO archived_employees ({EMPLOYEE_ARCHIVE_COLUMNS})
+                SELECT {EMPLOYEE_ARCHIVE_COLUMNS} FROM employees WHERE company_id = ? AND id <= ?
+            """, params)
+        conn.execute("DELETE FROM employees WHERE company_id = ? AND id <= ?", params)
+        conn.commit()
+        change_bus.publish("employee", DELETED, ids)
+        total += len(ids)
+
+
+def _company_from_row(row) -> Company:
+    """Construye un Company a partir de una fila de companies"""
+    return Company(
+        id=row['id'],
+        name=row['name'],
+        email=row['email'],
+        phone=row['phone'],
+        address=row['address'],
+        created_at=row['created_at']
+    )
+
+
+def _campaign_from_row(row) -> Campaign:
+    """Construye un Campaign a partir de una fila de scheduled_campaigns"""
+    return Campaign(
+        id=row['id'],
+        name=row['name'],
+        template=row['template'],
+        subject=row['subject'],
+        segment=Segment.from_dict(json.loads(row['segment'])),
+        attachments=json.loads(row['attachments']) if row['attachments'] else [],
+        due_at=row['due_at'],
+        status=row['status'],
+        sent=row['sent'],
+        failed=row['failed'],
+        excluded=row['excluded'],
+        error=row['error'],
+        created_at=row['created_at'],
+        started_at=row['started_at'],
+        finished_at=row['finished_at']
+    )
+
+
+def _employee_from_row(row) -> Employee:
+    """Construye un Employee a partir de una fila de employees"""
+    return Employee(
+        id=row['id'],
+        first_name=row['first_name'],
+        last_name=row['last_name'],
+        email=row['email'],
+        phone=row['phone'],
+        company_id=row['company_id'],
+        position=row['position'],
+        created_at=row['created_at']
+    )
+
+
+@timed_methods(DB_QUERY_SECONDS)
+@_dispatch_to_store
 class CompanyRepository:
     """Operaciones CRUD para empresas"""
     
@@ -24,9 +288,38 @@ class CompanyRepository:
         company_id: int = cursor.lastrowid or 0
         conn.commit()
         conn.close()
+        change_bus.publish("company", INSERTED, [company_id])
         return company_id
     
     @staticmethod
+    def create_many(companies: Iterable[Company]) -> List[int]:
+        """
+        Crea varias empresas en una sola transacción
+        Las que repiten un nombre existente se omiten
+        
+        Returns:
+            IDs de las empresas creadas
+        """
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        company_ids = []
+        for company in companies:
+            cursor.execute("""
+                INSERT INTO companies (name, email, phone, address)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO NOTHING
+            """, (company.name, company.email, company.phone, company.address))
+            if cursor.rowcount > 0:
+                company_ids.append(cursor.lastrowid)
+        
+        conn.commit()
+        conn.close()
+        change_bus.publish("company", INSERTED, company_ids)
+        return company_ids
+    
+    @staticmethod
+    @traced(category="db")
     def read(company_id: int) -> Optional[Company]:
         """Obtiene una empresa por ID"""
         conn = DatabaseConfig.get_connection()
@@ -37,17 +330,26 @@ class CompanyRepository:
         conn.close()
         
         if row:
-            return Company(
-                id=row['id'],
-                name=row['name'],
-                email=row['email'],
-                phone=row['phone'],
-                address=row['address'],
-                created_at=row['created_at']
-            )
+            return _company_from_row(row)
+        return None
+    
+    @staticmethod
+    @traced(category="db")
+    def read_by_name(name: str) -> Optional[Company]:
+        """Obtiene una empresa por nombre exacto"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM companies WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        if row:
+            return _company_from_row(row)
         return None
     
     @staticmethod
+    @traced(category="db")
     def read_all() -> List[Company]:
         """Obtiene todas las empresas"""
         conn = DatabaseConfig.get_connection()
@@ -57,17 +359,67 @@ class CompanyRepository:
         rows = cursor.fetchall()
         conn.close()
         
-        return [
-            Company(
-                id=row['id'],
-                name=row['name'],
-                email=row['email'],
-                phone=row['phone'],
-                address=row['address'],
-                created_at=row['created_at']
-            )
-            for row in rows
-        ]
+        return [_company_from_row(row) for row in rows]
+    
+    @staticmethod
+    def stream_all(chunk_size: int = 1000) -> Iterator[List[Company]]:
+        """Recorre todas las empresas (en orden de ID) por bloques desde un cursor"""
+        for rows in _stream_rows("SELECT * FROM companies ORDER BY id ASC", (), chunk_size):
+            yield [_company_from_row(row) for row in rows]
+    
+    @staticmethod
+    @traced(category="db")
+    def read_many(company_ids: Iterable[int]) -> List[Company]:
+        """Obtiene varias empresas por ID en una sola consulta"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT * FROM companies WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(company_ids)),)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [_company_from_row(row) for row in rows]
+    
+    @staticmethod
+    @traced(category="db")
+    def read_page(
+        after: Optional[tuple],
+        limit: int,
+        sort: str = "name",
+        descending: bool = False,
+        filters: Optional[Dict[str, str]] = None,
+        ids: Optional[Iterable[int]] = None
+    ) -> List[Company]:
+        """
+        Obtiene una página de empresas ordenada y filtrada en SQL
+        
+        Args:
+            after: Clave (valor de orden, id) de la última fila ya leída, o None
+            limit: Cantidad máxima de filas
+            sort: Columna de orden (ver COMPANY_SORT_COLUMNS)
+            descending: Orden descendente
+            filters: {columna: texto} que debe contener cada columna
+            ids: Restringe la página a estos IDs
+        """
+        conditions, params, order_by = _page_clauses(
+            COMPANY_SORT_COLUMNS, sort, descending, after, filters, ids
+        )
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            f"SELECT * FROM companies {where} {order_by} LIMIT ?",
+            (*params, limit)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [_company_from_row(row) for row in rows]
     
     @staticmethod
     def update(company: Company) -> bool:
@@ -84,21 +436,118 @@ class CompanyRepository:
         success = cursor.rowcount > 0
         conn.commit()
         conn.close()
+        if success and company.id is not None:
+            change_bus.publish("company", UPDATED, [company.id])
         return success
     
     @staticmethod
     def delete(company_id: int) -> bool:
-        """Elimina una empresa"""
+        """Elimina una empresa y sus empleados"""
+        return CompanyRepository.delete_many([company_id]) > 0
+    
+    @staticmethod
+    def delete_many(company_ids: Iterable[int], chunk_size: int = 1000) -> int:
+        """
+        Elimina empresas con sus empleados, estos por bloques de chunk_size
+        
+        Un DELETE de la empresa con la cascada borraría todos los empleados
+        en una sola transacción y bloquearía las escrituras mientras dura.
+        
+        Returns:
+            Cantidad de empresas eliminadas
+        """
+        return CompanyRepository._remove(company_ids, chunk_size, archive=False)
+    
+    @staticmethod
+    def archive_many(company_ids: Iterable[int], chunk_size: int = 1000) -> int:
+        """
+        Mueve empresas y sus empleados a archived_companies/archived_employees
+        Los empleados se mueven por bloques, como en delete_many
+        
+        Returns:
+            Cantidad de empresas archivadas
+        """
+        return CompanyRepository._remove(company_ids, chunk_size, archive=True)
+    
+    @staticmethod
+    def _remove(company_ids: Iterable[int], chunk_size: int, archive: bool) -> int:
+        conn = DatabaseConfig.get_connection()
+        removed = []
+        try:
+            for company_id in company_ids:
+                _remove_employees(conn, company_id, chunk_size, archive)
+                if archive:
+                    conn.execute(f"""
+                        INSERT OR REPLACE INTO archived_companies ({COMPANY_ARCHIVE_COLUMNS})
+                        SELECT {COMPANY_ARCHIVE_COLUMNS} FROM companies WHERE id = ?
+                    """, (company_id,))
+                cursor = conn.execute("DELETE FROM companies WHERE id = ?", (company_id,))
+                if cursor.rowcount > 0:
+                    removed.append(company_id)
+                conn.commit()
+        finally:
+            conn.close()
+            if removed:
+                change_bus.publish("company", DELETED, removed)
+        return len(removed)
+    
+    @staticmethod
+    def restore(company_id: int, chunk_size: int = 1000) -> bool:
+        """
+        Devuelve una empresa archivada (con sus empleados) a las tablas activas
+        
+        Raises:
+            sqlite3.IntegrityError: Si ya existe una empresa con el mismo nombre
+                o un empleado con el mismo email
+        """
+        conn = DatabaseConfig.get_connection()
+        try:
+            cursor = conn.execute(f"""
+                INSERT INTO companies ({COMPANY_ARCHIVE_COLUMNS})
+                SELECT {COMPANY_ARCHIVE_COLUMNS} FROM archived_companies WHERE id = ?
+            """, (company_id,))
+            if cursor.rowcount == 0:
+                return False
+            conn.execute("DELETE FROM archived_companies WHERE id = ?", (company_id,))
+            conn.commit()
+            change_bus.publish("company", INSERTED, [company_id])
+            
+            while True:
+                rows = conn.execute(
+                    "SELECT id FROM archived_employees WHERE company_id = ? ORDER BY id LIMIT ?",
+                    (company_id, chunk_size)
+                ).fetchall()
+                if not rows:
+                    return True
+                ids = [row['id'] for row in rows]
+                params = (company_id, ids[-1])
+                conn.execute(f"""
+                    INSERT INTO employees ({EMPLOYEE_ARCHIVE_COLUMNS})
+                    SELECT {EMPLOYEE_ARCHIVE_COLUMNS} FROM archived_employees
+                    WHERE company_id = ? AND id <= ?
+                """, params)
+                conn.execute("DELETE FROM archived_employees WHERE company_id = ? AND id <= ?", params)
+                conn.commit()
+                change_bus.publish("employee", INSERTED, ids)
+        finally:
+            conn.close()
+    
+    @staticmethod
+    @traced(category="db")
+    def read_archived() -> List[Company]:
+        """Obtiene las empresas archivadas (el created_at es el original)"""
         conn = DatabaseConfig.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("DELETE FROM companies WHERE id = ?", (company_id,))
-        success = cursor.rowcount > 0
-        conn.commit()
+        cursor.execute("SELECT * FROM archived_companies ORDER BY name ASC")
+        rows = cursor.fetchall()
         conn.close()
-        return success
+        
+        return [_company_from_row(row) for row in rows]
 
 
+@timed_methods(DB_QUERY_SECONDS)
+@_dispatch_to_store
 class EmployeeRepository:
     """Operaciones CRUD para empleados"""
     
@@ -117,9 +566,39 @@ class EmployeeRepository:
         employee_id: int = cursor.lastrowid or 0
         conn.commit()
         conn.close()
+        change_bus.publish("employee", INSERTED, [employee_id])
         return employee_id
     
     @staticmethod
+    def create_many(employees: Iterable[Employee]) -> List[int]:
+        """
+        Crea varios empleados en una sola transacción
+        Los que repiten un email existente se omiten
+        
+        Returns:
+            IDs de los empleados creados
+        """
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        employee_ids = []
+        for employee in employees:
+            cursor.execute("""
+                INSERT INTO employees (first_name, last_name, email, phone, company_id, position)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(email) DO NOTHING
+            """, (employee.first_name, employee.last_name, employee.email,
+                  employee.phone, employee.company_id, employee.position))
+            if cursor.rowcount > 0:
+                employee_ids.append(cursor.lastrowid)
+        
+        conn.commit()
+        conn.close()
+        change_bus.publish("employee", INSERTED, employee_ids)
+        return employee_ids
+    
+    @staticmethod
+    @traced(category="db")
     def read(employee_id: int) -> Optional[Employee]:
         """Obtiene un empleado por ID"""
         conn = DatabaseConfig.get_connection()
@@ -130,19 +609,11 @@ class EmployeeRepository:
         conn.close()
         
         if row:
-            return Employee(
-                id=row['id'],
-                first_name=row['first_name'],
-                last_name=row['last_name'],
-                email=row['email'],
-                phone=row['phone'],
-                company_id=row['company_id'],
-                position=row['position'],
-                created_at=row['created_at']
-            )
+            return _employee_from_row(row)
         return None
     
     @staticmethod
+    @traced(category="db")
     def read_all() -> List[Employee]:
         """Obtiene todos los empleados"""
         conn = DatabaseConfig.get_connection()
@@ -152,21 +623,10 @@ class EmployeeRepository:
         rows = cursor.fetchall()
         conn.close()
         
-        return [
-            Employee(
-                id=row['id'],
-                first_name=row['first_name'],
-                last_name=row['last_name'],
-                email=row['email'],
-                phone=row['phone'],
-                company_id=row['company_id'],
-                position=row['position'],
-                created_at=row['created_at']
-            )
-            for row in rows
-        ]
+        return [_employee_from_row(row) for row in rows]
     
     @staticmethod
+    @traced(category="db")
     def read_by_company(company_id: int) -> List[Employee]:
         """Obtiene todos los empleados de una empresa"""
         conn = DatabaseConfig.get_connection()
@@ -179,19 +639,199 @@ class EmployeeRepository:
         rows = cursor.fetchall()
         conn.close()
         
-        return [
-            Employee(
-                id=row['id'],
-                first_name=row['first_name'],
-                last_name=row['last_name'],
-                email=row['email'],
-                phone=row['phone'],
-                company_id=row['company_id'],
-                position=row['position'],
-                created_at=row['created_at']
+        return [_employee_from_row(row) for row in rows]
+    
+    @staticmethod
+    @traced(category="db")
+    def read_page_by_company(
+        company_id: int,
+        after: Optional[tuple],
+        limit: int,
+        sort: str = "first_name",
+        descending: bool = False,
+        filters: Optional[Dict[str, str]] = None,
+        ids: Optional[Iterable[int]] = None
+    ) -> List[Employee]:
+        """
+        Obtiene una página de empleados de una empresa, ordenada y filtrada en SQL
+        
+        Args:
+            company_id: ID de la empresa
+            after: Clave (valor de orden, id) de la última fila ya leída, o None
+            limit: Cantidad máxima de filas
+            sort: Columna de orden (ver EMPLOYEE_SORT_COLUMNS)
+            descending: Orden descendente
+            filters: {columna: texto} que debe contener cada columna
+            ids: Restringe la página a estos IDs
+        """
+        conditions, params, order_by = _page_clauses(
+            EMPLOYEE_SORT_COLUMNS, sort, descending, after, filters, ids
+        )
+        where = " AND ".join(["company_id = ?"] + conditions)
+        
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            f"SELECT * FROM employees WHERE {where} {order_by} LIMIT ?",
+            (company_id, *params, limit)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [_employee_from_row(row) for row in rows]
+    
+    @staticmethod
+    def stream_by_company(company_id: int, chunk_size: int = 1000) -> Iterator[List[Employee]]:
+        """
+        Recorre los empleados de una empresa (en orden de ID) por bloques desde un cursor
+        Mantiene abierta la lectura hasta terminar: pensado para exportar
+        """
+        for rows in _stream_rows(
+            "SELECT * FROM employees WHERE company_id = ? ORDER BY id ASC", (company_id,), chunk_size
+        ):
+            yield [_employee_from_row(row) for row in rows]
+    
+    @staticmethod
+    def iter_by_company(company_id: int, chunk_size: int = 500) -> Iterator[List[Employee]]:
+        """
+        Recorre los empleados de una empresa por bloques (en orden de ID)
+        Cada bloque es una consulta por clave: la memoria no crece con la empresa
+        """
+        after = None
+        while True:
+            employees = EmployeeRepository.read_page_by_company(
+                company_id, after, chunk_size, sort="id"
             )
-            for row in rows
-        ]
+            if not employees:
+                return
+            yield employees
+            if len(employees) < chunk_size:
+                return
+            last = employees[-1]
+            after = (last.id, last.id)
+    
+    @staticmethod
+    @traced(category="db")
+    def read_by_email(email: str) -> Optional[Employee]:
+        """
+        Obtiene un empleado por email sin distinguir mayúsculas ni espacios
+        Busca por la columna generada email_norm (índice idx_employees_email_norm)
+        """
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT * FROM employees WHERE email_norm = lower(trim(?)) ORDER BY id LIMIT 1",
+            (email,)
+        )
+        row = cursor.fetchone()
+        conn.close()
+        
+        if row:
+            return _employee_from_row(row)
+        return None
+    
+    @staticmethod
+    @traced(category="db")
+    def read_by_domain(domain: str, after_id: int = 0, limit: int = 1000) -> List[Employee]:
+        """
+        Obtiene los empleados de un dominio de email (en orden de ID, paginado por clave)
+        
+        Args:
+            domain: Dominio (se ignoran mayúsculas y una '@' inicial)
+            after_id: ID del último empleado ya leído
+            limit: Cantidad máxima de filas
+        """
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT * FROM employees WHERE domain = ? AND id > ? ORDER BY id LIMIT ?",
+            (domain.strip().lstrip("@").lower(), after_id, limit)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [_employee_from_row(row) for row in rows]
+    
+    @staticmethod
+    @traced(category="db")
+    def count_by_domain(limit: int = 100) -> List[Tuple[str, int]]:
+        """Dominios de email con más empleados: [(dominio, cantidad)], recorriendo solo el índice"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT domain, COUNT(*) AS total FROM employees
+            GROUP BY domain ORDER BY total DESC, domain LIMIT ?
+        """, (limit,))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [(row['domain'], row['total']) for row in rows]
+    
+    @staticmethod
+    @traced(category="db")
+    def read_positions() -> List[str]:
+        """Posiciones distintas cargadas (para armar segmentos)"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT DISTINCT IFNULL(position, '') AS position FROM employees
+            ORDER BY IFNULL(position, '')
+        """)
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [row['position'] for row in rows if row['position']]
+    
+    @staticmethod
+    @traced(category="db")
+    def read_contacts_after(last_id: int, limit: int) -> List[tuple]:
+        """
+        Obtiene (id, email, phone) de empleados con id > last_id
+        Paginado por clave (keyset) para recorrer la tabla por bloques
+        """
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT id, email, phone FROM employees WHERE id > ? ORDER BY id ASC LIMIT ?",
+            (last_id, limit)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [(row['id'], row['email'], row['phone']) for row in rows]
+    
+    @staticmethod
+    def update_contacts(updates: Iterable[tuple]) -> int:
+        """
+        Actualiza email y teléfono normalizados en lote
+        Publica un único evento con todos los IDs
+        
+        Args:
+            updates: Tuplas (email, phone, employee_id)
+        
+        Returns:
+            Cantidad de filas actualizadas
+        """
+        updates = list(updates)
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.executemany(
+            "UPDATE employees SET email = ?, phone = ? WHERE id = ?",
+            updates
+        )
+        
+        updated = cursor.rowcount
+        conn.commit()
+        conn.close()
+        change_bus.publish("employee", UPDATED, [u[2] for u in updates])
+        return updated
     
     @staticmethod
     def update(employee: Employee) -> bool:
@@ -209,6 +849,8 @@ class EmployeeRepository:
         success = cursor.rowcount > 0
         conn.commit()
         conn.close()
+        if success and employee.id is not None:
+            change_bus.publish("employee", UPDATED, [employee.id])
         return success
     
     @staticmethod
@@ -221,9 +863,13 @@ class EmployeeRepository:
         success = cursor.rowcount > 0
         conn.commit()
         conn.close()
+        if success:
+            change_bus.publish("employee", DELETED, [employee_id])
         return success
 
 
+@timed_methods(DB_QUERY_SECONDS)
+@_dispatch_to_store
 class MessageTemplateRepository:
     """Operaciones CRUD para templates de mensajes"""
     
@@ -241,6 +887,7 @@ class MessageTemplateRepository:
         template_id: int = cursor.lastrowid or 0
         conn.commit()
         conn.close()
+        change_bus.publish("template", INSERTED, [template_id])
         return template_id
     
     @staticmethod
@@ -265,4 +912,1057 @@ class MessageTemplateRepository:
         success = cursor.rowcount > 0
         conn.commit()
         conn.close()
+        if success:
+            change_bus.publish("template", DELETED, [template_id])
         return success
+
+
+@timed_methods(DB_QUERY_SECONDS)
+class ContactIssueRepository:
+    """Operaciones sobre problemas de contacto detectados"""
+    
+    # Tipos de problema que impiden enviar un email a la dirección
+    BLOCKING_KINDS = ("invalid_email", "duplicate_email")
+    
+    @staticmethod
+    def replace_all(issues: Iterable[ContactIssue]) -> int:
+        """Reemplaza los problemas registrados por el resultado de un nuevo análisis"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM contact_issues")
+        cursor.executemany("""
+            INSERT INTO contact_issues (employee_id, email, kind, detail)
+            VALUES (?, ?, ?, ?)
+        """, ((i.employee_id, i.email, i.kind, i.detail) for i in issues))
+        
+        cursor.execute("SELECT COUNT(*) FROM contact_issues")
+        count: int = cursor.fetchone()[0]
+        conn.commit()
+        conn.close()
+        return count
+    
+    @staticmethod
+    def read_all() -> List[ContactIssue]:
+        """Obtiene todos los problemas registrados"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM contact_issues ORDER BY employee_id ASC")
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [
+            ContactIssue(
+                id=row['id'],
+                employee_id=row['employee_id'],
+                email=row['email'],
+                kind=row['kind'],
+                detail=row['detail'],
+                detected_at=row['detected_at']
+            )
+            for row in rows
+        ]
+    
+    @staticmethod
+    def blocked_emails(emails: List[str]) -> Set[str]:
+        """
+        Retorna los emails de la lista que tienen un problema bloqueante
+        o que rebotaron de forma permanente (employees.deliverability)
+        
+        Se resuelve en una sola consulta: la lista viaja como un único
+        parámetro JSON, sin importar la cantidad de destinatarios, y cada
+        email se busca por índice en contact_issues y en employees.
+        """
+        if not emails:
+            return set()
+        
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        placeholders = ", ".join("?" for _ in ContactIssueRepository.BLOCKING_KINDS)
+        cursor.execute(f"""
+            SELECT email FROM contact_issues
+            WHERE email IN (SELECT value FROM json_each(?1))
+              AND kind IN ({placeholders})
+            UNION
+            SELECT email FROM employees
+            WHERE email IN (SELECT value FROM json_each(?1))
+              AND deliverability = '{HARD_BOUNCE}'
+        """, (json.dumps(emails), *ContactIssueRepository.BLOCKING_KINDS))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return {row['email'] for row in rows}
+
+
+@timed_methods(DB_QUERY_SECONDS)
+class BounceRepository:
+    """
+    Estado de entrega de los empleados según los rebotes (columnas de employees)
+    y posición de lectura de los buzones de rebotes (bounce_sources)
+    """
+    
+    @staticmethod
+    def record(
+        bounces: Iterable[Bounce],
+        source: Optional[Tuple[str, int, int]] = None
+    ) -> List[int]:
+        """
+        Aplica un lote de rebotes en una transacción
+        
+        Cada dirección se busca por email_norm (índice). Un rebote
+        permanente marca HARD_BOUNCE; uno temporal suma a soft_bounces
+        y pasa a HARD_BOUNCE al llegar a SOFT_BOUNCE_LIMIT.
+        
+        Args:
+            bounces: Rebotes leídos
+            source: (ruta, inodo, offset) del buzón mbox leído hasta aquí; se
+                guarda en la misma transacción para no aplicar dos veces un lote
+        
+        Returns:
+            IDs de los empleados actualizados
+        """
+        bounced_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        updated: List[int] = []
+        for bounce in bounces:
+            detail = " ".join(part for part in (bounce.status, bounce.diagnostic) if part) or None
+            if bounce.kind == HARD_BOUNCE:
+                cursor.execute("""
+                    UPDATE employees
+                    SET deliverability = ?, bounced_at = ?, bounce_detail = ?
+                    WHERE email_norm = lower(trim(?))
+                    RETURNING id
+                """, (HARD_BOUNCE, bounced_at, detail, bounce.email))
+            else:
+                cursor.execute("""
+                    UPDATE employees
+                    SET soft_bounces = soft_bounces + 1,
+                        deliverability = CASE WHEN soft_bounces + 1 >= ? THEN ? ELSE ? END,
+                        bounced_at = ?, bounce_detail = ?
+                    WHERE email_norm = lower(trim(?)) AND deliverability IS NOT ?
+                    RETURNING id
+                """, (
+                    SOFT_BOUNCE_LIMIT, HARD_BOUNCE, SOFT_BOUNCE, bounced_at, detail,
+                    bounce.email, HARD_BOUNCE
+                ))
+            updated.extend(row['id'] for row in cursor.fetchall())
+        
+        if source is not None:
+            cursor.execute("""
+                INSERT INTO bounce_sources (path, inode, offset, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    inode = excluded.inode, offset = excluded.offset, updated_at = excluded.updated_at
+            """, (*source, bounced_at))
+        
+        conn.commit()
+        conn.close()
+        change_bus.publish("employee", UPDATED, dict.fromkeys(updated))
+        return updated
+    
+    @staticmethod
+    def read_source(path: str) -> Optional[Tuple[int, int]]:
+        """(inodo, offset) hasta donde se leyó un buzón mbox, o None si nunca se leyó"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT inode, offset FROM bounce_sources WHERE path = ?", (path,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        return (row['inode'], row['offset']) if row else None
+    
+    @staticmethod
+    @traced(category="db")
+    def read_bounced(
+        kind: str = HARD_BOUNCE,
+        after_id: int = 0,
+        limit: int = 1000
+    ) -> List[Tuple[Employee, Optional[str], Optional[str]]]:
+        """
+        Empleados con rebotes de un tipo (índice parcial idx_employees_deliverability)
+        
+        Returns:
+            [(empleado, fecha del último rebote, detalle)] en orden de ID
+        """
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT * FROM employees
+            WHERE deliverability = ? AND id > ?
+            ORDER BY id LIMIT ?
+        """, (kind, after_id, limit))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [(_employee_from_row(row), row['bounced_at'], row['bounce_detail']) for row in rows]
+    
+    @staticmethod
+    def reset(employee_ids: Iterable[int]) -> int:
+        """Vuelve a habilitar direcciones (ej: después de corregir el buzón del destinatario)"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE employees
+            SET deliverability = NULL, soft_bounces = 0, bounced_at = NULL, bounce_detail = NULL
+            WHERE id IN (SELECT value FROM json_each(?)) AND deliverability IS NOT NULL
+            RETURNING id
+        """, (json.dumps(list(employee_ids)),))
+        ids = [row['id'] for row in cursor.fetchall()]
+        conn.commit()
+        conn.close()
+        
+        change_bus.publish("employee", UPDATED, ids)
+        return len(ids)
+
+
+@timed_methods(DB_QUERY_SECONDS)
+class MaintenanceRepository:
+    """Mantenimiento del archivo de la base de datos"""
+    
+    @staticmethod
+    def freelist_pages() -> int:
+        """Páginas libres que incremental_vacuum puede devolver al sistema"""
+        conn = DatabaseConfig.get_connection()
+        pages: int = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.close()
+        return pages
+    
+    @staticmethod
+    def incremental_vacuum(pages: int) -> int:
+        """
+        Libera hasta `pages` páginas libres (requiere auto_vacuum=INCREMENTAL)
+        
+        Returns:
+            Páginas liberadas
+        """
+        conn = DatabaseConfig.get_connection()
+        try:
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            # El pragma libera una página por paso y execute() da un solo paso
+            # (no tiene columnas); executescript lo ejecuta hasta el final
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+            after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        finally:
+            conn.close()
+        return before - after
+    
+    @staticmethod
+    def optimize():
+        """Actualiza las estadísticas del planificador donde hace falta (PRAGMA optimize)"""
+        conn = DatabaseConfig.get_connection()
+        conn.execute("PRAGMA optimize")
+        conn.close()
+    
+    @staticmethod
+    def purge_orphans(chunk_size: int = 1000) -> int:
+        """
+        Borra por bloques los empleados cuya empresa ya no existe
+        (los dejaron los borrados anteriores a activar foreign_keys)
+        
+        Returns:
+            Cantidad de empleados borrados
+        """
+        conn = DatabaseConfig.get_connection()
+        total = 0
+        last_id = 0
+        try:
+            while True:
+                rows = conn.execute("""
+                    SELECT id FROM employees e
+                    WHERE id > ? AND NOT EXISTS (SELECT 1 FROM companies c WHERE c.id = e.company_id)
+                    ORDER BY id LIMIT ?
+                """, (last_id, chunk_size)).fetchall()
+                if not rows:
+                    break
+                ids = [row['id'] for row in rows]
+                conn.execute(
+                    "DELETE FROM employees WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(ids),)
+                )
+                conn.commit()
+                change_bus.publish("employee", DELETED, ids)
+                total += len(ids)
+                last_id = ids[-1]
+            
+            conn.execute("""
+                DELETE FROM contact_issues
+                WHERE NOT EXISTS (SELECT 1 FROM employees e WHERE e.id = contact_issues.employee_id)
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+        return total
+
+
+@timed_methods(DB_QUERY_SECONDS)
+class SegmentRepository:
+    """Consultas de audiencia sobre segmentos de empleados de varias empresas"""
+    
+    @staticmethod
+    @traced(category="db")
+    def count(segment: Segment) -> int:
+        """Cantidad de empleados del segmento (vista previa de la audiencia)"""
+        conditions, params = _segment_clauses(segment)
+        
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(f"SELECT COUNT(*) FROM employees {_where(conditions)}", params)
+        count: int = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    @staticmethod
+    @traced(category="db")
+    def count_by_company(segment: Segment) -> List[Tuple[Company, int]]:
+        """Empresas con al menos un empleado en el segmento y cuántos tiene cada una"""
+        conditions, params = _segment_clauses(segment)
+        
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(f"""
+            SELECT company_id, COUNT(*) AS audience FROM employees
+            {_where(conditions)}
+            GROUP BY company_id
+        """, params)
+        counts = {row['company_id']: row['audience'] for row in cursor.fetchall()}
+        conn.close()
+        
+        companies = CompanyRepository.read_many(counts.keys())
+        return [(company, counts[company.id]) for company in sorted(companies, key=lambda c: c.name)]
+    
+    @staticmethod
+    @traced(category="db")
+    def read_page(segment: Segment, after_id: Optional[int], limit: int) -> List[Employee]:
+        """Página de empleados del segmento en orden de ID, a partir de after_id"""
+        conditions, params = _segment_clauses(segment)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+        
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            f"SELECT * FROM employees {_where(conditions)} ORDER BY id ASC LIMIT ?",
+            (*params, limit)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [_employee_from_row(row) for row in rows]
+    
+    @staticmethod
+    def iter_employees(segment: Segment, chunk_size: int = 500) -> Iterator[List[Employee]]:
+        """
+        Recorre los empleados del segmento por bloques (en orden de ID)
+        Cada bloque es una consulta por clave, como iter_by_company
+        """
+        after_id = None
+        while True:
+            employees = SegmentRepository.read_page(segment, after_id, chunk_size)
+            if not employees:
+                return
+            yield employees
+            if len(employees) < chunk_size:
+                return
+            after_id = employees[-1].id
+
+
+@timed_methods(DB_QUERY_SECONDS)
+class CampaignRepository:
+    """Operaciones sobre campañas programadas"""
+    
+    @staticmethod
+    def create(campaign: Campaign) -> int:
+        """Programa una campaña, retorna su ID"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO scheduled_campaigns (name, template, subject, segment, due_at, attachments)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            campaign.name, campaign.template, campaign.subject,
+            json.dumps(campaign.segment.to_dict()), campaign.due_at,
+            json.dumps(campaign.attachments) if campaign.attachments else None
+        ))
+        
+        campaign_id: int = cursor.lastrowid or 0
+        conn.commit()
+        conn.close()
+        change_bus.publish("campaign", INSERTED, [campaign_id])
+        return campaign_id
+    
+    @staticmethod
+    def read(campaign_id: int) -> Optional[Campaign]:
+        """Obtiene una campaña por ID"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM scheduled_campaigns WHERE id = ?", (campaign_id,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        return _campaign_from_row(row) if row else None
+    
+    @staticmethod
+    def read_all(limit: int = 500) -> List[Campaign]:
+        """Campañas más recientes primero (por fecha programada)"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT * FROM scheduled_campaigns ORDER BY due_at DESC, id DESC LIMIT ?", (limit,)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [_campaign_from_row(row) for row in rows]
+    
+    @staticmethod
+    def read_pending() -> List[Campaign]:
+        """Campañas pendientes en orden de fecha programada"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT * FROM scheduled_campaigns WHERE status = ? ORDER BY due_at ASC, id ASC",
+            (PENDING,)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [_campaign_from_row(row) for row in rows]
+    
+    @staticmethod
+    def _set_status(campaign_id: int, sql: str, params: tuple) -> bool:
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(sql, params)
+        success = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        if success:
+            change_bus.publish("campaign", UPDATED, [campaign_id])
+        return success
+    
+    @staticmethod
+    def claim(campaign_id: int, owner: Optional[str] = None) -> bool:
+        """
+        Marca una campaña pendiente como en curso por un programador (owner)
+        Retorna False si ya no estaba pendiente (cancelada o tomada por otro proceso)
+        """
+        return CampaignRepository._set_status(campaign_id, """
+            UPDATE scheduled_campaigns
+            SET status = ?, claimed_by = ?, started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = ?
+        """, (RUNNING, owner, campaign_id, PENDING))
+    
+    @staticmethod
+    def heartbeat(owner: str) -> int:
+        """Renueva el latido de las campañas en curso de un programador, retorna cuántas son"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE scheduled_campaigns SET heartbeat_at = CURRENT_TIMESTAMP
+            WHERE status = ? AND claimed_by = ?
+        """, (RUNNING, owner))
+        count = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return count
+    
+    @staticmethod
+    def finish(campaign_id: int, status: str, sent: int = 0, failed: int = 0,
+               excluded: int = 0, error: Optional[str] = None) -> bool:
+        """Registra el resultado de una campaña"""
+        return CampaignRepository._set_status(campaign_id, """
+            UPDATE scheduled_campaigns
+            SET status = ?, sent = ?, failed = ?, excluded = ?, error = ?,
+                finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (status, sent, failed, excluded, error, campaign_id))
+    
+    @staticmethod
+    def reschedule(campaign_id: int, due_at: str) -> bool:
+        """Cambia la fecha de una campaña pendiente"""
+        return CampaignRepository._set_status(campaign_id, """
+            UPDATE scheduled_campaigns SET due_at = ? WHERE id = ? AND status = ?
+        """, (due_at, campaign_id, PENDING))
+    
+    @staticmethod
+    def cancel(campaign_id: int) -> bool:
+        """Cancela una campaña pendiente"""
+        return CampaignRepository._set_status(campaign_id, """
+            UPDATE scheduled_campaigns SET status = ?, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = ?
+        """, (CANCELLED, campaign_id, PENDING))
+    
+    @staticmethod
+    def fail_interrupted(stale_seconds: float) -> int:
+        """
+        Marca como fallidas las campañas en curso sin latido hace más de stale_seconds
+        
+        Son las de un programador que se cerró enviando; las de otro
+        programador vivo (ej: la aplicación y `schedule run` sobre la misma
+        base) siguen latiendo y no se tocan. No se vuelven a pendientes:
+        parte de la audiencia ya recibió el mensaje y repetirla duplicaría
+        los envíos.
+        """
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        stale = f"-{int(stale_seconds)} seconds"
+        cursor.execute("""
+            UPDATE scheduled_campaigns
+            SET status = ?, error = 'Interrumpida: la aplicación se cerró durante el envío',
+                finished_at = CURRENT_TIMESTAMP
+            WHERE status = ? AND COALESCE(heartbeat_at, started_at, created_at) < datetime('now', ?)
+            RETURNING id
+        """, (FAILED, RUNNING, stale))
+        ids = [row['id'] for row in cursor.fetchall()]
+        conn.commit()
+        conn.close()
+        if ids:
+            change_bus.publish("campaign", UPDATED, ids)
+        return len(ids)
+
+
+# Columnas de totales de las tablas delivery_stats_*
+STATS_COLUMNS = "sent, failed, excluded"
+
+
+def _stats_from_row(row) -> DeliveryStats:
+    return DeliveryStats(sent=row['sent'] or 0, failed=row['failed'] or 0, excluded=row['excluded'] or 0)
+
+
+@timed_methods(DB_QUERY_SECONDS)
+class DeliveryRepository:
+    """
+    Registro de envíos (delivery_log) y sus resúmenes
+    
+    delivery_stats_campaign, delivery_stats_company_day y delivery_stats_day
+    se actualizan en la misma transacción que el registro, con un upsert
+    por clave del lote: las estadísticas se leen de esas tablas sin
+    recorrer delivery_log. Los días son UTC, como sent_at.
+    """
+    
+    @staticmethod
+    def record(deliveries: Iterable[Delivery]) -> int:
+        """
+        Registra el resultado de cada destinatario y suma los totales
+        
+        Returns:
+            Cantidad de filas registradas
+        """
+        deliveries = list(deliveries)
+        if not deliveries:
+            return 0
+        sent_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        day = sent_at[:10]
+        
+        by_campaign: Dict[int, DeliveryStats] = {}
+        by_company: Dict[int, DeliveryStats] = {}
+        totals = DeliveryStats()
+        for delivery in deliveries:
+            if delivery.campaign_id is not None:
+                by_campaign.setdefault(delivery.campaign_id, DeliveryStats()).add(delivery.status)
+            by_company.setdefault(delivery.company_id, DeliveryStats()).add(delivery.status)
+            totals.add(delivery.status)
+        
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.executemany("""
+            INSERT INTO delivery_log (campaign_id, company_id, employee_id, email, status, sent_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            (d.campaign_id, d.company_id, d.employee_id, d.email, d.status, sent_at)
+            for d in deliveries
+        ))
+        
+        updates = """
+            DO UPDATE SET sent = sent + excluded.sent, failed = failed + excluded.failed,
+                          excluded = excluded + excluded.excluded
+        """
+        cursor.executemany(f"""
+            INSERT INTO delivery_stats_campaign (campaign_id, {STATS_COLUMNS}) VALUES (?, ?, ?, ?)
+            ON CONFLICT(campaign_id) {updates}
+        """, ((key, s.sent, s.failed, s.excluded) for key, s in by_campaign.items()))
+        cursor.executemany(f"""
+            INSERT INTO delivery_stats_company_day (company_id, day, {STATS_COLUMNS}) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(company_id, day) {updates}
+        """, ((key, day, s.sent, s.failed, s.excluded) for key, s in by_company.items()))
+        cursor.execute(f"""
+            INSERT INTO delivery_stats_day (day, {STATS_COLUMNS}) VALUES (?, ?, ?, ?)
+            ON CONFLICT(day) {updates}
+        """, (day, totals.sent, totals.failed, totals.excluded))
+        
+        conn.commit()
+        conn.close()
+        return len(deliveries)
+    
+    @staticmethod
+    @traced(category="db")
+    def stats_for_campaign(campaign_id: int) -> DeliveryStats:
+        """Totales de una campaña programada"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            f"SELECT {STATS_COLUMNS} FROM delivery_stats_campaign WHERE campaign_id = ?",
+            (campaign_id,)
+        )
+        row = cursor.fetchone()
+        conn.close()
+        
+        return _stats_from_row(row) if row else DeliveryStats()
+    
+    @staticmethod
+    @traced(category="db")
+    def stats_for_period(since: str, until: str) -> DeliveryStats:
+        """Totales entre dos días 'AAAA-MM-DD' (ambos incluidos)"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT SUM(sent) AS sent, SUM(failed) AS failed, SUM(excluded) AS excluded
+            FROM delivery_stats_day WHERE day BETWEEN ? AND ?
+        """, (since, until))
+        row = cursor.fetchone()
+        conn.close()
+        
+        return _stats_from_row(row)
+    
+    @staticmethod
+    @traced(category="db")
+    def stats_by_day(since: str, until: str) -> List[Tuple[str, DeliveryStats]]:
+        """Totales por día entre dos días (ambos incluidos)"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            f"SELECT day, {STATS_COLUMNS} FROM delivery_stats_day WHERE day BETWEEN ? AND ? ORDER BY day",
+            (since, until)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [(row['day'], _stats_from_row(row)) for row in rows]
+    
+    @staticmethod
+    @traced(category="db")
+    def stats_by_company(since: str, until: str) -> List[Tuple[int, Optional[str], DeliveryStats]]:
+        """
+        Totales por empresa entre dos días, de mayor a menor cantidad de enviados
+        
+        Returns:
+            (company_id, nombre o None si la empresa ya no existe, totales)
+        """
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT s.company_id, c.name,
+                   SUM(s.sent) AS sent, SUM(s.failed) AS failed, SUM(s.excluded) AS excluded
+            FROM delivery_stats_company_day s LEFT JOIN companies c ON c.id = s.company_id
+            WHERE s.day BETWEEN ? AND ?
+            GROUP BY s.company_id
+            ORDER BY sent DESC, s.company_id
+        """, (since, until))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [(row['company_id'], row['name'], _stats_from_row(row)) for row in rows]
+    
+    @staticmethod
+    @traced(category="db")
+    def stats_by_campaign(limit: int = 100) -> List[Tuple[int, Optional[str], DeliveryStats]]:
+        """
+        Totales de las últimas campañas con envíos
+        
+        Returns:
+            (campaign_id, nombre o None, totales)
+        """
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT s.campaign_id, c.name, s.sent, s.failed, s.excluded
+            FROM delivery_stats_campaign s LEFT JOIN scheduled_campaigns c ON c.id = s.campaign_id
+            ORDER BY s.campaign_id DESC LIMIT ?
+        """, (limit,))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [(row['campaign_id'], row['name'], _stats_from_row(row)) for row in rows]
+    
+    @staticmethod
+    def rebuild_stats():
+        """Recalcula los resúmenes desde delivery_log (ej: después de borrar filas a mano)"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        totals = """
+            SUM(status = 'sent'), SUM(status = 'failed'), SUM(status = 'excluded')
+            FROM delivery_log
+        """
+        cursor.execute("DELETE FROM delivery_stats_campaign")
+        cursor.execute("DELETE FROM delivery_stats_company_day")
+        cursor.execute("DELETE FROM delivery_stats_day")
+        cursor.execute(f"""
+            INSERT INTO delivery_stats_campaign (campaign_id, {STATS_COLUMNS})
+            SELECT campaign_id, {totals} WHERE campaign_id IS NOT NULL GROUP BY campaign_id
+        """)
+        cursor.execute(f"""
+            INSERT INTO delivery_stats_company_day (company_id, day, {STATS_COLUMNS})
+            SELECT company_id, date(sent_at), {totals} GROUP BY company_id, date(sent_at)
+        """)
+        cursor.execute(f"""
+            INSERT INTO delivery_stats_day (day, {STATS_COLUMNS})
+            SELECT date(sent_at), {totals} GROUP BY date(sent_at)
+        """)
+        conn.commit()
+        conn.close()
+
+
+# Columnas de cada entidad en los deltas de ChangeRepository (sin las generadas)
+CHANGE_COLUMNS = {
+    "company": COMPANY_ARCHIVE_COLUMNS,
+    "employee": EMPLOYEE_ARCHIVE_COLUMNS,
+    "template": "id, name, template, created_at",
+}
+
+
+@timed_methods(DB_QUERY_SECONDS)
+class ChangeRepository:
+    """
+    Registro de cambios de empresas, empleados y templates (tabla changes)
+    
+    La tabla la llenan triggers. El token es el seq del último cambio
+    leído: changes_since() recorre solo los cambios posteriores por la
+    PRIMARY KEY, así un sistema externo se pone al día en un tiempo que
+    depende de la cantidad de cambios y no del tamaño de las tablas.
+    Las bases anteriores al registro no tienen cambios de sus filas
+    existentes: la primera sincronización toma current_token() y luego
+    exporta todo.
+    """
+    
+    @staticmethod
+    def _horizon(cursor) -> int:
+        """Token más antiguo desde el que todavía están todos los cambios (ver prune)"""
+        row = cursor.execute("""
+            SELECT (SELECT MIN(seq) FROM changes) AS first,
+                   (SELECT seq FROM sqlite_sequence WHERE name = 'changes') AS last
+        """).fetchone()
+        if row['first'] is not None:
+            return row['first'] - 1
+        return row['last'] or 0
+    
+    @staticmethod
+    @traced(category="db")
+    def current_token() -> int:
+        """Token que deja fuera todos los cambios registrados hasta ahora"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        row = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        conn.close()
+        
+        return row['seq'] if row else 0
+    
+    @staticmethod
+    @traced(category="db")
+    def versions(entity: str, row_ids: Iterable[int]) -> Tuple[int, Dict[int, int]]:
+        """
+        Versión de cada fila: el seq de su último cambio (índice idx_changes_entity_row)
+        
+        Las filas sin cambios registrados (anteriores al registro o ya
+        podados) no aparecen en el dict; por eso también se devuelve el
+        horizonte, que cambia con cada prune().
+        
+        Returns:
+            (horizonte, {id: versión})
+        """
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        horizon = ChangeRepository._horizon(cursor)
+        cursor.execute("""
+            SELECT row_id, MAX(seq) AS version FROM changes
+            WHERE entity = ? AND row_id IN (SELECT value FROM json_each(?))
+            GROUP BY row_id
+        """, (entity, json.dumps(list(row_ids))))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return horizon, {row['row_id']: row['version'] for row in rows}
+    
+    @staticmethod
+    @traced(category="db")
+    def changes_since(token: int, limit: int = 1000) -> Tuple[List[Change], int]:
+        """
+        Cambios posteriores a un token, con la fila actual de cada alta o modificación
+        
+        De cada fila se devuelve solo su último cambio dentro del lote.
+        
+        Args:
+            token: Token de la sincronización anterior (0 = desde el principio)
+            limit: Cantidad máxima de cambios leídos de la tabla
+        
+        Returns:
+            (cambios en orden de seq, token para la próxima llamada);
+            el token no cambia si no hay cambios nuevos
+        
+        Raises:
+            ValueError: Si prune() ya borró cambios posteriores al token
+        """
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        horizon = ChangeRepository._horizon(cursor)
+        if token < horizon:
+            conn.close()
+            raise ValueError(
+                f"El token {token} es anterior a los cambios conservados ({horizon}): "
+                f"hay que sincronizar todo de nuevo"
+            )
+        
+        cursor.execute("""
+            SELECT seq, entity, action, row_id, changed_at FROM changes
+            WHERE seq > ? ORDER BY seq LIMIT ?
+        """, (token, limit))
+        rows = cursor.fetchall()
+        if not rows:
+            conn.close()
+            return [], token
+        
+        latest: Dict[Tuple[str, int], Change] = {}
+        for row in rows:
+            key = (row['entity'], row['row_id'])
+            latest.pop(key, None)  # El orden queda el del último cambio
+            latest[key] = Change(
+                seq=row['seq'],
+                entity=row['entity'],
+                action=row['action'],
+                row_id=row['row_id'],
+                changed_at=row['changed_at']
+            )
+        changes = list(latest.values())
+        
+        # Filas actuales: una consulta por entidad
+        for entity, table in CHANGE_TABLES.items():
+            wanted = {c.row_id: c for c in changes if c.entity == entity and c.action != DELETED}
+            if not wanted:
+                continue
+            cursor.execute(
+                f"SELECT {CHANGE_COLUMNS[entity]} FROM {table} "
+                f"WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(wanted)),)
+            )
+            for row in cursor.fetchall():
+                wanted[row['id']].data = dict(row)
+        conn.close()
+        
+        return changes, rows[-1]['seq']
+    
+    @staticmethod
+    def prune(through_token: int) -> int:
+        """
+        Borra los cambios hasta un token (el de la sincronización más atrasada)
+        
+        Returns:
+            Cantidad de cambios borrados
+        """
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM changes WHERE seq <= ?", (through_token,))
+        count = cursor.rowcount
+        conn.commit()
+        conn.close()
+        
+        return count
+
+
+# Variable que no se guarda por mensaje: su valor es la columna email
+EMAIL_VARIABLE = "{email}"
+SENT_MESSAGE_COLUMNS = "m.*, t.template, t.subject, t.variable_names, t.shared_variables, t.cc"
+
+
+def _sent_message_from_row(row) -> SentMessage:
+    """Construye un SentMessage a partir de sent_messages unida con sent_templates"""
+    variables = {}
+    if row['variable_values'] is not None:
+        shared = json.loads(row['shared_variables'])
+        values = iter(json.loads(row['variable_values']))
+        for name in json.loads(row['variable_names']):
+            if name in shared:
+                variables[name] = shared[name]
+            elif name == EMAIL_VARIABLE:
+                variables[name] = row['email']
+            else:
+                variables[name] = next(values)
+    cc = json.loads(row['cc']) if row['cc'] is not None else None
+    return SentMessage(
+        id=row['id'],
+        campaign_id=row['campaign_id'],
+        company_id=row['company_id'],
+        employee_id=row['employee_id'],
+        email=row['email'],
+        variables=variables,
+        body=zlib.decompress(row['body']).decode("utf-8") if row['body'] is not None else None,
+        template=row['template'],
+        subject=row['subject'],
+        sent_at=row['sent_at'],
+        cc=[e for e in cc["recipients"] if e != row['email']] if cc else None,
+        cc_company=cc["company"] if cc else None
+    )
+
+
+@timed_methods(DB_QUERY_SECONDS)
+class MessageArchiveRepository:
+    """
+    Copias de los mensajes enviados (sent_templates y sent_messages)
+    
+    El template, el asunto y las variables comunes a todo el envío se
+    guardan una vez (sent_templates, por digest). De cada mensaje solo
+    se guardan los valores propios del destinatario, en un array JSON
+    ({email} sale de la columna email). Los mensajes que no se pueden
+    reproducir así guardan el texto completo comprimido con zlib.
+    """
+    
+    @staticmethod
+    def record(
+        template: str,
+        subject: Optional[str],
+        variable_names: List[str],
+        messages: Iterable[SentMessage],
+        shared: Optional[Dict[str, str]] = None,
+        cc: Optional[Tuple[str, List[str]]] = None
+    ) -> int:
+        """
+        Archiva los mensajes de un envío
+        
+        Args:
+            template: Template con el que se renderizaron
+            subject: Asunto
+            variable_names: Variables que usa el template, en el orden en que se reemplazan
+            messages: Mensajes enviados (con variables, o con body si no se pueden re-renderizar)
+            shared: Variables con el mismo valor en todos los mensajes (ej: {empresa})
+            cc: (empresa, destinatarios) si cada mensaje llevó al resto en CC; la
+                aclaración del final se reconstruye al leerlo (no aplica a los que tienen body)
+        
+        Returns:
+            Cantidad de mensajes archivados
+        """
+        messages = list(messages)
+        if not messages:
+            return 0
+        shared = shared or {}
+        own_names = [name for name in variable_names if name not in shared and name != EMAIL_VARIABLE]
+        shared_json = json.dumps(shared, ensure_ascii=False, sort_keys=True)
+        cc_json = json.dumps(
+            {"company": cc[0], "recipients": list(cc[1])}, ensure_ascii=False
+        ) if cc is not None else None
+        # Sin CC el digest es el mismo que antes de existir la columna cc
+        key = [subject, variable_names, shared_json, template] + ([cc_json] if cc_json is not None else [])
+        digest = hashlib.sha256(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+        sent_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO sent_templates (digest, subject, template, variable_names, shared_variables, cc)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(digest) DO NOTHING
+        """, (digest, subject, template, json.dumps(variable_names, ensure_ascii=False), shared_json, cc_json))
+        template_id = cursor.execute(
+            "SELECT id FROM sent_templates WHERE digest = ?", (digest,)
+        ).fetchone()[0]
+        
+        cursor.executemany("""
+            INSERT INTO sent_messages
+                (template_id, campaign_id, company_id, employee_id, email, variable_values, body, sent_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, ((
+            template_id, m.campaign_id, m.company_id, m.employee_id, m.email,
+            None if m.body is not None else json.dumps(
+                [m.variables[name] for name in own_names], ensure_ascii=False, separators=(",", ":")
+            ),
+            zlib.compress(m.body.encode("utf-8")) if m.body is not None else None,
+            sent_at
+        ) for m in messages))
+        
+        conn.commit()
+        conn.close()
+        return len(messages)
+    
+    @staticmethod
+    @traced(category="db")
+    def read(message_id: int) -> Optional[SentMessage]:
+        """Obtiene un mensaje archivado por ID"""
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(f"""
+            SELECT {SENT_MESSAGE_COLUMNS}
+            FROM sent_messages m JOIN sent_templates t ON t.id = m.template_id
+            WHERE m.id = ?
+        """, (message_id,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        return _sent_message_from_row(row) if row else None
+    
+    @staticmethod
+    @traced(category="db")
+    def read_page(
+        before_id: Optional[int] = None,
+        limit: int = 100,
+        email: Optional[str] = None,
+        campaign_id: Optional[int] = None
+    ) -> List[SentMessage]:
+        """
+        Mensajes archivados, los más recientes primero (paginado por clave)
+        
+        Args:
+            before_id: ID del último mensaje ya leído (None = desde el más reciente)
+            limit: Cantidad máxima de mensajes
+            email: Solo los enviados a este email
+            campaign_id: Solo los de esta campaña
+        """
+        conditions, params = [], []
+        if before_id is not None:
+            conditions.append("m.id < ?")
+            params.append(before_id)
+        if email is not None:
+            conditions.append("m.email = ?")
+            params.append(email)
+        if campaign_id is not None:
+            conditions.append("m.campaign_id = ?")
+            params.append(campaign_id)
+        
+        conn = DatabaseConfig.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(f"""
+            SELECT {SENT_MESSAGE_COLUMNS}
+            FROM sent_messages m JOIN sent_templates t ON t.id = m.template_id
+            {_where(conditions)} ORDER BY m.id DESC LIMIT ?
+        """, (*params, limit))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [_sent_message_from_row(row) for row in rows]
@@ -0,0 +1,149 @@
+"""
+Motores de almacenamiento de los repositorios
+Se elige uno con APP_STORAGE (o DatabaseConfig.use_backend):
+    
+    sqlite            Archivo SQLite en DB_PATH (por defecto)
+    sqlite:RUTA       Archivo SQLite en RUTA
+    memory[:NOMBRE]   SQLite en memoria compartida entre conexiones
+    dict              Diccionarios e índices en Python, sin SQL (solo benchmarks)
+"""
+import itertools
+import os
+import sqlite3
+from pathlib import Path
+from typing import Optional, Union
+
+
+class StorageBackend:
+    """Base de los motores: entrega conexiones SQLite o un store propio por repositorio"""
+    kind = ""
+    # False si el motor no tiene tablas SQL (init_database no hace nada)
+    uses_sql = True
+    
+    def connect(self, default_path: Path, factory=sqlite3.Connection) -> sqlite3.Connection:
+        """Abre una conexión nueva (default_path es DB_PATH al momento de llamar)"""
+        raise NotImplementedError
+    
+    def store(self, repository: str):
+        """Implementación propia de un repositorio (por nombre de clase), o None para usar SQL"""
+        return None
+    
+    def close(self):
+        pass
+    
+    def describe(self) -> str:
+        return self.kind
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    SQLite en un archivo
+    Sin path sigue a DB_PATH, así --db y use_database() lo siguen moviendo
+    """
+    kind = "sqlite"
+    
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+    
+    def connect(self, default_path: Path, factory=sqlite3.Connection) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path or default_path), factory=factory)
+    
+    def describe(self) -> str:
+        return f"sqlite:{self.path}" if self.path else self.kind
+
+
+class MemoryBackend(StorageBackend):
+    """
+    SQLite en memoria (file:NOMBRE?mode=memory&cache=shared)
+    
+    Todas las conexiones del proceso con el mismo nombre ven la misma base.
+    Una conexión ancla queda abierta mientras viva el motor: SQLite
+    descarta la base al cerrarse la última conexión. La caché compartida
+    bloquea por tabla, así que una escritura concurrente con una lectura
+    falla con "database table is locked" en lugar de esperar; alcanza
+    para tests y benchmarks, no para la aplicación con hilos de carga.
+    """
+    kind = "memory"
+    _names = itertools.count(1)
+    
+    def __init__(self, name: Optional[str] = None):
+        self.name = name or f"app-{os.getpid()}-{next(MemoryBackend._names)}"
+        self.uri = f"file:{self.name}?mode=memory&cache=shared"
+        self._anchor: Optional[sqlite3.Connection] = sqlite3.connect(
+            self.uri, uri=True, check_same_thread=False
+        )
+    
+    def connect(self, default_path: Path, factory=sqlite3.Connection) -> sqlite3.Connection:
+        return sqlite3.connect(self.uri, uri=True, factory=factory)
+    
+    def load(self, path: Union[str, Path]):
+        """Reemplaza el contenido con una copia de un archivo SQLite (API de backup)"""
+        source = sqlite3.connect(str(path))
+        try:
+            source.backup(self._anchor)
+        finally:
+            source.close()
+    
+    def close(self):
+        if self._anchor is not None:
+            self._anchor.close()
+            self._anchor = None
+    
+    def describe(self) -> str:
+        return f"memory:{self.name}"
+
+
+class DictBackend(StorageBackend):
+    """
+    Diccionarios con índices secundarios en el proceso (ver db/dict_store.py)
+    
+    Implementa CompanyRepository, EmployeeRepository y
+    MessageTemplateRepository; el resto de los repositorios necesita SQL
+    y falla al pedir una conexión.
+    """
+    kind = "dict"
+    uses_sql = False
+    
+    def __init__(self):
+        from db.dict_store import DictStore
+        self.data = DictStore()
+    
+    def connect(self, default_path: Path, factory=sqlite3.Connection) -> sqlite3.Connection:
+        raise NotImplementedError(
+            "El motor dict no usa SQL: solo implementa CompanyRepository, "
+            "EmployeeRepository y MessageTemplateRepository"
+        )
+    
+    def store(self, repository: str):
+        return self.data.stores.get(repository)
+    
+    def load(self, path: Union[str, Path]):
+        """Reemplaza el contenido con las filas de un archivo SQLite"""
+        self.data.load(path)
+
+
+def backend_from_url(url: str, allow_dict: bool = False) -> StorageBackend:
+    """
+    Crea un motor a partir de su descripción (ver el docstring del módulo)
+    
+    Args:
+        url: Descripción del motor
+        allow_dict: Acepta el motor dict (solo lo piden los benchmarks: sin
+            SQL, la aplicación y la CLI fallarían en los demás repositorios)
+    
+    Raises:
+        ValueError: Si el motor no existe o es dict sin allow_dict
+    """
+    kind, _, arg = url.strip().partition(":")
+    if kind == "sqlite":
+        return SQLiteBackend(arg or None)
+    if kind == "memory":
+        return MemoryBackend(arg or None)
+    if kind == "dict" and not arg:
+        if not allow_dict:
+            raise ValueError(
+                "El motor dict solo sirve para los benchmarks (--storage dict): "
+                "usar sqlite[:ruta] o memory[:nombre]"
+            )
+        return DictBackend()
+    raise ValueError(f"Motor de almacenamiento desconocido: {url} (sqlite[:ruta], memory[:nombre] o dict)")
@@ -1,25 +1,90 @@
 """
 Punto de entrada de la aplicación
+
+Uso:
+    python main.py                      # Abre la aplicación
+    python main.py --startup-report     # Mide el arranque y sale
+    python main.py --sql-trace [ARCHIVO] [--slow-ms N]
+                                        # Registra las consultas SQL (Ctrl+Shift+Q
+                                        # abre el panel; ARCHIVO recibe el JSON al salir)
+    python main.py --trace ARCHIVO      # Guarda las trazas (Chrome trace JSON) al salir
+    python main.py --metrics-port PUERTO
+                                        # Expone las métricas en http://127.0.0.1:PUERTO/metrics
+    python main.py --stall-ms N [--stall-log ARCHIVO]
+                                        # Umbral de los bloqueos de la interfaz que se registran
+                                        # (por defecto 500 ms en stalls.log; 0 desactiva)
 """
+import time
+STARTED_AT = time.perf_counter()
+
+import argparse
 import sys
-from PyQt6.QtWidgets import QApplication
+from PyQt6.QtWidgets import QApplication, QMessageBox
+from config import database
 from config.database import DatabaseConfig
+from config.tracing import tracer
+from db.query_log import query_log
 from ui.main_window import MainWindow
 
 
+def parse_args():
+    """Opciones propias; el resto de los argumentos se pasa a Qt"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--startup-report", action="store_true")
+    parser.add_argument("--sql-trace", nargs="?", const="", default=None, metavar="ARCHIVO")
+    parser.add_argument("--slow-ms", type=float, default=None)
+    parser.add_argument("--trace", default=None, metavar="ARCHIVO")
+    parser.add_argument("--metrics-port", type=int, default=None, metavar="PUERTO")
+    parser.add_argument("--stall-ms", type=float, default=500.0)
+    parser.add_argument("--stall-log", default=None, metavar="ARCHIVO")
+    args, qt_args = parser.parse_known_args()
+    return args, sys.argv[:1] + qt_args
+
+
 def main():
     """Función principal"""
-    # Inicializar BD
-    DatabaseConfig.init_database()
+    args, qt_args = parse_args()
+    if args.sql_trace is not None:
+        query_log.enable(args.slow_ms)
+    if args.trace:
+        tracer.enable()
+    if args.metrics_port is not None:
+        from config.metrics import start_http_server
+        start_http_server(args.metrics_port)
     
     # Crear app
-    app = QApplication(sys.argv)
+    app = QApplication(qt_args)
+    
+    # Inicializar BD
+    try:
+        DatabaseConfig.init_database()
+    except ValueError as e:
+        # APP_STORAGE inválido o dict (sin SQL): avisar en lugar de fallar más tarde
+        QMessageBox.critical(None, "Error", f"No se pudo abrir la base de datos:\n{e}")
+        sys.exit(1)
     
     # Crear y mostrar ventana principal
     window = MainWindow()
+    if args.startup_report:
+        from ui.startup_report import StartupReport
+        StartupReport(window, STARTED_AT)
     window.show()
     
-    sys.exit(app.exec())
+    watchdog = None
+    if args.stall_ms > 0:
+        from ui.watchdog import StallWatchdog
+        log_path = args.stall_log or database.DB_PATH.parent / "stalls.log"
+        watchdog = StallWatchdog(app, log_path, args.stall_ms)
+        watchdog.start()
+    
+    exit_code = app.exec()
+    if watchdog is not None:
+        watchdog.stop()
+    if args.sql_trace:
+        query_log.dump(args.sql_trace)
+    if args.trace:
+        tracer.export(args.trace)
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
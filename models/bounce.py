@@ -0,0 +1,29 @@
+"""
+Modelo de datos para rebotes de email (DSN)
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+# Estado de entrega de un empleado (columna employees.deliverability; NULL = sin rebotes)
+HARD_BOUNCE = "hard_bounce"  # Rechazo permanente: no se le vuelve a enviar
+SOFT_BOUNCE = "soft_bounce"  # Rechazo temporal
+
+# Rebotes temporales seguidos que pasan la dirección a HARD_BOUNCE
+SOFT_BOUNCE_LIMIT = 3
+
+
+@dataclass
+class Bounce:
+    """Un destinatario rechazado según un aviso de no entrega"""
+    email: str
+    kind: str  # HARD_BOUNCE o SOFT_BOUNCE
+    status: Optional[str] = None  # Código de estado del DSN (ej: 5.1.1)
+    diagnostic: Optional[str] = None  # Respuesta del servidor remoto
+    
+    def to_dict(self) -> dict:
+        return {
+            'email': self.email,
+            'kind': self.kind,
+            'status': self.status,
+            'diagnostic': self.diagnostic
+        }
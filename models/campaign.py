@@ -0,0 +1,74 @@
+"""
+Modelo de datos para Campaña programada
+"""
+import calendar
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from models.segment import Segment
+
+# Formato de due_at: UTC, igual que CURRENT_TIMESTAMP de SQLite
+DUE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Estados de una campaña
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+def to_due_at(when: datetime) -> str:
+    """Convierte una fecha (naive = hora local) al formato UTC de due_at"""
+    return when.astimezone(timezone.utc).strftime(DUE_FORMAT)
+
+
+@dataclass
+class Campaign:
+    """Envío de un template a un segmento, programado para una fecha"""
+    name: str
+    template: str
+    segment: Segment
+    due_at: str  # UTC 'AAAA-MM-DD HH:MM:SS' (ver to_due_at)
+    subject: Optional[str] = None  # None = 'Mensaje de <empresa>'
+    # Rutas de los adjuntos (se leen y codifican una vez al enviar)
+    attachments: List[str] = field(default_factory=list)
+    status: str = PENDING
+    sent: int = 0
+    failed: int = 0
+    excluded: int = 0
+    error: Optional[str] = None
+    id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    @property
+    def due_timestamp(self) -> float:
+        """due_at como timestamp (segundos desde epoch)"""
+        return calendar.timegm(time.strptime(self.due_at, DUE_FORMAT))
+    
+    def local_due_at(self) -> str:
+        """due_at en hora local, para mostrar"""
+        return datetime.fromtimestamp(self.due_timestamp).strftime("%Y-%m-%d %H:%M")
+    
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'template': self.template,
+            'segment': self.segment.to_dict(),
+            'due_at': self.due_at,
+            'subject': self.subject,
+            'attachments': self.attachments,
+            'status': self.status,
+            'sent': self.sent,
+            'failed': self.failed,
+            'excluded': self.excluded,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
@@ -0,0 +1,32 @@
+"""
+Modelo de datos para el registro de cambios (sincronización por deltas)
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class Change:
+    """
+    Último cambio de una fila dentro de un lote de changes_since()
+    
+    data es la fila actual para inserted/updated (None si la fila se borró
+    después; el delete llega en un lote posterior). Un sistema externo
+    aplica inserted/updated como upsert y deleted como borrado.
+    """
+    seq: int
+    entity: str  # "company", "employee" o "template" (como en db/events.py)
+    action: str  # INSERTED, UPDATED o DELETED
+    row_id: int
+    changed_at: Optional[str] = None
+    data: Optional[dict] = None
+    
+    def to_dict(self) -> dict:
+        return {
+            'seq': self.seq,
+            'entity': self.entity,
+            'action': self.action,
+            'id': self.row_id,
+            'changed_at': self.changed_at,
+            'data': self.data
+        }
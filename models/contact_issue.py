@@ -0,0 +1,27 @@
+"""
+Modelo de datos para problemas de contacto detectados
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class ContactIssue:
+    """Problema detectado en los datos de contacto de un empleado"""
+    employee_id: int
+    email: str
+    kind: str  # "invalid_email", "duplicate_email" o "invalid_phone"
+    detail: Optional[str] = None
+    id: Optional[int] = None
+    detected_at: Optional[datetime] = None
+    
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'employee_id': self.employee_id,
+            'email': self.email,
+            'kind': self.kind,
+            'detail': self.detail,
+            'detected_at': self.detected_at
+        }
@@ -0,0 +1,56 @@
+"""
+Modelo de datos para el registro de envíos
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+# Resultado de cada destinatario
+SENT = "sent"
+FAILED = "failed"
+EXCLUDED = "excluded"  # Marcado por la validación de contactos
+
+
+@dataclass
+class Delivery:
+    """Un destinatario de un envío (una fila de delivery_log)"""
+    company_id: int
+    email: str
+    status: str  # SENT, FAILED o EXCLUDED
+    employee_id: Optional[int] = None
+    campaign_id: Optional[int] = None  # None = envío inmediato desde la interfaz o la CLI
+    id: Optional[int] = None
+    sent_at: Optional[datetime] = None
+    
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'campaign_id': self.campaign_id,
+            'company_id': self.company_id,
+            'employee_id': self.employee_id,
+            'email': self.email,
+            'status': self.status,
+            'sent_at': self.sent_at
+        }
+
+
+@dataclass
+class DeliveryStats:
+    """Totales de envíos de una campaña, empresa o período"""
+    sent: int = 0
+    failed: int = 0
+    excluded: int = 0
+    
+    @property
+    def total(self) -> int:
+        return self.sent + self.failed + self.excluded
+    
+    def add(self, status: str, amount: int = 1):
+        setattr(self, status, getattr(self, status) + amount)
+    
+    def to_dict(self) -> dict:
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'excluded': self.excluded
+        }
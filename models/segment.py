@@ -0,0 +1,86 @@
+"""
+Modelo de datos para Segmento de audiencia
+"""
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import List, Optional
+
+# Formato de created_from y created_to
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def is_date(value: str) -> bool:
+    """Indica si value es una fecha 'AAAA-MM-DD' válida"""
+    try:
+        datetime.strptime(value, DATE_FORMAT)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+@dataclass
+class Segment:
+    """
+    Audiencia definida por filtros sobre los empleados de varias empresas
+    
+    Cada lista vacía significa "sin filtro" (ej: sin company_ids son todas
+    las empresas). Las fechas son 'AAAA-MM-DD' y ambas se incluyen.
+    """
+    company_ids: List[int] = field(default_factory=list)
+    positions: List[str] = field(default_factory=list)
+    domains: List[str] = field(default_factory=list)
+    created_from: Optional[str] = None
+    created_to: Optional[str] = None
+    
+    def __post_init__(self):
+        self.validate()
+    
+    def validate(self):
+        """
+        Verifica las fechas (una fecha inválida compararía como texto y no coincidiría con nada)
+        
+        Raises:
+            ValueError: Si created_from o created_to no son 'AAAA-MM-DD'
+        """
+        for name in ("created_from", "created_to"):
+            value = getattr(self, name)
+            if value and not is_date(value):
+                raise ValueError(f"{name} debe ser una fecha AAAA-MM-DD: {value!r}")
+    
+    def for_company(self, company_id: int) -> "Segment":
+        """El mismo segmento restringido a una empresa"""
+        return replace(self, company_ids=[company_id])
+    
+    def describe(self) -> str:
+        """Resumen legible de los filtros"""
+        parts = []
+        if self.company_ids:
+            parts.append(f"{len(self.company_ids)} empresa(s)")
+        if self.positions:
+            parts.append("posición: " + ", ".join(self.positions))
+        if self.domains:
+            parts.append("dominio: " + ", ".join(self.domains))
+        if self.created_from:
+            parts.append(f"desde {self.created_from}")
+        if self.created_to:
+            parts.append(f"hasta {self.created_to}")
+        return " · ".join(parts) or "Todos los empleados"
+    
+    @staticmethod
+    def from_dict(data: dict) -> "Segment":
+        return Segment(
+            company_ids=list(data.get('company_ids') or []),
+            positions=list(data.get('positions') or []),
+            domains=list(data.get('domains') or []),
+            created_from=data.get('created_from'),
+            created_to=data.get('created_to')
+        )
+    
+    def to_dict(self) -> dict:
+        return {
+            'company_ids': self.company_ids,
+            'positions': self.positions,
+            'domains': self.domains,
+            'created_from': self.created_from,
+            'created_to': self.created_to
+        }
@@ -0,0 +1,43 @@
+"""
+Modelo de datos para el archivo de mensajes enviados
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class SentMessage:
+    """
+    Copia archivada de un mensaje enviado
+    
+    El texto no se guarda: se vuelve a renderizar con el template (guardado
+    una vez por envío) y los valores de las variables del destinatario.
+    body solo está cargado si el texto no se podía reproducir así.
+    Si el envío puso al resto en CC, cc tiene esos emails y cc_company la
+    empresa de la aclaración que se agregó al final (ver EmailService.cc_footer).
+    """
+    company_id: int
+    email: str
+    variables: Dict[str, str] = field(default_factory=dict)  # Solo las que usa el template
+    body: Optional[str] = None
+    template: Optional[str] = None
+    subject: Optional[str] = None
+    employee_id: Optional[int] = None
+    campaign_id: Optional[int] = None
+    id: Optional[int] = None
+    sent_at: Optional[str] = None
+    cc: Optional[List[str]] = None
+    cc_company: Optional[str] = None
+    
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'campaign_id': self.campaign_id,
+            'company_id': self.company_id,
+            'employee_id': self.employee_id,
+            'email': self.email,
+            'subject': self.subject,
+            'variables': self.variables,
+            'cc': self.cc,
+            'sent_at': self.sent_at
+        }
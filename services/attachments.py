@@ -0,0 +1,81 @@
+"""
+Archivos adjuntos de los envíos
+Cada archivo se lee con mmap y se codifica en base64 una sola vez: la parte
+MIME resultante se comparte entre los mensajes de todos los destinatarios
+(build_message la agrega sin copiarla ni volver a codificarla).
+"""
+import base64
+import mimetypes
+import mmap
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Union
+
+# Límites sobre el tamaño original (base64 agrega un 33%): el total
+# codificado queda por debajo de los 20 MB de Outlook (Gmail admite 25 MB)
+MAX_ATTACHMENT_BYTES = 10 * 1024 * 1024
+MAX_TOTAL_BYTES = 14 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class Attachment:
+    """Archivo adjunto ya codificado, listo para agregar a cualquier cantidad de mensajes"""
+    path: str  # Ruta absoluta (la que guarda una campaña programada)
+    filename: str
+    content_type: str
+    size: int  # Bytes del archivo original
+    part: object  # email.mime.base.MIMEBase con el contenido en base64
+    
+    @staticmethod
+    def load(path: Union[str, Path]) -> "Attachment":
+        """
+        Lee y codifica un archivo
+        
+        Raises:
+            FileNotFoundError: Si el archivo no existe
+            ValueError: Si supera MAX_ATTACHMENT_BYTES
+        """
+        from email.mime.base import MIMEBase
+        
+        path = Path(path)
+        size = path.stat().st_size
+        if size > MAX_ATTACHMENT_BYTES:
+            raise ValueError(
+                f"{path.name} pesa {size / 1048576:.1f} MB "
+                f"(máximo {MAX_ATTACHMENT_BYTES // 1048576} MB por adjunto)"
+            )
+        
+        # mmap evita copiar el archivo a un bytes intermedio antes de codificarlo
+        with open(path, "rb") as f:
+            if size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    encoded = base64.encodebytes(data)
+            else:
+                encoded = b""  # mmap no admite archivos vacíos
+        
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        maintype, subtype = content_type.split("/", 1)
+        part = MIMEBase(maintype, subtype)
+        part.set_payload(encoded.decode("ascii"))
+        part["Content-Transfer-Encoding"] = "base64"
+        part.add_header("Content-Disposition", "attachment", filename=path.name)
+        return Attachment(str(path.resolve()), path.name, content_type, size, part)
+
+
+def load_attachments(paths: Iterable[Union[str, Path]]) -> List[Attachment]:
+    """
+    Lee y codifica los adjuntos de un envío (una vez para todos los destinatarios)
+    
+    Raises:
+        FileNotFoundError: Si algún archivo no existe
+        ValueError: Si algún archivo o el total superan los límites
+    """
+    paths = [Path(p) for p in paths]
+    # Controlar el total antes de leer nada
+    total = sum(path.stat().st_size for path in paths)
+    if total > MAX_TOTAL_BYTES:
+        raise ValueError(
+            f"Los adjuntos suman {total / 1048576:.1f} MB "
+            f"(máximo {MAX_TOTAL_BYTES // 1048576} MB por envío)"
+        )
+    return [Attachment.load(path) for path in paths]
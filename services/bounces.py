@@ -0,0 +1,208 @@
+"""
+Procesamiento de rebotes (avisos de no entrega, DSN)
+Lee los buzones que descarga otra herramienta (fetchmail, getmail, etc.)
+en formato mbox o Maildir, mensaje por mensaje y sin cargarlos enteros,
+y marca el estado de entrega de los empleados por lotes (BounceRepository).
+"""
+import os
+from dataclasses import dataclass
+from email import message_from_bytes
+from email.message import Message
+from email.policy import compat32
+from email.utils import parseaddr
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+from db.repository import BounceRepository
+from models.bounce import Bounce, HARD_BOUNCE, SOFT_BOUNCE
+
+# Largo máximo del diagnóstico guardado por dirección
+MAX_DIAGNOSTIC_CHARS = 200
+
+
+@dataclass
+class BounceReport:
+    """Resultado de procesar un buzón"""
+    messages: int = 0
+    bounces: int = 0
+    hard: int = 0
+    soft: int = 0
+    updated: int = 0
+    
+    def summary(self) -> str:
+        return (
+            f"Mensajes leídos: {self.messages}\n"
+            f"Rebotes: {self.bounces} ({self.hard} permanentes, {self.soft} temporales)\n"
+            f"Empleados actualizados: {self.updated}"
+        )
+
+
+def _recipient(value: Optional[str]) -> Optional[str]:
+    """Dirección de un campo Final-Recipient / Original-Recipient ("rfc822; a@b.com")"""
+    if not value:
+        return None
+    address = parseaddr(value.split(";", 1)[-1].strip())[1]
+    return address.lower() if "@" in address else None
+
+
+def parse_bounces(raw: bytes) -> List[Bounce]:
+    """
+    Destinatarios rechazados según un mensaje (vacío si no es un aviso de no entrega)
+    
+    Lee los bloques message/delivery-status (RFC 3464): Action failed con
+    Status 5.x.x es un rebote permanente y con 4.x.x uno temporal (delayed
+    no cuenta, el servidor sigue reintentando). Sin DSN estructurado se usa
+    el encabezado X-Failed-Recipients (Exim) como rebote permanente.
+    """
+    message = message_from_bytes(raw, policy=compat32)
+    bounces: List[Bounce] = []
+    for part in message.walk():
+        if part.get_content_type() != "message/delivery-status":
+            continue
+        # compat32: un Message por bloque (el primero describe el mensaje, los siguientes cada destinatario)
+        for block in part.get_payload()[1:]:
+            if not isinstance(block, Message):
+                continue
+            action = (block.get("Action") or "").strip().lower()
+            if action != "failed":
+                continue
+            email = _recipient(block.get("Final-Recipient")) or _recipient(block.get("Original-Recipient"))
+            if email is None:
+                continue
+            status = (block.get("Status") or "").strip().split(" ", 1)[0] or None
+            diagnostic = block.get("Diagnostic-Code")
+            if diagnostic:
+                diagnostic = " ".join(diagnostic.split(";", 1)[-1].split())[:MAX_DIAGNOSTIC_CHARS]
+            kind = SOFT_BOUNCE if status and status.startswith("4") else HARD_BOUNCE
+            bounces.append(Bounce(email, kind, status, diagnostic or None))
+    
+    if not bounces and message.get("X-Failed-Recipients"):
+        for address in message.get("X-Failed-Recipients").split(","):
+            email = parseaddr(address.strip())[1].lower()
+            if "@" in email:
+                bounces.append(Bounce(email, HARD_BOUNCE))
+    return bounces
+
+
+def iter_mbox(path: Union[str, Path], offset: int = 0) -> Iterator[Tuple[bytes, int]]:
+    """
+    Mensajes de un mbox desde un offset, leídos línea por línea
+    
+    El último mensaje se entrega solo si termina con la línea en blanco que
+    separa los mensajes: si otra herramienta lo está escribiendo, queda
+    para la próxima lectura.
+    
+    Yields:
+        (mensaje sin la línea "From ", offset donde termina)
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        lines: List[bytes] = []
+        position = offset
+        previous_blank = True
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            if line.startswith(b"From ") and previous_blank:
+                if lines:
+                    yield b"".join(lines), position
+                lines = []
+            else:
+                # ">From " escapado dentro del cuerpo (mboxrd)
+                if line.startswith(b">") and line.lstrip(b">").startswith(b"From "):
+                    line = line[1:]
+                lines.append(line)
+            position = f.tell()
+            previous_blank = line in (b"\n", b"\r\n")
+        if lines and previous_blank:
+            yield b"".join(lines), position
+
+
+class BounceProcessor:
+    """
+    Aplica los rebotes de buzones mbox o Maildir
+    
+    mbox: se guarda el offset leído (bounce_sources) en la misma transacción
+    que cada lote, así volver a procesar el archivo sigue desde ahí; si el
+    archivo se rotó (otro inodo) o se truncó, se vuelve a leer desde el principio.
+    Maildir: se leen los mensajes de new/ y, aplicado cada lote, se pasan
+    a cur/ marcados como leídos.
+    """
+    
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+    
+    def ingest(self, path: Union[str, Path]) -> BounceReport:
+        """
+        Procesa un buzón (Maildir si es un directorio, si no mbox)
+        
+        Raises:
+            FileNotFoundError: Si el buzón no existe
+        """
+        path = Path(path)
+        if path.is_dir():
+            return self._ingest_maildir(path)
+        return self._ingest_mbox(path)
+    
+    def _apply(self, report: BounceReport, bounces: List[Bounce], source=None):
+        updated = BounceRepository.record(bounces, source)
+        report.bounces += len(bounces)
+        report.hard += sum(1 for bounce in bounces if bounce.kind == HARD_BOUNCE)
+        report.soft += sum(1 for bounce in bounces if bounce.kind == SOFT_BOUNCE)
+        report.updated += len(updated)
+    
+    def _ingest_mbox(self, path: Path) -> BounceReport:
+        key = str(path.resolve())
+        stat = path.stat()
+        offset = 0
+        saved = BounceRepository.read_source(key)
+        if saved is not None:
+            inode, saved_offset = saved
+            if inode == stat.st_ino and saved_offset <= stat.st_size:
+                offset = saved_offset
+        
+        report = BounceReport()
+        bounces: List[Bounce] = []
+        pending = 0
+        end = offset
+        for raw, end in iter_mbox(path, offset):
+            report.messages += 1
+            pending += 1
+            bounces.extend(parse_bounces(raw))
+            if pending >= self.batch_size:
+                self._apply(report, bounces, (key, stat.st_ino, end))
+                bounces, pending = [], 0
+        if pending or end != offset or saved is None:
+            self._apply(report, bounces, (key, stat.st_ino, end))
+        return report
+    
+    def _ingest_maildir(self, path: Path) -> BounceReport:
+        new_dir, cur_dir = path / "new", path / "cur"
+        if not new_dir.is_dir():
+            raise FileNotFoundError(f"{path} no es un Maildir (falta new/)")
+        cur_dir.mkdir(exist_ok=True)
+        
+        report = BounceReport()
+        bounces: List[Bounce] = []
+        done: List[str] = []
+        with os.scandir(new_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                with open(entry.path, "rb") as f:
+                    bounces.extend(parse_bounces(f.read()))
+                report.messages += 1
+                done.append(entry.name)
+                if len(done) >= self.batch_size:
+                    self._mark_seen(report, bounces, new_dir, cur_dir, done)
+                    bounces, done = [], []
+        if done:
+            self._mark_seen(report, bounces, new_dir, cur_dir, done)
+        return report
+    
+    def _mark_seen(self, report: BounceReport, bounces: List[Bounce], new_dir: Path, cur_dir: Path, names: List[str]):
+        self._apply(report, bounces)
+        for name in names:
+            # Nombre con la información de Maildir: ":2," + flags (S = leído)
+            os.replace(new_dir / name, cur_dir / f"{name}:2,S")
@@ -0,0 +1,125 @@
+"""
+Validación y normalización masiva de datos de contacto
+Recorre los empleados por bloques y registra los problemas en contact_issues
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from db.repository import EmployeeRepository, ContactIssueRepository
+from models.contact_issue import ContactIssue
+from services.email_service import EMAIL_PATTERN
+
+# Patrones compilados una sola vez
+WHITESPACE_PATTERN = re.compile(r'\s+')
+PHONE_SEPARATORS_PATTERN = re.compile(r'[\s().-]')
+PHONE_PATTERN = re.compile(r'^\+?[0-9]{6,15}$')
+
+
+def normalize_email(email: str) -> str:
+    """Quita espacios y pasa el email a minúsculas"""
+    return WHITESPACE_PATTERN.sub('', email).lower()
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Recorta el teléfono y colapsa los espacios internos"""
+    if phone is None:
+        return None
+    phone = WHITESPACE_PATTERN.sub(' ', phone).strip()
+    return phone or None
+
+
+def is_valid_phone(phone: str) -> bool:
+    """Valida un teléfono: dígitos (6 a 15) con prefijo + y separadores opcionales"""
+    return PHONE_PATTERN.match(PHONE_SEPARATORS_PATTERN.sub('', phone)) is not None
+
+
+@dataclass
+class ValidationReport:
+    """Resumen de una pasada de validación"""
+    scanned: int = 0
+    normalized: int = 0
+    invalid_emails: int = 0
+    duplicate_emails: int = 0
+    invalid_phones: int = 0
+    
+    @property
+    def total_issues(self) -> int:
+        return self.invalid_emails + self.duplicate_emails + self.invalid_phones
+    
+    def summary(self) -> str:
+        return (
+            f"Empleados revisados: {self.scanned}\n"
+            f"Contactos normalizados: {self.normalized}\n"
+            f"Emails inválidos: {self.invalid_emails}\n"
+            f"Emails duplicados: {self.duplicate_emails}\n"
+            f"Teléfonos inválidos: {self.invalid_phones}"
+        )
+
+
+class ContactValidator:
+    """Valida y normaliza emails y teléfonos de todos los empleados"""
+    
+    def __init__(self, chunk_size: int = 1000):
+        self.chunk_size = chunk_size
+    
+    def run(self, normalize: bool = True) -> ValidationReport:
+        """
+        Analiza todos los empleados y reemplaza el contenido de contact_issues
+        
+        Args:
+            normalize: Si es True guarda los contactos normalizados
+        
+        Returns:
+            ValidationReport con los contadores de la pasada
+        """
+        report = ValidationReport()
+        issues: List[ContactIssue] = []
+        # email normalizado -> id del primer empleado que lo usa
+        seen: Dict[str, int] = {}
+        # email normalizado -> (email, phone, id) pendiente de guardar
+        pending: Dict[str, Tuple[str, Optional[str], int]] = {}
+        
+        last_id = 0
+        while True:
+            rows = EmployeeRepository.read_contacts_after(last_id, self.chunk_size)
+            if not rows:
+                break
+            
+            for employee_id, email, phone in rows:
+                report.scanned += 1
+                email_norm = normalize_email(email)
+                phone_norm = normalize_phone(phone)
+                
+                if not EMAIL_PATTERN.match(email_norm):
+                    issues.append(ContactIssue(employee_id, email, "invalid_email", email_norm))
+                    report.invalid_emails += 1
+                elif email_norm in seen:
+                    issues.append(ContactIssue(
+                        employee_id, email, "duplicate_email",
+                        f"Duplicado del empleado {seen[email_norm]}"
+                    ))
+                    report.duplicate_emails += 1
+                    # El original no puede pasar a minúsculas sin violar UNIQUE
+                    pending.pop(email_norm, None)
+                else:
+                    seen[email_norm] = employee_id
+                
+                if phone_norm is not None and not is_valid_phone(phone_norm):
+                    issues.append(ContactIssue(employee_id, email, "invalid_phone", phone_norm))
+                    report.invalid_phones += 1
+                
+                if (email_norm, phone_norm) != (email, phone) and seen.get(email_norm) == employee_id:
+                    pending[email_norm] = (email_norm, phone_norm, employee_id)
+            
+            last_id = rows[-1][0]
+        
+        if normalize and pending:
+            report.normalized = EmployeeRepository.update_contacts(pending.values())
+            # Los problemas se registran con el email tal como quedó guardado
+            saved = {employee_id: email for email, _, employee_id in pending.values()}
+            for issue in issues:
+                issue.email = saved.get(issue.employee_id, issue.email)
+        
+        ContactIssueRepository.replace_all(issues)
+        return report
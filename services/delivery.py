@@ -0,0 +1,126 @@
+"""
+Envío de un template a un segmento de audiencia
+Compartido por la interfaz (envío inmediato), el programador de campañas y `cli send`
+"""
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Sequence, Set
+
+from config.metrics import MESSAGES_DEFERRED
+from db.repository import ContactIssueRepository, DeliveryRepository, SegmentRepository
+from models.company import Company
+from models.delivery import Delivery, SENT, FAILED, EXCLUDED
+from models.employee import Employee
+from models.segment import Segment
+from services.attachments import Attachment
+from services.email_service import EmailService
+from services.message_archive import archive_messages
+from services.message_service import MessageService
+
+
+@dataclass
+class DeliveryResult:
+    """Totales de un envío"""
+    sent: int = 0
+    failed: int = 0
+    excluded: int = 0  # Marcados por la validación de contactos
+
+
+def record_deliveries(
+    company_id: int,
+    employees: Iterable[Employee],
+    blocked: Set[str],
+    delivered: List[str],
+    campaign_id: Optional[int] = None
+) -> int:
+    """
+    Registra en delivery_log el resultado de cada empleado de un bloque enviado
+    
+    Args:
+        company_id: Empresa del bloque
+        employees: Empleados a los que se les renderizó el mensaje
+        blocked: Emails excluidos por la validación de contactos
+        delivered: Emails que el servidor SMTP aceptó (ver EmailService.send_emails)
+        campaign_id: Campaña programada, o None para un envío inmediato
+    """
+    delivered_set = set(delivered)
+    deliveries = []
+    for employee in employees:
+        if employee.email in blocked:
+            status = EXCLUDED
+        elif employee.email in delivered_set:
+            status = SENT
+        else:
+            status = FAILED
+        deliveries.append(Delivery(company_id, employee.email, status, employee.id, campaign_id))
+    return DeliveryRepository.record(deliveries)
+
+
+def send_to_segment(
+    service: Optional[EmailService],
+    template: str,
+    segment: Segment,
+    subject: Optional[str] = None,
+    chunk_size: int = 500,
+    on_progress: Optional[Callable[[DeliveryResult, Company], None]] = None,
+    campaign_id: Optional[int] = None,
+    attachments: Sequence[Attachment] = (),
+    cc: bool = False,
+    dry_run: bool = False
+) -> DeliveryResult:
+    """
+    Envía el template a los empleados del segmento, empresa por empresa y por bloques
+    
+    Cada empleado recibe solo su mensaje (sin CC), salvo con cc. El
+    servicio ya debe estar conectado.
+    
+    Args:
+        service: Servicio de email conectado (None con dry_run)
+        template: Template del mensaje
+        segment: Audiencia
+        subject: Asunto (por defecto 'Mensaje de <empresa>')
+        chunk_size: Empleados por bloque
+        on_progress: Se llama con los totales y la empresa después de cada bloque
+        campaign_id: Campaña programada que se registra en delivery_log
+        attachments: Adjuntos ya codificados (los mismos para todos los bloques)
+        cc: Cada mensaje lleva al resto de la empresa en CC (como la
+            interfaz); la empresa se envía en un único bloque
+        dry_run: Renderiza y cuenta como enviados los destinatarios válidos,
+            sin enviar ni registrar nada
+    """
+    result = DeliveryResult()
+    for company, _ in SegmentRepository.count_by_company(segment):
+        chunks = SegmentRepository.iter_employees(segment.for_company(company.id), chunk_size)
+        if cc:
+            chunks = [[employee for chunk in chunks for employee in chunk]]
+        for employees in chunks:
+            messages = MessageService.render_for_all_employees(template, employees, company.name)
+            emails = list(messages.keys())
+            blocked = ContactIssueRepository.blocked_emails(emails)
+            if blocked:
+                emails = [e for e in emails if e not in blocked]
+                result.excluded += len(blocked)
+                if not dry_run:
+                    MESSAGES_DEFERRED.inc(len(blocked), reason="contact_issue")
+            if dry_run:
+                result.sent += len(emails)
+                if on_progress:
+                    on_progress(result, company)
+                continue
+            
+            delivered: List[str] = []
+            company_subject = subject or f"Mensaje de {company.name}"
+            if emails:
+                service.send_emails(
+                    emails, company_subject, messages, company.name,
+                    cc_others=cc, delivered=delivered, attachments=attachments
+                )
+                result.sent += len(delivered)
+                result.failed += len(emails) - len(delivered)
+            record_deliveries(company.id, employees, blocked, delivered, campaign_id)
+            archive_messages(
+                template, company_subject, company, employees, messages, delivered, campaign_id,
+                cc_recipients=emails if cc else None
+            )
+            if on_progress:
+                on_progress(result, company)
+    return result
@@ -1,13 +1,19 @@
 """
 Servicio de envío de emails SMTP
 Soporta: Gmail, Outlook, y otros SMTP
+smtplib y email.mime se importan al conectar/enviar (son lentos de importar
+y no hacen falta para arrancar la interfaz)
 """
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import List, Dict, Tuple
+import re
+from typing import List, Dict, Optional, Sequence, Tuple
 from dataclasses import dataclass
 
+from config.metrics import MESSAGES_FAILED, MESSAGES_SENT, SMTP_SECONDS
+from config.tracing import span, traced
+
+# Patrón de email compilado una sola vez al importar el módulo
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 
 @dataclass
 class EmailConfig:
@@ -43,14 +49,20 @@ class EmailService:
         Conecta al servidor SMTP
         Returns: (éxito, mensaje)
         """
+        import smtplib
+        
         try:
-            self.connection = smtplib.SMTP(
-                self.config.smtp_server,
-                self.config.smtp_port,
-                timeout=10
-            )
-            self.connection.starttls()
-            self.connection.login(self.config.email, self.config.password)
+            with span("smtp.connect", "smtp", server=self.config.smtp_server), \
+                    SMTP_SECONDS.time(operation="connect"):
+                self.connection = smtplib.SMTP(
+                    self.config.smtp_server,
+                    self.config.smtp_port,
+                    timeout=10
+                )
+            with span("smtp.starttls", "smtp"), SMTP_SECONDS.time(operation="starttls"):
+                self.connection.starttls()
+            with span("smtp.login", "smtp"), SMTP_SECONDS.time(operation="login"):
+                self.connection.login(self.config.email, self.config.password)
             return True, "✅ Conectado exitosamente"
         except smtplib.SMTPAuthenticationError:
             return False, "❌ Error de autenticación (credenciales incorrectas)"
@@ -68,12 +80,69 @@ class EmailService:
                 pass
             self.connection = None
     
+    @traced("mime.build_message", category="mime")
+    def build_message(
+        self,
+        recipient: str,
+        recipient_emails: List[str],
+        subject: str,
+        body: str,
+        company_name: str,
+        cc_others: bool = True,
+        attachments: Sequence = ()
+    ):
+        """
+        Construye el mensaje MIME para un destinatario, con el resto en CC
+        
+        Args:
+            recipient: Email del destinatario
+            recipient_emails: Lista completa de destinatarios del envío
+            subject: Asunto del email
+            body: Mensaje personalizado del destinatario
+            company_name: Nombre de la empresa
+            cc_others: Si es False el mensaje va solo al destinatario (sin CC ni aclaración)
+            attachments: Adjuntos ya codificados (ver services/attachments.py); sus
+                partes MIME se comparten entre todos los mensajes del envío
+        
+        Returns:
+            MIMEMultipart listo para enviar
+        """
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        
+        msg = MIMEMultipart('mixed' if attachments else 'alternative')
+        msg['From'] = self.config.email
+        msg['To'] = recipient
+        msg['Subject'] = subject
+        
+        if cc_others:
+            otros_empleados = [e for e in recipient_emails if e != recipient]
+            msg['CC'] = ";".join(otros_empleados)
+            
+            # Agregar aclaración de CC
+            body += EmailService.cc_footer(company_name, otros_empleados)
+        
+        # Adjuntar contenido
+        msg.attach(MIMEText(body, 'plain', 'utf-8'))
+        for attachment in attachments:
+            msg.attach(attachment.part)
+        return msg
+    
+    @staticmethod
+    def cc_footer(company_name: str, cc_emails: List[str]) -> str:
+        """Aclaración que build_message agrega al mensaje cuando pone al resto en CC"""
+        return f"\n\n---\n📋 Copia enviada a otros empleados de {company_name}:\n" + ", ".join(cc_emails)
+    
+    @traced(category="smtp")
     def send_emails(
         self,
         recipient_emails: List[str],
         subject: str,
         body_template: Dict[str, str],
-        company_name: str
+        company_name: str,
+        cc_others: bool = True,
+        delivered: Optional[List[str]] = None,
+        attachments: Sequence = ()
     ) -> Tuple[bool, str, int]:
         """
         Envía emails a múltiples destinatarios
@@ -83,6 +152,9 @@ class EmailService:
             subject: Asunto del email
             body_template: Dict {email: mensaje personalizado}
             company_name: Nombre de la empresa
+            cc_others: Poner al resto de los destinatarios en CC (ver build_message)
+            delivered: Si se pasa, se le agregan los emails enviados (para delivery_log)
+            attachments: Adjuntos de todos los mensajes (ver build_message)
         
         Returns:
             (éxito, mensaje, cantidad_enviados)
@@ -100,31 +172,27 @@ class EmailService:
             for email_recipient in recipient_emails:
                 try:
                     # Crear mensaje
-                    msg = MIMEMultipart('alternative')
-                    msg['From'] = self.config.email
-                    msg['To'] = email_recipient
-                    msg['Subject'] = subject
-                    msg['CC'] = ";".join([e for e in recipient_emails if e != email_recipient])
-                    
-                    # Cuerpo del mensaje
-                    body = body_template.get(email_recipient, "")
-                    
-                    # Agregar aclaración de CC
-                    footer = f"\n\n---\n📋 Copia enviada a otros empleados de {company_name}:\n"
-                    otros_empleados = [e for e in recipient_emails if e != email_recipient]
-                    footer += ", ".join(otros_empleados)
-                    
-                    body_completo = body + footer
-                    
-                    # Adjuntar contenido
-                    msg.attach(MIMEText(body_completo, 'plain', 'utf-8'))
+                    msg = self.build_message(
+                        email_recipient,
+                        recipient_emails,
+                        subject,
+                        body_template.get(email_recipient, ""),
+                        company_name,
+                        cc_others,
+                        attachments
+                    )
                     
                     # Enviar
-                    self.connection.send_message(msg)
+                    with span("smtp.send_message", "smtp"), SMTP_SECONDS.time(operation="send"):
+                        self.connection.send_message(msg)
                     sent_count += 1
+                    MESSAGES_SENT.inc()
+                    if delivered is not None:
+                        delivered.append(email_recipient)
                     
                 except Exception as e:
                     failed_emails.append(email_recipient)
+                    MESSAGES_FAILED.inc()
             
             # Retornar resultado
             if sent_count == len(recipient_emails):
@@ -155,6 +223,4 @@ class EmailService:
     @staticmethod
     def validate_email(email: str) -> bool:
         """Valida formato de email"""
-        import re
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        return EMAIL_PATTERN.match(email) is not None
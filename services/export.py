@@ -0,0 +1,207 @@
+"""
+Exportación en streaming de empresas, empleados y mensajes renderizados
+Formatos CSV y JSONL, con gzip opcional. Las filas se leen desde un cursor
+por bloques y cada bloque se escribe de una vez: la memoria no depende
+de la cantidad de filas exportadas.
+"""
+import csv
+import gzip
+import io
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Union
+
+from db.repository import CompanyRepository, EmployeeRepository, SegmentRepository
+from models.segment import Segment
+from services.message_service import MessageService
+
+FORMATS = ("csv", "jsonl")
+
+COMPANY_FIELDS = ["id", "name", "email", "phone", "address", "created_at"]
+EMPLOYEE_FIELDS = ["id", "first_name", "last_name", "email", "phone", "position", "company_id", "created_at"]
+MESSAGE_FIELDS = ["company", "email", "message"]
+
+# Filas leídas y escritas por bloque
+CHUNK_SIZE = 1000
+# Buffer del archivo de salida (bytes)
+BUFFER_SIZE = 1 << 16
+
+
+def detect_format(path: Union[str, Path]) -> tuple:
+    """
+    Formato y compresión según la extensión (.csv, .jsonl, con .gz opcional)
+    
+    Returns:
+        (formato, gzip)
+    """
+    suffixes = [s.lower() for s in Path(path).suffixes]
+    compress = bool(suffixes) and suffixes[-1] == ".gz"
+    if compress:
+        suffixes = suffixes[:-1]
+    fmt = suffixes[-1].lstrip(".") if suffixes else "csv"
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de exportación no soportado: {fmt}")
+    return fmt, compress
+
+
+def open_export(path: Union[str, Path], compress: bool = False) -> TextIO:
+    """Abre el archivo de salida en texto UTF-8 con buffer (comprimido con gzip si se pide)"""
+    if compress:
+        return io.TextIOWrapper(
+            io.BufferedWriter(gzip.open(path, "wb", compresslevel=6), BUFFER_SIZE),
+            encoding="utf-8", newline=""
+        )
+    return open(path, "w", encoding="utf-8", newline="", buffering=BUFFER_SIZE)
+
+
+def write_rows(
+    out: TextIO,
+    batches: Iterable[List[Dict]],
+    fields: List[str],
+    fmt: str = "csv",
+    on_progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Escribe bloques de filas (dicts) en CSV o JSONL
+    
+    Args:
+        out: Destino de texto
+        batches: Bloques de filas
+        fields: Columnas (y su orden)
+        fmt: "csv" o "jsonl"
+        on_progress: Se llama con el total de filas escritas después de cada bloque
+    
+    Returns:
+        Cantidad de filas escritas
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de exportación no soportado: {fmt}")
+    
+    count = 0
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fields, extrasaction="ignore") if fmt == "csv" else None
+    if writer is not None:
+        writer.writeheader()
+    
+    for batch in batches:
+        if writer is not None:
+            writer.writerows(batch)
+        else:
+            buffer.writelines(
+                json.dumps({field: row.get(field) for field in fields}, ensure_ascii=False) + "\n"
+                for row in batch
+            )
+        # Un write por bloque en lugar de uno por fila
+        out.write(buffer.getvalue())
+        buffer.seek(0)
+        buffer.truncate()
+        count += len(batch)
+        if on_progress:
+            on_progress(count)
+    
+    if writer is not None and count == 0:
+        out.write(buffer.getvalue())
+    return count
+
+
+def _company_rows(chunk_size: int) -> Iterator[List[Dict]]:
+    for companies in CompanyRepository.stream_all(chunk_size):
+        yield [company.to_dict() for company in companies]
+
+
+def _employee_rows(company_id: int, chunk_size: int) -> Iterator[List[Dict]]:
+    for employees in EmployeeRepository.stream_by_company(company_id, chunk_size):
+        yield [employee.to_dict() for employee in employees]
+
+
+def _message_rows(
+    template: str,
+    companies: Optional[Iterable],
+    chunk_size: int,
+    segment: Optional[Segment] = None
+) -> Iterator[List[Dict]]:
+    if companies is None:
+        companies = [company for company, _ in SegmentRepository.count_by_company(segment)]
+    for company in companies:
+        if segment is not None:
+            chunks = SegmentRepository.iter_employees(segment.for_company(company.id), chunk_size)
+        else:
+            chunks = EmployeeRepository.stream_by_company(company.id, chunk_size)
+        for employees in chunks:
+            messages = MessageService.render_for_all_employees(template, employees, company.name)
+            yield [
+                {"company": company.name, "email": email, "message": message}
+                for email, message in messages.items()
+            ]
+
+
+def export_companies(out: TextIO, fmt: str = "csv", chunk_size: int = CHUNK_SIZE, on_progress=None) -> int:
+    """Exporta todas las empresas, retorna la cantidad de filas"""
+    return write_rows(out, _company_rows(chunk_size), COMPANY_FIELDS, fmt, on_progress)
+
+
+def export_employees(
+    company_id: int,
+    out: TextIO,
+    fmt: str = "csv",
+    chunk_size: int = CHUNK_SIZE,
+    on_progress=None
+) -> int:
+    """Exporta los empleados de una empresa, retorna la cantidad de filas"""
+    return write_rows(out, _employee_rows(company_id, chunk_size), EMPLOYEE_FIELDS, fmt, on_progress)
+
+
+def export_messages(
+    template: str,
+    companies: Optional[Iterable],
+    out: TextIO,
+    fmt: str = "jsonl",
+    chunk_size: int = CHUNK_SIZE,
+    on_progress=None,
+    segment: Optional[Segment] = None
+) -> int:
+    """
+    Renderiza el template para los empleados de cada empresa (o solo los del segmento) y lo exporta
+    Con companies None se usan las empresas del segmento.
+    """
+    rows = _message_rows(template, companies, chunk_size, segment)
+    return write_rows(out, rows, MESSAGE_FIELDS, fmt, on_progress)
+
+
+def export_to_file(
+    path: Union[str, Path],
+    entity: str,
+    fmt: Optional[str] = None,
+    compress: Optional[bool] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+    **kwargs
+) -> int:
+    """
+    Exporta a un archivo, con formato y gzip deducidos de la extensión si no se indican
+    
+    Args:
+        path: Archivo destino (ej: empleados.csv, mensajes.jsonl.gz)
+        entity: "companies", "employees" (company_id=...) o
+            "messages" (template=..., companies=..., segment=... opcional;
+            companies=None con segment: las empresas del segmento)
+    
+    Returns:
+        Cantidad de filas exportadas
+    """
+    detected_fmt, detected_compress = detect_format(path)
+    fmt = fmt or detected_fmt
+    compress = detected_compress if compress is None else compress
+    
+    exporters = {
+        "companies": lambda out: export_companies(out, fmt, on_progress=on_progress),
+        "employees": lambda out: export_employees(kwargs["company_id"], out, fmt, on_progress=on_progress),
+        "messages": lambda out: export_messages(
+            kwargs["template"], kwargs["companies"], out, fmt,
+            on_progress=on_progress, segment=kwargs.get("segment")
+        ),
+    }
+    if entity not in exporters:
+        raise ValueError(f"Entidad de exportación inválida: {entity}")
+    
+    with open_export(path, compress) as out:
+        return exporters[entity](out)
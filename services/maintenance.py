@@ -0,0 +1,99 @@
+"""
+Mantenimiento periódico de la base de datos
+Devuelve al sistema el espacio de los borrados (vacuum incremental por
+pasos cortos) y actualiza las estadísticas del planificador
+"""
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from config.database import DatabaseConfig
+from db.repository import MaintenanceRepository
+
+
+@dataclass
+class MaintenanceReport:
+    """Resultado de una pasada de mantenimiento"""
+    freed_pages: int = 0
+    remaining_pages: int = 0
+    orphans: int = 0
+    
+    def summary(self) -> str:
+        return (
+            f"Páginas liberadas: {self.freed_pages}\n"
+            f"Páginas libres restantes: {self.remaining_pages}\n"
+            f"Empleados huérfanos borrados: {self.orphans}"
+        )
+
+
+class MaintenanceTask:
+    """
+    Ejecuta run_once() cada interval_seconds en un hilo en segundo plano
+    
+    El vacuum se hace de a pages_per_step páginas, cada paso en su propia
+    transacción y con una pausa entre pasos, para no retener el lock de
+    escritura mientras la aplicación u otros procesos escriben.
+    """
+    
+    def __init__(
+        self,
+        interval_seconds: float = 3600.0,
+        first_delay: float = 60.0,
+        pages_per_step: int = 256,
+        pause_seconds: float = 0.05
+    ):
+        self.interval_seconds = interval_seconds
+        self.first_delay = first_delay
+        self.pages_per_step = pages_per_step
+        self.pause_seconds = pause_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Arranca el hilo (no hace nada con un motor sin SQL)"""
+        if not DatabaseConfig.backend.uses_sql:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="db-maintenance", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        """Detiene el hilo (termina el paso en curso)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def _run(self):
+        delay = self.first_delay
+        while not self._stop.wait(delay):
+            try:
+                self.run_once()
+            except Exception as e:
+                # Base ocupada o bloqueada: se reintenta en la próxima pasada
+                print(f"⚠ Mantenimiento de la BD: {e}", file=sys.stderr)
+            delay = self.interval_seconds
+    
+    def run_once(self, purge_orphans: bool = False) -> MaintenanceReport:
+        """
+        Una pasada completa: (opcional) huérfanos, vacuum incremental y PRAGMA optimize
+        
+        Args:
+            purge_orphans: Borrar antes los empleados cuya empresa ya no existe
+        """
+        report = MaintenanceReport()
+        if purge_orphans:
+            report.orphans = MaintenanceRepository.purge_orphans()
+        
+        while not self._stop.is_set():
+            freed = MaintenanceRepository.incremental_vacuum(self.pages_per_step)
+            report.freed_pages += freed
+            if freed < self.pages_per_step:
+                break
+            time.sleep(self.pause_seconds)
+        
+        MaintenanceRepository.optimize()
+        report.remaining_pages = MaintenanceRepository.freelist_pages()
+        return report
@@ -0,0 +1,83 @@
+"""
+Archivo compacto de los mensajes enviados
+Se guarda el template una vez por envío y, por destinatario, los valores
+de las variables; el texto se vuelve a renderizar al verlo.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from db.repository import MessageArchiveRepository
+from models.company import Company
+from models.employee import Employee
+from models.sent_message import SentMessage
+from services.email_service import EmailService
+from services.message_service import MessageService
+
+# Variable común a todos los mensajes de una empresa
+COMPANY_VARIABLE = "{empresa}"
+
+
+def archive_messages(
+    template: str,
+    subject: Optional[str],
+    company: Company,
+    employees: Iterable[Employee],
+    messages: Dict[str, str],
+    delivered: List[str],
+    campaign_id: Optional[int] = None,
+    cc_recipients: Optional[List[str]] = None
+) -> int:
+    """
+    Archiva los mensajes de un bloque que el servidor SMTP aceptó
+    
+    Cada mensaje se comprueba re-renderizándolo con las variables que se
+    guardan: si no coincide con el enviado (ej: un valor que contiene el
+    texto de otra variable) se guarda el texto completo.
+    
+    Args:
+        template: Template del envío
+        subject: Asunto
+        company: Empresa del bloque
+        employees: Empleados a los que se les renderizó el mensaje
+        messages: {email: mensaje} enviado a cada uno
+        delivered: Emails aceptados (ver EmailService.send_emails)
+        campaign_id: Campaña programada, o None para un envío inmediato
+        cc_recipients: Destinatarios del envío si se mandó con cc_others (cada
+            mensaje llevó al resto en CC y la aclaración al final), o None
+    
+    Returns:
+        Cantidad de mensajes archivados
+    """
+    delivered_set = set(delivered)
+    names = MessageService.template_variables(template)
+    archived = []
+    for employee in employees:
+        if employee.email not in delivered_set:
+            continue
+        values = MessageService.variables_for(employee, company.name)
+        variables = {name: values[name] for name in names}
+        message = SentMessage(
+            company_id=company.id, email=employee.email, employee_id=employee.id, campaign_id=campaign_id
+        )
+        body = messages.get(employee.email, "")
+        if MessageService.render_variables(template, variables) == body:
+            message.variables = variables
+        else:
+            if cc_recipients is not None:
+                others = [e for e in cc_recipients if e != employee.email]
+                body += EmailService.cc_footer(company.name, others)
+            message.body = body
+        archived.append(message)
+    # {empresa} es la misma en todo el bloque: se guarda una vez con el template
+    shared = {name: company.name for name in names if name == COMPANY_VARIABLE}
+    cc = (company.name, cc_recipients) if cc_recipients is not None else None
+    return MessageArchiveRepository.record(template, subject, names, archived, shared, cc)
+
+
+def render(message: SentMessage) -> str:
+    """Texto del mensaje archivado, tal como se envió (re-renderizado si no se guardó completo)"""
+    if message.body is not None:
+        return message.body
+    body = MessageService.render_variables(message.template or "", message.variables)
+    if message.cc is not None:
+        body += EmailService.cc_footer(message.cc_company or "", message.cc)
+    return body
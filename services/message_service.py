@@ -2,6 +2,8 @@
 Servicio para manejo de mensajes con variables dinámicas
 """
 from typing import Dict, List
+from config.metrics import MESSAGES_RENDERED
+from config.tracing import traced
 from models.employee import Employee
 
 
@@ -32,7 +34,13 @@ class MessageService:
         Returns:
             Mensaje completo con variables reemplazadas
         """
-        message = template
+        return MessageService.render_variables(
+            template, MessageService.variables_for(employee, company_name)
+        )
+    
+    @staticmethod
+    def variables_for(employee: Employee, company_name: str) -> Dict[str, str]:
+        """Valores de las variables de un empleado, en el orden en que se reemplazan"""
         replacements = {
             '{nombre}': employee.first_name,
             '{apellido}': employee.last_name,
@@ -42,13 +50,23 @@ class MessageService:
             '{posicion}': employee.position or '',
             '{empresa}': company_name
         }
-        
-        for variable, value in replacements.items():
-            message = message.replace(variable, str(value))
-        
+        return {variable: str(value) for variable, value in replacements.items()}
+    
+    @staticmethod
+    def render_variables(template: str, variables: Dict[str, str]) -> str:
+        """Reemplaza las variables en orden (ver variables_for)"""
+        message = template
+        for variable, value in variables.items():
+            message = message.replace(variable, value)
         return message
     
     @staticmethod
+    def template_variables(template: str) -> List[str]:
+        """Variables que aparecen en el template (en el orden de AVAILABLE_VARIABLES)"""
+        return [variable for variable in MessageService.AVAILABLE_VARIABLES if variable in template]
+    
+    @staticmethod
+    @traced(category="render")
     def render_for_all_employees(
         template: str, 
         employees: List[Employee], 
@@ -69,6 +87,7 @@ class MessageService:
         for employee in employees:
             rendered = MessageService.render_message(template, employee, company_name)
             result[employee.email] = rendered
+        MESSAGES_RENDERED.inc(len(result))
         return result
     
     @staticmethod
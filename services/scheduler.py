@@ -0,0 +1,209 @@
+"""
+Programador de campañas en proceso
+Un hilo duerme hasta la próxima campaña (heap por fecha), sin sondear la BD
+"""
+import heapq
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from db.repository import CampaignRepository
+from models.campaign import Campaign, PENDING, DONE, FAILED
+from services.email_service import EmailConfig, EmailService
+
+# Cada cuánto renueva el programador el latido de sus campañas en curso
+HEARTBEAT_SECONDS = 30.0
+
+# Una campaña en curso sin latido durante este tiempo quedó interrumpida
+STALE_SECONDS = 4 * HEARTBEAT_SECONDS
+
+
+class CampaignScheduler:
+    """
+    Ejecuta las campañas de scheduled_campaigns cuando vencen
+    
+    Las campañas pendientes viven en un heap (fecha, id). El hilo espera
+    en una Condition con timeout hasta la primera fecha; schedule(),
+    wake() y stop() lo despiertan antes. Las campañas que vencen dentro
+    de la misma ventana (coalesce_seconds) se ejecutan juntas sobre una
+    sola conexión SMTP.
+    
+    Al iniciar se cargan las pendientes: las vencidas mientras la
+    aplicación estaba cerrada se ejecutan enseguida. Cada campaña tomada
+    guarda el programador que la envía (host:pid) y un hilo aparte renueva
+    su latido cada HEARTBEAT_SECONDS; las que quedaron en curso sin latido
+    (su programador se cerró enviando) se marcan como fallidas al iniciar
+    y en cada latido (ver CampaignRepository.fail_interrupted). Así varios
+    programadores pueden compartir la base sin pisarse.
+    
+    Sin credenciales (config_provider retorna None) las campañas vencidas
+    quedan en espera hasta que se llame a wake().
+    """
+    
+    def __init__(
+        self,
+        config_provider: Callable[[], Optional[EmailConfig]],
+        coalesce_seconds: float = 1.0,
+        chunk_size: int = 500,
+        clock: Callable[[], float] = time.time
+    ):
+        self.config_provider = config_provider
+        self.coalesce_seconds = coalesce_seconds
+        self.chunk_size = chunk_size
+        self.clock = clock
+        self._heap: List[Tuple[float, int]] = []
+        self._waiting: List[int] = []  # Vencidas sin credenciales
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._beat_stop = threading.Event()
+        self._beat_thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Recupera las campañas pendientes y arranca los hilos"""
+        CampaignRepository.fail_interrupted(STALE_SECONDS)
+        with self._cond:
+            for campaign in CampaignRepository.read_pending():
+                heapq.heappush(self._heap, (campaign.due_timestamp, campaign.id))
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="campaign-scheduler", daemon=True)
+        self._thread.start()
+        self._beat_stop.clear()
+        self._beat_thread = threading.Thread(target=self._heartbeat, name="campaign-heartbeat", daemon=True)
+        self._beat_thread.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        """Detiene los hilos (espera a que termine el lote en curso)"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # El latido sigue hasta que termina el lote, si no otro programador lo daría por interrumpido
+        self._beat_stop.set()
+        if self._beat_thread is not None:
+            self._beat_thread.join(timeout)
+            self._beat_thread = None
+    
+    def join(self):
+        """Bloquea hasta que el programador se detenga"""
+        if self._thread is not None:
+            self._thread.join()
+    
+    def schedule(self, campaign: Campaign) -> int:
+        """Guarda una campaña nueva y la agrega al heap, retorna su ID"""
+        campaign.id = CampaignRepository.create(campaign)
+        self.add(campaign.id, campaign.due_timestamp)
+        return campaign.id
+    
+    def reschedule(self, campaign_id: int, due_at: str) -> bool:
+        """Cambia la fecha de una campaña pendiente (la entrada vieja del heap se descarta al vencer)"""
+        if not CampaignRepository.reschedule(campaign_id, due_at):
+            return False
+        campaign = CampaignRepository.read(campaign_id)
+        if campaign is not None:
+            self.add(campaign_id, campaign.due_timestamp)
+        return True
+    
+    def add(self, campaign_id: int, due_timestamp: float):
+        """Agrega una campaña ya guardada al heap"""
+        with self._cond:
+            heapq.heappush(self._heap, (due_timestamp, campaign_id))
+            # Solo hace falta despertar al hilo si cambió la próxima fecha
+            if self._heap[0][1] == campaign_id:
+                self._cond.notify()
+    
+    def wake(self):
+        """Reintenta las campañas vencidas que esperaban credenciales"""
+        with self._cond:
+            now = self.clock()
+            for campaign_id in self._waiting:
+                heapq.heappush(self._heap, (now, campaign_id))
+            self._waiting.clear()
+            self._cond.notify()
+    
+    def next_due(self) -> Optional[float]:
+        """Timestamp de la próxima campaña en el heap"""
+        with self._cond:
+            return self._heap[0][0] if self._heap else None
+    
+    def _heartbeat(self):
+        while not self._beat_stop.wait(HEARTBEAT_SECONDS):
+            try:
+                CampaignRepository.heartbeat(self.owner)
+                CampaignRepository.fail_interrupted(STALE_SECONDS)
+            except Exception as e:
+                # Base bloqueada u ocupada: se reintenta en el próximo latido
+                print(f"⚠ Latido de campañas: {e}", file=sys.stderr)
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    delay = self._heap[0][0] - self.clock()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if self._stopping:
+                    return
+                
+                # Todo lo que vence en la misma ventana forma un lote
+                limit = self.clock() + self.coalesce_seconds
+                due = []
+                while self._heap and self._heap[0][0] <= limit:
+                    due.append(heapq.heappop(self._heap)[1])
+            
+            self.run_batch(list(dict.fromkeys(due)))
+    
+    def run_batch(self, campaign_ids: List[int]):
+        """Ejecuta un lote de campañas vencidas con una sola conexión SMTP"""
+        limit = self.clock() + self.coalesce_seconds
+        campaigns = []
+        for campaign_id in campaign_ids:
+            campaign = CampaignRepository.read(campaign_id)
+            # Canceladas, ya ejecutadas o reprogramadas más tarde (su entrada nueva sigue en el heap)
+            if campaign is not None and campaign.status == PENDING and campaign.due_timestamp <= limit:
+                campaigns.append(campaign)
+        if not campaigns:
+            return
+        
+        config = self.config_provider()
+        if config is None:
+            with self._cond:
+                self._waiting.extend(c.id for c in campaigns)
+            return
+        
+        from services.attachments import load_attachments
+        from services.delivery import send_to_segment
+        service = EmailService(config)
+        connected, message = service.connect()
+        try:
+            for campaign in campaigns:
+                if not CampaignRepository.claim(campaign.id, self.owner):
+                    continue
+                if not connected:
+                    CampaignRepository.finish(campaign.id, FAILED, error=message)
+                    continue
+                try:
+                    attachments = load_attachments(campaign.attachments)
+                    result = send_to_segment(
+                        service, campaign.template, campaign.segment, campaign.subject, self.chunk_size,
+                        campaign_id=campaign.id, attachments=attachments
+                    )
+                except Exception as e:
+                    CampaignRepository.finish(campaign.id, FAILED, error=str(e))
+                    continue
+                status = FAILED if result.failed and not result.sent else DONE
+                CampaignRepository.finish(
+                    campaign.id, status, result.sent, result.failed, result.excluded
+                )
+        finally:
+            service.disconnect()
@@ -1,13 +1,17 @@
 """
 Diálogos para agregar/editar empresas y empleados
 """
-from typing import Optional
+from typing import Optional, Tuple, TYPE_CHECKING
 from PyQt6.QtWidgets import QVBoxLayout, QHBoxLayout, QMessageBox, QComboBox, QLabel
 from PyQt6.QtCore import Qt
 from ui.widgets import BaseDialog, LabeledInput, StyledButton
 from models.company import Company
 from models.employee import Employee
-from services.email_service import EmailService, EmailConfig
+
+if TYPE_CHECKING:
+    from datetime import datetime
+    from models.segment import Segment
+    from services.email_service import EmailConfig
 
 
 class AddCompanyDialog(BaseDialog):
@@ -126,16 +130,40 @@ class AddEmployeeDialog(BaseDialog):
             QMessageBox.warning(self, "Error", "Nombre, apellido y email son requeridos")
             return
         
+        email, phone = self.validate_contact(email)
+        if email is None:
+            return
+        
         # El company_id se asignará en main_window
         self.result = Employee(
             first_name=first_name,
             last_name=last_name,
             email=email,
-            phone=self.phone_input.get_value() or None,
+            phone=phone,
             position=self.position_input.get_value() or None,
             company_id=0
         )
         self.accept()
+    
+    def validate_contact(self, email: str) -> tuple:
+        """
+        Normaliza y valida email y teléfono ingresados
+        Returns: (email, phone) normalizados, o (None, None) si son inválidos
+        """
+        from services.email_service import EmailService
+        from services.contact_validator import normalize_email, normalize_phone, is_valid_phone
+        
+        email = normalize_email(email)
+        if not EmailService.validate_email(email):
+            QMessageBox.warning(self, "Error", f"El email '{email}' no es válido")
+            return None, None
+        
+        phone = normalize_phone(self.phone_input.get_value())
+        if phone is not None and not is_valid_phone(phone):
+            QMessageBox.warning(self, "Error", f"El teléfono '{phone}' no es válido")
+            return None, None
+        
+        return email, phone
 
 
 class EditEmployeeDialog(AddEmployeeDialog):
@@ -163,12 +191,16 @@ class EditEmployeeDialog(AddEmployeeDialog):
             QMessageBox.warning(self, "Error", "Nombre, apellido y email son requeridos")
             return
         
+        email, phone = self.validate_contact(email)
+        if email is None:
+            return
+        
         self.result = Employee(
             id=self.employee.id,
             first_name=first_name,
             last_name=last_name,
             email=email,
-            phone=self.phone_input.get_value() or None,
+            phone=phone,
             position=self.position_input.get_value() or None,
             company_id=self.employee.company_id
         )
@@ -179,7 +211,7 @@ class EmailConfigDialog(BaseDialog):
     """Diálogo para configurar credenciales de email"""
     
     def __init__(self, parent=None):
-        self.result: Optional[EmailConfig] = None
+        self.result: Optional["EmailConfig"] = None
         super().__init__(parent, "Configurar Email")
         self.setGeometry(100, 100, 450, 300)
     
@@ -243,6 +275,7 @@ class EmailConfigDialog(BaseDialog):
             return
         
         # Probar conexión
+        from services.email_service import EmailService
         success, message = EmailService.test_connection(provider, email, password)
         if success:
             QMessageBox.information(self, "Éxito", message)
@@ -260,6 +293,7 @@ class EmailConfigDialog(BaseDialog):
             return
         
         # Crear configuración
+        from services.email_service import EmailConfig
         self.result = EmailConfig(
             provider=provider,
             email=email,
@@ -267,3 +301,467 @@ class EmailConfigDialog(BaseDialog):
         )
         self.accept()
 
+
+
+class QueryLogDialog(BaseDialog):
+    """Panel de depuración: consultas SQL por acción y consultas lentas"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent, "Consultas SQL")
+        self.setGeometry(100, 100, 900, 550)
+        self.refresh()
+    
+    def setup_ui(self):
+        from PyQt6.QtWidgets import QTableWidget, QHeaderView
+        layout = QVBoxLayout()
+        
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        
+        layout.addWidget(QLabel("Por acción:"))
+        self.actions_table = QTableWidget(0, 4)
+        self.actions_table.setHorizontalHeaderLabels(["Acción", "Consultas", "Filas", "ms"])
+        
+        layout.addWidget(self.actions_table)
+        
+        layout.addWidget(QLabel("Consultas lentas:"))
+        self.slow_table = QTableWidget(0, 5)
+        self.slow_table.setHorizontalHeaderLabels(["Acción", "Método", "ms", "Filas", "SQL"])
+        layout.addWidget(self.slow_table)
+        
+        for table in (self.actions_table, self.slow_table):
+            table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+            header = table.horizontalHeader()
+            if header:
+                header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+                header.setStretchLastSection(True)
+        
+        # Botones
+        buttons_layout = QHBoxLayout()
+        button_refresh = StyledButton("↻ Actualizar", "primary")
+        button_reset = StyledButton("🗑 Reiniciar", "danger")
+        button_save = StyledButton("💾 Guardar JSON", "success")
+        button_close = StyledButton("Cerrar")
+        button_close.apply_style("primary")
+        
+        button_refresh.clicked.connect(self.refresh)
+        button_reset.clicked.connect(self.reset)
+        button_save.clicked.connect(self.save)
+        button_close.clicked.connect(self.accept)
+        
+        buttons_layout.addWidget(button_refresh)
+        buttons_layout.addWidget(button_reset)
+        buttons_layout.addWidget(button_save)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(button_close)
+        
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+    
+    def refresh(self):
+        """Vuelve a leer los contadores de query_log"""
+        from PyQt6.QtWidgets import QTableWidgetItem
+        from db.query_log import query_log
+        snapshot = query_log.snapshot()
+        
+        actions = sorted(snapshot["by_action"].items(), key=lambda item: item[1]["ms"], reverse=True)
+        self.actions_table.setRowCount(len(actions))
+        for row, (action, stats) in enumerate(actions):
+            values = [action, stats["queries"], stats["rows"], f"{stats['ms']:.2f}"]
+            for column, value in enumerate(values):
+                self.actions_table.setItem(row, column, QTableWidgetItem(str(value)))
+        
+        slow = list(reversed(snapshot["slow"]))
+        self.slow_table.setRowCount(len(slow))
+        for row, query in enumerate(slow):
+            values = [query["action"], query["method"], f"{query['ms']:.2f}", query["rows"], query["sql"]]
+            for column, value in enumerate(values):
+                self.slow_table.setItem(row, column, QTableWidgetItem(str(value)))
+        
+        total = sum(stats["queries"] for _, stats in actions)
+        self.summary_label.setText(
+            f"Total: {total} consultas · Umbral de consulta lenta: {snapshot['slow_ms']:.0f} ms"
+        )
+    
+    def reset(self):
+        """Borra los contadores"""
+        from db.query_log import query_log
+        query_log.reset()
+        self.refresh()
+    
+    def save(self):
+        """Guarda los contadores en un archivo JSON"""
+        from PyQt6.QtWidgets import QFileDialog
+        from db.query_log import query_log
+        path, _ = QFileDialog.getSaveFileName(self, "Guardar consultas", "consultas.json", "JSON (*.json)")
+        if path:
+            query_log.dump(path)
+
+
+class SegmentDialog(BaseDialog):
+    """Diálogo para definir un segmento de audiencia entre empresas, con vista previa del tamaño"""
+    
+    def __init__(self, company_model, segment: Optional["Segment"] = None, parent=None):
+        self.result: Optional["Segment"] = None
+        self.company_model = company_model
+        self.segment = segment
+        super().__init__(parent, "Segmento de Audiencia")
+        self.setGeometry(100, 100, 600, 520)
+        if segment is not None:
+            self.load_data()
+        self.update_count()
+    
+    def setup_ui(self):
+        from PyQt6.QtWidgets import QAbstractItemView, QListView, QListWidget
+        from PyQt6.QtCore import QTimer
+        from db.repository import EmployeeRepository
+        from ui.models import COMPANY_NAME_COLUMN
+        layout = QVBoxLayout()
+        
+        lists_layout = QHBoxLayout()
+        
+        # Empresas (sin selección = todas)
+        companies_layout = QVBoxLayout()
+        companies_layout.addWidget(QLabel("Empresas (ninguna = todas):"))
+        self.companies_list = QListView()
+        self.companies_list.setModel(self.company_model)
+        self.companies_list.setModelColumn(COMPANY_NAME_COLUMN)
+        self.companies_list.setSelectionMode(QAbstractItemView.SelectionMode.MultiSelection)
+        companies_layout.addWidget(self.companies_list)
+        lists_layout.addLayout(companies_layout)
+        
+        # Posiciones cargadas (sin selección = todas)
+        positions_layout = QVBoxLayout()
+        positions_layout.addWidget(QLabel("Posiciones (ninguna = todas):"))
+        self.positions_list = QListWidget()
+        self.positions_list.addItems(EmployeeRepository.read_positions())
+        self.positions_list.setSelectionMode(QAbstractItemView.SelectionMode.MultiSelection)
+        positions_layout.addWidget(self.positions_list)
+        lists_layout.addLayout(positions_layout)
+        
+        layout.addLayout(lists_layout)
+        
+        self.domains_input = LabeledInput("Dominios de email", "ej: acme.com, acme.com.ar")
+        dates_layout = QHBoxLayout()
+        self.from_input = LabeledInput("Alta desde", "AAAA-MM-DD")
+        self.to_input = LabeledInput("Alta hasta", "AAAA-MM-DD")
+        dates_layout.addWidget(self.from_input)
+        dates_layout.addWidget(self.to_input)
+        
+        layout.addWidget(self.domains_input)
+        layout.addLayout(dates_layout)
+        
+        self.count_label = QLabel()
+        self.count_label.setStyleSheet("font-weight: bold;")
+        layout.addWidget(self.count_label)
+        
+        # La vista previa (COUNT) se recalcula al dejar de editar
+        self.count_timer = QTimer(self)
+        self.count_timer.setSingleShot(True)
+        self.count_timer.setInterval(250)
+        self.count_timer.timeout.connect(self.update_count)
+        
+        selection = self.companies_list.selectionModel()
+        if selection:
+            selection.selectionChanged.connect(self.count_timer.start)
+        self.positions_list.itemSelectionChanged.connect(self.count_timer.start)
+        for field in (self.domains_input, self.from_input, self.to_input):
+            field.input.textEdited.connect(self.count_timer.start)
+        
+        # Botones
+        buttons_layout = QHBoxLayout()
+        button_save = StyledButton("🎯 Usar Segmento", "success")
+        button_cancel = StyledButton("Cancelar")
+        button_cancel.apply_style("primary")
+        
+        button_save.clicked.connect(self.save_segment)
+        button_cancel.clicked.connect(self.reject)
+        
+        buttons_layout.addWidget(button_save)
+        buttons_layout.addWidget(button_cancel)
+        
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+    
+    def load_data(self):
+        from PyQt6.QtCore import QItemSelectionModel
+        from ui.models import COMPANY_NAME_COLUMN
+        selection = self.companies_list.selectionModel()
+        for company_id in self.segment.company_ids:
+            row = self.company_model.row_of(company_id)
+            if row >= 0 and selection:
+                index = self.company_model.index(row, COMPANY_NAME_COLUMN)
+                selection.select(index, QItemSelectionModel.SelectionFlag.Select)
+        for row in range(self.positions_list.count()):
+            item = self.positions_list.item(row)
+            if item and item.text() in self.segment.positions:
+                item.setSelected(True)
+        self.domains_input.set_value(", ".join(self.segment.domains))
+        self.from_input.set_value(self.segment.created_from or "")
+        self.to_input.set_value(self.segment.created_to or "")
+    
+    def build_segment(self) -> Tuple[Optional["Segment"], str]:
+        """Segmento según los campos, o (None, error) si una fecha es inválida"""
+        from models.segment import Segment, is_date
+        from ui.models import ID_ROLE
+        
+        dates = []
+        for field in (self.from_input, self.to_input):
+            value = field.get_value()
+            if value and not is_date(value):
+                return None, f"Fecha inválida: {value} (usar AAAA-MM-DD)"
+            dates.append(value or None)
+        
+        selection = self.companies_list.selectionModel()
+        company_ids = sorted(
+            index.data(ID_ROLE) for index in (selection.selectedIndexes() if selection else [])
+        )
+        return Segment(
+            company_ids=company_ids,
+            positions=[item.text() for item in self.positions_list.selectedItems()],
+            domains=[d.strip() for d in self.domains_input.get_value().split(",") if d.strip()],
+            created_from=dates[0],
+            created_to=dates[1]
+        ), ""
+    
+    def update_count(self):
+        """Vista previa del tamaño de la audiencia"""
+        from db.repository import SegmentRepository
+        segment, error = self.build_segment()
+        if segment is None:
+            self.count_label.setText(f"⚠️ {error}")
+            return
+        count = SegmentRepository.count(segment)
+        self.count_label.setText(f"Audiencia: {count} empleados · {segment.describe()}")
+    
+    def save_segment(self):
+        segment, error = self.build_segment()
+        if segment is None:
+            QMessageBox.warning(self, "Error", error)
+            return
+        self.result = segment
+        self.accept()
+
+
+class ScheduleDialog(BaseDialog):
+    """Diálogo para programar el envío de una campaña"""
+    
+    def __init__(self, audience: str, parent=None):
+        self.result: Optional[Tuple[str, str, "datetime"]] = None
+        self.audience = audience
+        super().__init__(parent, "Programar Campaña")
+        self.setGeometry(100, 100, 420, 280)
+    
+    def setup_ui(self):
+        from PyQt6.QtCore import QDateTime
+        from PyQt6.QtWidgets import QDateTimeEdit
+        layout = QVBoxLayout()
+        
+        layout.addWidget(QLabel(f"Audiencia: {self.audience}"))
+        self.name_input = LabeledInput("Nombre", "ej: Newsletter de noviembre")
+        self.subject_input = LabeledInput("Asunto", "Vacío = 'Mensaje de <empresa>'")
+        
+        layout.addWidget(self.name_input)
+        layout.addWidget(self.subject_input)
+        layout.addWidget(QLabel("Enviar el:"))
+        self.when_input = QDateTimeEdit(QDateTime.currentDateTime().addSecs(3600))
+        self.when_input.setDisplayFormat("yyyy-MM-dd HH:mm")
+        self.when_input.setCalendarPopup(True)
+        layout.addWidget(self.when_input)
+        
+        # Botones
+        buttons_layout = QHBoxLayout()
+        button_save = StyledButton("⏰ Programar", "success")
+        button_cancel = StyledButton("Cancelar")
+        button_cancel.apply_style("primary")
+        
+        button_save.clicked.connect(self.save_schedule)
+        button_cancel.clicked.connect(self.reject)
+        
+        buttons_layout.addWidget(button_save)
+        buttons_layout.addWidget(button_cancel)
+        
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+    
+    def save_schedule(self):
+        name = self.name_input.get_value()
+        if not name:
+            QMessageBox.warning(self, "Error", "El nombre de la campaña es requerido")
+            return
+        self.result = (name, self.subject_input.get_value(), self.when_input.dateTime().toPyDateTime())
+        self.accept()
+
+
+class CampaignsDialog(BaseDialog):
+    """Campañas programadas, con su estado y resultado"""
+    
+    COLUMNS = ["ID", "Nombre", "Programada", "Estado", "Enviados", "Fallidos", "Excluidos", "Error"]
+    STATUS_LABELS = {
+        "pending": "⏳ Pendiente",
+        "running": "📤 Enviando",
+        "done": "✅ Enviada",
+        "failed": "❌ Fallida",
+        "cancelled": "🚫 Cancelada",
+    }
+    
+    def __init__(self, parent=None):
+        super().__init__(parent, "Campañas Programadas")
+        self.setGeometry(100, 100, 900, 450)
+        self.refresh()
+    
+    def setup_ui(self):
+        from PyQt6.QtWidgets import QTableWidget, QHeaderView, QAbstractItemView
+        layout = QVBoxLayout()
+        
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        header = self.table.horizontalHeader()
+        if header:
+            header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+            header.setStretchLastSection(True)
+        layout.addWidget(self.table)
+        
+        # Botones
+        buttons_layout = QHBoxLayout()
+        button_refresh = StyledButton("↻ Actualizar", "primary")
+        button_cancel_campaign = StyledButton("🚫 Cancelar Campaña", "danger")
+        button_close = StyledButton("Cerrar")
+        button_close.apply_style("primary")
+        
+        button_refresh.clicked.connect(self.refresh)
+        button_cancel_campaign.clicked.connect(self.cancel_campaign)
+        button_close.clicked.connect(self.accept)
+        
+        buttons_layout.addWidget(button_refresh)
+        buttons_layout.addWidget(button_cancel_campaign)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(button_close)
+        
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+    
+    def refresh(self):
+        """Vuelve a leer las campañas"""
+        from PyQt6.QtWidgets import QTableWidgetItem
+        from db.repository import CampaignRepository
+        campaigns = CampaignRepository.read_all()
+        
+        self.table.setRowCount(len(campaigns))
+        for row, campaign in enumerate(campaigns):
+            values = [
+                campaign.id, campaign.name, campaign.local_due_at(),
+                self.STATUS_LABELS.get(campaign.status, campaign.status),
+                campaign.sent, campaign.failed, campaign.excluded, campaign.error or ""
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(str(value)))
+    
+    def cancel_campaign(self):
+        """Cancela la campaña seleccionada si sigue pendiente"""
+        from db.repository import CampaignRepository
+        row = self.table.currentRow()
+        item = self.table.item(row, 0) if row >= 0 else None
+        if item is None:
+            QMessageBox.warning(self, "Error", "Selecciona una campaña")
+            return
+        if not CampaignRepository.cancel(int(item.text())):
+            QMessageBox.warning(self, "Error", "La campaña ya no está pendiente")
+        self.refresh()
+
+
+class DeliveryStatsDialog(BaseDialog):
+    """Estadísticas de envíos leídas de las tablas de resumen (sin recorrer delivery_log)"""
+    
+    PERIODS = ["Hoy", "Últimos 7 días", "Últimos 30 días", "Este mes", "Mes anterior"]
+    
+    def __init__(self, parent=None):
+        super().__init__(parent, "Estadísticas de Envíos")
+        self.setGeometry(100, 100, 700, 550)
+        self.refresh()
+    
+    def setup_ui(self):
+        from PyQt6.QtWidgets import QTableWidget, QHeaderView
+        layout = QVBoxLayout()
+        
+        period_layout = QHBoxLayout()
+        period_layout.addWidget(QLabel("Período (días UTC):"))
+        self.period_combo = QComboBox()
+        self.period_combo.addItems(self.PERIODS)
+        self.period_combo.setCurrentIndex(2)
+        self.period_combo.currentIndexChanged.connect(self.refresh)
+        period_layout.addWidget(self.period_combo)
+        period_layout.addStretch()
+        layout.addLayout(period_layout)
+        
+        self.totals_label = QLabel()
+        layout.addWidget(self.totals_label)
+        
+        self.company_table = QTableWidget(0, 4)
+        self.company_table.setHorizontalHeaderLabels(["Empresa", "Enviados", "Fallidos", "Excluidos"])
+        self.campaign_table = QTableWidget(0, 5)
+        self.campaign_table.setHorizontalHeaderLabels(["ID", "Campaña", "Enviados", "Fallidos", "Excluidos"])
+        for title, table in [("Por empresa:", self.company_table), ("Últimas campañas:", self.campaign_table)]:
+            table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+            header = table.horizontalHeader()
+            if header:
+                header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+                header.setStretchLastSection(True)
+            layout.addWidget(QLabel(title))
+            layout.addWidget(table)
+        
+        buttons_layout = QHBoxLayout()
+        button_refresh = StyledButton("↻ Actualizar", "primary")
+        button_close = StyledButton("Cerrar")
+        button_close.apply_style("primary")
+        button_refresh.clicked.connect(self.refresh)
+        button_close.clicked.connect(self.accept)
+        buttons_layout.addWidget(button_refresh)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(button_close)
+        
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+    
+    @staticmethod
+    def period_range(index: int) -> Tuple[str, str]:
+        """(desde, hasta) 'AAAA-MM-DD' del período elegido, en días UTC como delivery_log"""
+        from datetime import datetime, timedelta, timezone
+        today = datetime.now(timezone.utc).date()
+        if index in (0, 1, 2):
+            since = today - timedelta(days=(0, 6, 29)[index])
+            return since.isoformat(), today.isoformat()
+        first = today.replace(day=1)
+        if index == 3:
+            return first.isoformat(), today.isoformat()
+        last_month_end = first - timedelta(days=1)
+        return last_month_end.replace(day=1).isoformat(), last_month_end.isoformat()
+    
+    def refresh(self):
+        """Vuelve a leer los resúmenes del período"""
+        from PyQt6.QtWidgets import QTableWidgetItem
+        from db.repository import DeliveryRepository
+        since, until = self.period_range(self.period_combo.currentIndex())
+        
+        totals = DeliveryRepository.stats_for_period(since, until)
+        self.totals_label.setText(
+            f"{since} a {until}: {totals.sent} enviados · {totals.failed} fallidos · "
+            f"{totals.excluded} excluidos"
+        )
+        
+        for table, rows in [
+            (self.company_table, [
+                [name or f"(eliminada, ID {company_id})", s.sent, s.failed, s.excluded]
+                for company_id, name, s in DeliveryRepository.stats_by_company(since, until)
+            ]),
+            (self.campaign_table, [
+                [campaign_id, name or "", s.sent, s.failed, s.excluded]
+                for campaign_id, name, s in DeliveryRepository.stats_by_campaign()
+            ]),
+        ]:
+            table.setRowCount(len(rows))
+            for row, values in enumerate(rows):
+                for column, value in enumerate(values):
+                    table.setItem(row, column, QTableWidgetItem(str(value)))
@@ -0,0 +1,25 @@
+"""
+Puente entre el bus de cambios de los repositorios y Qt
+"""
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from db.events import ChangeEvent, change_bus
+
+
+class ChangeNotifier(QObject):
+    """
+    Reemite los eventos del bus como señal Qt
+    
+    Los repositorios pueden publicar desde hilos del DataLoader; la señal
+    se entrega siempre en el hilo de este objeto (el de la UI).
+    """
+    
+    changed = pyqtSignal(object)  # ChangeEvent
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._unsubscribe = change_bus.subscribe(self._on_event)
+        self.destroyed.connect(lambda: self._unsubscribe())
+    
+    def _on_event(self, event: ChangeEvent):
+        self.changed.emit(event)
@@ -0,0 +1,103 @@
+"""
+Carga de datos en segundo plano
+Ejecuta lecturas de los repositorios en QThreadPool y entrega los resultados por señales
+"""
+import itertools
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from db.query_log import query_log
+
+
+class _TaskSignals(QObject):
+    """Señales internas emitidas desde los hilos del pool"""
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class _LoadTask(QRunnable):
+    """Tarea que ejecuta una función de lectura fuera del hilo de la UI"""
+    
+    def __init__(self, key: str, ticket: int, fn: Callable, args: tuple, signals: _TaskSignals):
+        super().__init__()
+        self.key = key
+        self.ticket = ticket
+        self.fn = fn
+        self.args = args
+        self.signals = signals
+    
+    def run(self):
+        try:
+            # Las consultas de la carga se atribuyen a su clave
+            with query_log.action(f"DataLoader:{self.key}"):
+                result = self.fn(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(self.ticket, str(e))
+            return
+        self.signals.finished.emit(self.ticket, result)
+
+
+class DataLoader(QObject):
+    """
+    Servicio de carga asíncrona con coalescencia por clave
+    
+    Cada pedido se identifica con una clave (ej: "employees"). Mientras hay
+    una carga en curso para una clave, los pedidos nuevos no se encolan:
+    solo se recuerda el último, que se ejecuta al terminar la carga actual.
+    El resultado de la carga reemplazada se descarta sin emitirse.
+    """
+    
+    loading = pyqtSignal(str)          # clave
+    loaded = pyqtSignal(str, object)   # clave, resultado
+    failed = pyqtSignal(str, str)      # clave, mensaje de error
+    
+    def __init__(self, parent=None, pool: Optional[QThreadPool] = None):
+        super().__init__(parent)
+        self._pool = pool or QThreadPool.globalInstance()
+        self._signals = _TaskSignals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+        self._tickets = itertools.count(1)
+        self._in_flight: Dict[str, int] = {}
+        self._pending: Dict[str, Tuple[Callable, tuple]] = {}
+    
+    def request(self, key: str, fn: Callable[..., Any], *args):
+        """Pide ejecutar fn(*args) en segundo plano y emitir loaded(key, resultado)"""
+        if key in self._in_flight:
+            self._pending[key] = (fn, args)
+            return
+        self._start(key, fn, args)
+    
+    def is_loading(self, key: str) -> bool:
+        """Indica si hay una carga en curso para la clave"""
+        return key in self._in_flight
+    
+    def _start(self, key: str, fn: Callable, args: tuple):
+        ticket = next(self._tickets)
+        self._in_flight[key] = ticket
+        self.loading.emit(key)
+        self._pool.start(_LoadTask(key, ticket, fn, args, self._signals))
+    
+    def _finish(self, ticket: int) -> Optional[str]:
+        """Libera la clave del ticket; retorna la clave si el resultado sigue vigente"""
+        key = next((k for k, t in self._in_flight.items() if t == ticket), None)
+        if key is None:
+            return None
+        del self._in_flight[key]
+        
+        if key in self._pending:
+            fn, args = self._pending.pop(key)
+            self._start(key, fn, args)
+            return None
+        return key
+    
+    def _on_finished(self, ticket: int, result: object):
+        key = self._finish(ticket)
+        if key is not None:
+            self.loaded.emit(key, result)
+    
+    def _on_failed(self, ticket: int, message: str):
+        key = self._finish(ticket)
+        if key is not None:
+            self.failed.emit(key, message)
@@ -3,22 +3,66 @@ Ventana principal de la aplicación
 """
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTabWidget,
-    QTableWidget, QTableWidgetItem, QPushButton, QHeaderView, QMessageBox,
-    QTextEdit, QLabel, QComboBox, QSplitter
+    QTableView, QAbstractItemView, QPushButton, QHeaderView, QMessageBox,
+    QTextEdit, QLabel, QComboBox, QSplitter, QCompleter, QFileDialog
 )
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QFont, QIcon
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QFont, QIcon, QKeySequence, QShortcut
 
-from db.repository import CompanyRepository, EmployeeRepository, MessageTemplateRepository
+from config.metrics import MESSAGES_DEFERRED
+from config.tracing import span
+from db.events import DELETED
+from db.query_log import query_log
+from db.repository import (
+    CompanyRepository, EmployeeRepository, MessageTemplateRepository, ContactIssueRepository,
+    SegmentRepository
+)
 from models.company import Company
 from models.employee import Employee
 from ui.dialogs import (
     AddCompanyDialog, EditCompanyDialog, AddEmployeeDialog, EditEmployeeDialog,
-    EmailConfigDialog
+    EmailConfigDialog, QueryLogDialog, SegmentDialog, ScheduleDialog, CampaignsDialog,
+    DeliveryStatsDialog
+)
+from ui.widgets import StyledButton, FilterBar
+from ui.models import (
+    CompanyListModel, CompanyTableModel, EmployeeTableModel, OBJECT_ROLE, COMPANY_NAME_COLUMN
 )
-from ui.widgets import StyledButton
-from services.message_service import MessageService
-from services.email_service import EmailService
+from ui.loader import DataLoader
+from ui.events import ChangeNotifier
+
+# Filtros del diálogo de exportación -> extensión del archivo
+EXPORT_FILTERS = {
+    "CSV (*.csv)": ".csv",
+    "CSV comprimido (*.csv.gz)": ".csv.gz",
+    "JSON Lines (*.jsonl)": ".jsonl",
+    "JSON Lines comprimido (*.jsonl.gz)": ".jsonl.gz",
+}
+
+
+# Mensajes que muestra la vista previa de un segmento
+SEGMENT_PREVIEW_LIMIT = 20
+
+
+def _segment_preview(segment, template: str) -> str:
+    """Vista previa de los primeros mensajes del segmento (se arma en segundo plano)"""
+    from services.message_service import MessageService
+    audience = SegmentRepository.count_by_company(segment)
+    total = sum(count for _, count in audience)
+    
+    preview = f"VISTA PREVIA · {total} empleados en {len(audience)} empresas\n"
+    preview += "=" * 50 + "\n\n"
+    
+    companies = {company.id: company for company, _ in audience}
+    employees = SegmentRepository.read_page(segment, None, SEGMENT_PREVIEW_LIMIT)
+    for employee in employees:
+        company = companies[employee.company_id]
+        preview += f"📧 {employee.email} ({company.name})\n"
+        preview += "-" * 50 + "\n"
+        preview += MessageService.render_message(template, employee, company.name) + "\n\n"
+    if total > len(employees):
+        preview += f"… y {total - len(employees)} más"
+    return preview
 
 
 class MainWindow(QMainWindow):
@@ -31,10 +75,52 @@ class MainWindow(QMainWindow):
         
         self.current_company = None
         self.current_employees = []
+        self.message_company_id = None
+        # Empleados cambiados que todavía no se releyeron para current_employees
+        self._changed_employee_ids = set()
+        # Segmento entre empresas del tab de mensajes (None = la empresa del combo)
+        self.message_segment = None
+        # Adjuntos del tab de mensajes, ya codificados (ver services/attachments.py)
+        self.message_attachments = []
+        # Tabs que se construyen al activarlos por primera vez (índice -> constructor)
+        self._deferred_tabs = {}
         self.email_service = None  # Servicio de email (se configura en sesión)
+        # Campañas programadas: se envían con las credenciales de la sesión
+        from services.scheduler import CampaignScheduler
+        self.scheduler = CampaignScheduler(
+            lambda: self.email_service.config if self.email_service else None
+        )
+        # Vacuum incremental y PRAGMA optimize en segundo plano
+        from services.maintenance import MaintenanceTask
+        self.maintenance = MaintenanceTask()
+        
+        # Lecturas de BD fuera del hilo de la UI
+        self.loader = DataLoader(self)
+        self.loader.loading.connect(self.on_data_loading)
+        self.loader.loaded.connect(self.on_data_loaded)
+        self.loader.failed.connect(self.on_data_failed)
+        
+        # Modelo de empresas compartido por la tabla y los combos
+        self.company_list_model = CompanyListModel(self, self.loader, "companies")
+        
+        # Cambios publicados por los repositorios: cada vista actualiza sus filas
+        self.change_notifier = ChangeNotifier(self)
+        
+        # Se crean aunque su tab se construya más tarde (reciben cambios y cargas desde el inicio)
+        self.employees_model = EmployeeTableModel(self, self.loader, "employees")
+        self.employees_status = QLabel("Empleados:")
         
         self.init_ui()
-        self.load_companies()
+        if query_log.enabled:
+            # Panel de consultas SQL (solo con --sql-trace)
+            QShortcut(QKeySequence("Ctrl+Shift+Q"), self, activated=self.show_query_log)
+        for model in (self.company_list_model, self.companies_table_model, self.employees_model):
+            self.change_notifier.changed.connect(model.apply_change)
+        self.change_notifier.changed.connect(self.on_data_changed)
+        # Consultar la BD recién cuando la ventana ya se está mostrando
+        QTimer.singleShot(0, self.load_companies)
+        QTimer.singleShot(0, self.scheduler.start)
+        QTimer.singleShot(0, self.maintenance.start)
     
     def init_ui(self):
         """Inicializa la interfaz gráfica"""
@@ -58,32 +144,64 @@ class MainWindow(QMainWindow):
         self.tab_companies = self.create_companies_tab()
         self.tabs.addTab(self.tab_companies, "Empresas")
         
-        # Tab 2: Empleados
-        self.tab_employees = self.create_employees_tab()
-        self.tabs.addTab(self.tab_employees, "Empleados")
+        # Tab 2: Empleados (se construye al activarlo)
+        self.tab_employees = self.add_deferred_tab(self.create_employees_tab, "Empleados")
+        
+        # Tab 3: Mensajes (se construye al activarlo)
+        self.tab_messages = self.add_deferred_tab(self.create_messages_tab, "Mensajes")
         
-        # Tab 3: Mensajes
-        self.tab_messages = self.create_messages_tab()
-        self.tabs.addTab(self.tab_messages, "Mensajes")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
         
         main_layout.addWidget(self.tabs)
         central_widget.setLayout(main_layout)
     
+    def add_deferred_tab(self, builder, title: str) -> QWidget:
+        """Agrega un tab vacío cuyo contenido se crea con builder() al activarlo"""
+        container = QWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        container.setLayout(layout)
+        
+        index = self.tabs.addTab(container, title)
+        self._deferred_tabs[index] = builder
+        return container
+    
+    def on_tab_changed(self, index: int):
+        """Construye el contenido de un tab diferido la primera vez que se activa"""
+        builder = self._deferred_tabs.pop(index, None)
+        if builder is None:
+            return
+        
+        container = self.tabs.widget(index)
+        layout = container.layout() if container else None
+        if layout is not None:
+            layout.addWidget(builder())
+    
     def create_companies_tab(self):
         """Crea el tab de gestión de empresas"""
         tab = QWidget()
         layout = QVBoxLayout()
         
-        # Tabla de empresas
-        self.companies_table = QTableWidget()
-        self.companies_table.setColumnCount(5)
-        self.companies_table.setHorizontalHeaderLabels(["ID", "Nombre", "Email", "Teléfono", "Dirección"])
+        # Tabla de empresas (orden y filtros se resuelven en SQL)
+        self.companies_table_model = CompanyTableModel(self, self.loader, "companies_table")
+        self.companies_table = QTableView()
+        self.companies_table.setModel(self.companies_table_model)
+        self.companies_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         header = self.companies_table.horizontalHeader()
         if header:
             header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.companies_table.itemSelectionChanged.connect(self.on_company_selected)
-        
-        layout.addWidget(QLabel("Empresas Registradas:"))
+            header.setSortIndicator(COMPANY_NAME_COLUMN, Qt.SortOrder.AscendingOrder)
+        self.companies_table.setSortingEnabled(True)
+        selection_model = self.companies_table.selectionModel()
+        if selection_model:
+            selection_model.selectionChanged.connect(self.on_company_selected)
+        
+        companies_filter = FilterBar(CompanyTableModel.COLUMNS)
+        companies_filter.filters_changed.connect(self.companies_table_model.set_filters)
+        
+        self.companies_status = QLabel("Empresas Registradas:")
+        layout.addWidget(self.companies_status)
+        layout.addWidget(companies_filter)
         layout.addWidget(self.companies_table)
         
         # Botones
@@ -91,14 +209,20 @@ class MainWindow(QMainWindow):
         button_add = StyledButton("+ Agregar Empresa", "success")
         button_edit = StyledButton("✎ Editar", "primary")
         button_delete = StyledButton("🗑 Eliminar", "danger")
+        button_archive = StyledButton("📦 Archivar", "primary")
+        button_export = StyledButton("⬇ Exportar", "primary")
         
         button_add.clicked.connect(self.add_company)
         button_edit.clicked.connect(self.edit_company)
         button_delete.clicked.connect(self.delete_company)
+        button_archive.clicked.connect(self.archive_company)
+        button_export.clicked.connect(self.export_companies)
         
         buttons_layout.addWidget(button_add)
         buttons_layout.addWidget(button_edit)
         buttons_layout.addWidget(button_delete)
+        buttons_layout.addWidget(button_archive)
+        buttons_layout.addWidget(button_export)
         buttons_layout.addStretch()
         
         layout.addLayout(buttons_layout)
@@ -113,22 +237,28 @@ class MainWindow(QMainWindow):
         # Selector de empresa
         selector_layout = QHBoxLayout()
         selector_layout.addWidget(QLabel("Empresa:"))
-        self.company_combo = QComboBox()
+        self.company_combo = self.create_company_combo()
         self.company_combo.currentIndexChanged.connect(self.on_company_filter_changed)
         selector_layout.addWidget(self.company_combo)
         selector_layout.addStretch()
         
         layout.addLayout(selector_layout)
         
-        # Tabla de empleados
-        self.employees_table = QTableWidget()
-        self.employees_table.setColumnCount(6)
-        self.employees_table.setHorizontalHeaderLabels(["ID", "Nombre", "Apellido", "Email", "Teléfono", "Posición"])
+        # Tabla de empleados (orden y filtros se resuelven en SQL)
+        self.employees_table = QTableView()
+        self.employees_table.setModel(self.employees_model)
+        self.employees_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         header = self.employees_table.horizontalHeader()
         if header:
             header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+            header.setSortIndicator(1, Qt.SortOrder.AscendingOrder)
+        self.employees_table.setSortingEnabled(True)
         
-        layout.addWidget(QLabel("Empleados:"))
+        employees_filter = FilterBar(EmployeeTableModel.COLUMNS)
+        employees_filter.filters_changed.connect(self.employees_model.set_filters)
+        
+        layout.addWidget(self.employees_status)
+        layout.addWidget(employees_filter)
         layout.addWidget(self.employees_table)
         
         # Botones
@@ -136,18 +266,27 @@ class MainWindow(QMainWindow):
         button_add_employee = StyledButton("+ Agregar Empleado", "success")
         button_edit_employee = StyledButton("✎ Editar", "primary")
         button_delete_employee = StyledButton("🗑 Eliminar", "danger")
+        button_validate_contacts = StyledButton("✔ Validar Contactos", "primary")
+        button_export_employees = StyledButton("⬇ Exportar", "primary")
         
         button_add_employee.clicked.connect(self.add_employee)
         button_edit_employee.clicked.connect(self.edit_employee)
         button_delete_employee.clicked.connect(self.delete_employee)
+        button_validate_contacts.clicked.connect(self.validate_contacts)
+        button_export_employees.clicked.connect(self.export_employees)
         
         buttons_layout.addWidget(button_add_employee)
         buttons_layout.addWidget(button_edit_employee)
         buttons_layout.addWidget(button_delete_employee)
+        buttons_layout.addWidget(button_validate_contacts)
+        buttons_layout.addWidget(button_export_employees)
         buttons_layout.addStretch()
         
         layout.addLayout(buttons_layout)
         tab.setLayout(layout)
+        
+        # El tab se crea al activarlo: mostrar la empresa ya seleccionada en el combo
+        self.on_company_filter_changed()
         return tab
     
     def create_messages_tab(self):
@@ -158,9 +297,18 @@ class MainWindow(QMainWindow):
         # Selector de empresa
         selector_layout = QHBoxLayout()
         selector_layout.addWidget(QLabel("Empresa:"))
-        self.msg_company_combo = QComboBox()
+        self.msg_company_combo = self.create_company_combo()
         self.msg_company_combo.currentIndexChanged.connect(self.on_message_company_changed)
         selector_layout.addWidget(self.msg_company_combo)
+        button_segment = StyledButton("🎯 Segmento", "primary")
+        self.button_clear_segment = StyledButton("✖ Quitar Segmento", "danger")
+        button_segment.clicked.connect(self.edit_segment)
+        self.button_clear_segment.clicked.connect(self.clear_segment)
+        self.button_clear_segment.hide()
+        self.segment_label = QLabel()
+        selector_layout.addWidget(button_segment)
+        selector_layout.addWidget(self.button_clear_segment)
+        selector_layout.addWidget(self.segment_label)
         selector_layout.addStretch()
         
         layout.addLayout(selector_layout)
@@ -181,6 +329,20 @@ class MainWindow(QMainWindow):
         self.message_template.setMaximumHeight(150)
         layout.addWidget(self.message_template)
         
+        # Adjuntos (los mismos para todos los destinatarios)
+        attachments_layout = QHBoxLayout()
+        button_attach = StyledButton("📎 Adjuntar", "primary")
+        self.button_clear_attachments = StyledButton("✖ Quitar Adjuntos", "danger")
+        button_attach.clicked.connect(self.attach_files)
+        self.button_clear_attachments.clicked.connect(self.clear_attachments)
+        self.button_clear_attachments.hide()
+        self.attachments_label = QLabel()
+        attachments_layout.addWidget(button_attach)
+        attachments_layout.addWidget(self.button_clear_attachments)
+        attachments_layout.addWidget(self.attachments_label)
+        attachments_layout.addStretch()
+        layout.addLayout(attachments_layout)
+        
         # Vista previa
         layout.addWidget(QLabel("Vista Previa (todos los empleados):"))
         self.preview_area = QTextEdit()
@@ -191,82 +353,195 @@ class MainWindow(QMainWindow):
         buttons_layout = QHBoxLayout()
         button_preview = StyledButton("👁 Generar Vista Previa", "primary")
         button_copy_recipients = StyledButton("📋 Copiar Destinatarios", "success")
+        button_export_messages = StyledButton("⬇ Exportar Mensajes", "primary")
         button_configure_email = StyledButton("⚙️ Configurar Email", "primary")
         button_send_emails = StyledButton("📧 Enviar Emails", "success")
+        button_schedule = StyledButton("⏰ Programar", "success")
+        button_campaigns = StyledButton("📅 Campañas", "primary")
+        button_stats = StyledButton("📊 Estadísticas", "primary")
         button_variables_help = StyledButton("? Variables", "primary")
         
         button_preview.clicked.connect(self.generate_preview)
         button_copy_recipients.clicked.connect(self.copy_recipients)
+        button_export_messages.clicked.connect(self.export_messages)
         button_configure_email.clicked.connect(self.configure_email)
         button_send_emails.clicked.connect(self.send_emails)
+        button_schedule.clicked.connect(self.schedule_campaign)
+        button_campaigns.clicked.connect(self.show_campaigns)
+        button_stats.clicked.connect(self.show_delivery_stats)
         button_variables_help.clicked.connect(self.show_variables_help)
         
         buttons_layout.addWidget(button_preview)
         buttons_layout.addWidget(button_copy_recipients)
+        buttons_layout.addWidget(button_export_messages)
         buttons_layout.addWidget(button_configure_email)
         buttons_layout.addWidget(button_send_emails)
+        buttons_layout.addWidget(button_schedule)
+        buttons_layout.addWidget(button_campaigns)
+        buttons_layout.addWidget(button_stats)
         buttons_layout.addWidget(button_variables_help)
         buttons_layout.addStretch()
         
         layout.addLayout(buttons_layout)
         tab.setLayout(layout)
+        
+        # El tab se crea al activarlo: cargar la empresa ya seleccionada en el combo
+        self.on_message_company_changed()
         return tab
     
+    def create_company_combo(self) -> QComboBox:
+        """Crea un combo sobre el modelo compartido de empresas, con búsqueda al escribir"""
+        combo = QComboBox()
+        combo.setModel(self.company_list_model)
+        combo.setModelColumn(COMPANY_NAME_COLUMN)
+        combo.setEditable(True)
+        combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        combo.setMinimumWidth(250)
+        
+        # El modelo está ordenado sin distinguir mayúsculas: el completer
+        # busca por prefijo con búsqueda binaria en lugar de recorrerlo
+        completer = QCompleter(self.company_list_model, combo)
+        completer.setCompletionColumn(COMPANY_NAME_COLUMN)
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        completer.setModelSorting(QCompleter.ModelSorting.CaseInsensitivelySortedModel)
+        completer.setFilterMode(Qt.MatchFlag.MatchStartsWith)
+        combo.setCompleter(completer)
+        return combo
+    
     # ========== MÉTODOS DE EMPRESAS ==========
     
     def load_companies(self):
-        """Carga todas las empresas en la tabla"""
-        companies = CompanyRepository.read_all()
-        self.companies_table.setRowCount(len(companies))
-        
-        for row, company in enumerate(companies):
-            self.companies_table.setItem(row, 0, QTableWidgetItem(str(company.id)))
-            self.companies_table.setItem(row, 1, QTableWidgetItem(company.name))
-            self.companies_table.setItem(row, 2, QTableWidgetItem(company.email or ""))
-            self.companies_table.setItem(row, 3, QTableWidgetItem(company.phone or ""))
-            self.companies_table.setItem(row, 4, QTableWidgetItem(company.address or ""))
-        
-        self.update_company_combos()
+        """Carga las empresas en los combos y la primera página de la tabla"""
+        self.company_list_model.reload()
+        self.companies_table_model.reload()
     
-    def update_company_combos(self):
-        """Actualiza los combobox de empresas"""
-        companies = CompanyRepository.read_all()
-        
-        # Limpiar combos
-        self.company_combo.blockSignals(True)
-        self.msg_company_combo.blockSignals(True)
-        
-        self.company_combo.clear()
-        self.msg_company_combo.clear()
-        
-        for company in companies:
-            self.company_combo.addItem(company.name, company.id)
-            self.msg_company_combo.addItem(company.name, company.id)
+    # ========== CARGA EN SEGUNDO PLANO ==========
+    
+    def on_data_loading(self, key: str):
+        """Muestra un indicador mientras se cargan datos"""
+        if key == "companies_table":
+            self.companies_status.setText("Empresas Registradas: ⏳ Cargando...")
+        elif key == "employees":
+            self.employees_status.setText("Empleados: ⏳ Cargando...")
+        elif key in ("message_employees", "segment_preview"):
+            self.preview_area.setText("⏳ Cargando empleados...")
+    
+    def on_data_loaded(self, key: str, result):
+        """Entrega los datos cargados en segundo plano a cada vista"""
+        with span("MainWindow.on_data_loaded", "ui", key=key):
+            if key == "companies_table":
+                self.companies_status.setText("Empresas Registradas:")
+            elif key == "employees":
+                self.employees_status.setText("Empleados:")
+            elif key == "message_employees":
+                self.current_employees = result
+                self.generate_preview()
+            elif key == "message_employees_patch":
+                company_id, ids, employees = result
+                self._changed_employee_ids.difference_update(ids)
+                # Si cambió la empresa del tab ya se está cargando la lista completa
+                if company_id == self.message_company_id:
+                    self.patch_message_employees(set(ids), employees)
+        if key == "validate_contacts":
+            QMessageBox.information(self, "Validación de Contactos", result.summary())
+        elif key == "export":
+            path, count = result
+            QMessageBox.information(self, "✅ Exportación", f"{count} filas exportadas a:\n{path}")
+        elif key == "delete_company":
+            QMessageBox.information(self, "Éxito", "Empresa eliminada")
+        elif key == "archive_company":
+            QMessageBox.information(self, "Éxito", "Empresa archivada")
+        elif key == "segment_count":
+            segment, count = result
+            if segment is self.message_segment:
+                self.segment_label.setText(f"{count} empleados · {segment.describe()}")
+        elif key == "segment_preview":
+            segment, preview = result
+            if segment is self.message_segment:
+                self.preview_area.setText(preview)
+        elif key == "segment_audience":
+            self.confirm_segment_send(*result)
+        elif key == "campaign_scheduled":
+            self.show_campaign_scheduled(*result)
+        elif key == "send_segment":
+            QMessageBox.information(
+                self, "📧 Envío",
+                f"Enviados: {result.sent} · Fallidos: {result.failed} · "
+                f"Excluidos por problemas de contacto: {result.excluded}"
+            )
+    
+    def on_data_changed(self, event):
+        """Actualiza los destinatarios del tab de mensajes con los empleados que cambiaron"""
+        if event.entity != "employee" or not self.message_company_id:
+            return
+        if event.action == DELETED:
+            self.patch_message_employees(set(event.ids), [])
+            return
+        if len(event.ids) > EmployeeTableModel.PATCH_LIMIT:
+            self.load_message_employees()
+            return
         
-        self.company_combo.blockSignals(False)
-        self.msg_company_combo.blockSignals(False)
+        # Se releen solo esos IDs y solo si son de la empresa del tab. Los
+        # pedidos con la misma clave se combinan: se acumulan los IDs hasta
+        # que llega una respuesta que los incluye
+        self._changed_employee_ids.update(event.ids)
+        company_id, ids = self.message_company_id, list(self._changed_employee_ids)
+        self.loader.request(
+            "message_employees_patch",
+            lambda: (company_id, ids, EmployeeRepository.read_page_by_company(
+                company_id, None, len(ids), ids=ids
+            ))
+        )
+    
+    def patch_message_employees(self, ids: set, employees: list):
+        """Reemplaza en current_employees los empleados con esos IDs por los releídos"""
+        if not ids & {e.id for e in self.current_employees} and not employees:
+            return
+        kept = [e for e in self.current_employees if e.id not in ids]
+        # Mismo orden que EmployeeRepository.read_by_company
+        self.current_employees = sorted(kept + employees, key=lambda e: e.first_name)
+        self.generate_preview()
+    
+    def on_data_failed(self, key: str, message: str):
+        """Informa un error de carga en segundo plano"""
+        if key == "companies_table":
+            self.companies_status.setText("Empresas Registradas:")
+        elif key == "employees":
+            self.employees_status.setText("Empleados:")
+        elif key == "send_segment":
+            QMessageBox.critical(self, "Error", f"Error al enviar: {message}")
+            return
+        QMessageBox.critical(self, "Error", f"Error al cargar datos: {message}")
     
     def on_company_selected(self):
         """Evento cuando se selecciona una empresa"""
-        row = self.companies_table.currentRow()
-        if row >= 0:
-            item = self.companies_table.item(row, 0)
-            if item is not None:
-                company_id = int(item.text())
-                self.current_company = CompanyRepository.read(company_id)
+        index = self.companies_table.currentIndex()
+        if index.isValid():
+            # La fila ya cargada por la tabla (sin leer la BD en el hilo de la interfaz)
+            company = index.data(OBJECT_ROLE)
+            if company is not None:
+                self.current_company = company
     
     def on_company_filter_changed(self):
         """Evento cuando cambia el filtro de empresa"""
         company_id = self.company_combo.currentData()
-        if company_id:
+        # El índice también cambia cuando se insertan empresas antes de la actual
+        if company_id and company_id != self.employees_model.company_id:
             self.load_employees_for_company(company_id)
     
     def on_message_company_changed(self):
         """Evento cuando cambia empresa en tab de mensajes"""
         company_id = self.msg_company_combo.currentData()
-        if company_id:
-            self.current_employees = EmployeeRepository.read_by_company(company_id)
-            self.generate_preview()
+        if company_id and company_id != self.message_company_id:
+            self.message_company_id = company_id
+            self.load_message_employees()
+    
+    def load_message_employees(self):
+        """Carga en segundo plano los destinatarios de la empresa del tab de mensajes"""
+        if self.message_company_id:
+            self.loader.request(
+                "message_employees", EmployeeRepository.read_by_company, self.message_company_id
+            )
     
     def add_company(self):
         """Abre diálogo para agregar empresa"""
@@ -277,7 +552,6 @@ class MainWindow(QMainWindow):
                     QMessageBox.warning(self, "Error", "No se completó el diálogo correctamente")
                     return
                 company_id = CompanyRepository.create(dialog.result)
-                self.load_companies()
                 QMessageBox.information(self, "Éxito", f"Empresa agregada (ID: {company_id})")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Error al agregar empresa: {str(e)}")
@@ -296,7 +570,7 @@ class MainWindow(QMainWindow):
                     return
                 dialog.result.id = self.current_company.id
                 CompanyRepository.update(dialog.result)
-                self.load_companies()
+                self.current_company = dialog.result
                 QMessageBox.information(self, "Éxito", "Empresa actualizada")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Error al editar empresa: {str(e)}")
@@ -312,29 +586,34 @@ class MainWindow(QMainWindow):
             f"¿Eliminar empresa '{self.current_company.name}' y todos sus empleados?"
         )
         
-        if reply == QMessageBox.StandardButton.Yes:
-            try:
-                if self.current_company.id is not None:
-                    CompanyRepository.delete(self.current_company.id)
-                self.load_companies()
-                QMessageBox.information(self, "Éxito", "Empresa eliminada")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Error al eliminar empresa: {str(e)}")
+        if reply == QMessageBox.StandardButton.Yes and self.current_company.id is not None:
+            # Los empleados se borran por bloques fuera del hilo de la UI
+            self.loader.request("delete_company", CompanyRepository.delete, self.current_company.id)
+            self.current_company = None
+    
+    def archive_company(self):
+        """Mueve la empresa seleccionada y sus empleados al archivo"""
+        if not self.current_company:
+            QMessageBox.warning(self, "Error", "Selecciona una empresa primero")
+            return
+        
+        reply = QMessageBox.question(
+            self, "Confirmar archivo",
+            f"¿Archivar empresa '{self.current_company.name}' y todos sus empleados?\n"
+            "Se puede restaurar con: python -m cli restore"
+        )
+        
+        if reply == QMessageBox.StandardButton.Yes and self.current_company.id is not None:
+            self.loader.request(
+                "archive_company", CompanyRepository.archive_many, [self.current_company.id]
+            )
+            self.current_company = None
     
     # ========== MÉTODOS DE EMPLEADOS ==========
     
     def load_employees_for_company(self, company_id: int):
-        """Carga empleados de una empresa específica"""
-        employees = EmployeeRepository.read_by_company(company_id)
-        self.employees_table.setRowCount(len(employees))
-        
-        for row, employee in enumerate(employees):
-            self.employees_table.setItem(row, 0, QTableWidgetItem(str(employee.id)))
-            self.employees_table.setItem(row, 1, QTableWidgetItem(employee.first_name))
-            self.employees_table.setItem(row, 2, QTableWidgetItem(employee.last_name))
-            self.employees_table.setItem(row, 3, QTableWidgetItem(employee.email))
-            self.employees_table.setItem(row, 4, QTableWidgetItem(employee.phone or ""))
-            self.employees_table.setItem(row, 5, QTableWidgetItem(employee.position or ""))
+        """Carga empleados de una empresa específica (por páginas, bajo demanda)"""
+        self.employees_model.set_company(company_id)
     
     def add_employee(self):
         """Abre diálogo para agregar empleado"""
@@ -343,7 +622,7 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "Selecciona una empresa primero")
             return
         
-        company = CompanyRepository.read(company_id)
+        company = self.company_list_model.company(company_id)
         if company is None:
             QMessageBox.warning(self, "Error", "No se pudo cargar la empresa")
             return
@@ -357,30 +636,24 @@ class MainWindow(QMainWindow):
                     return
                 dialog.result.company_id = company_id
                 employee_id = EmployeeRepository.create(dialog.result)
-                self.load_employees_for_company(company_id)
                 QMessageBox.information(self, "Éxito", f"Empleado agregado (ID: {employee_id})")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Error al agregar empleado: {str(e)}")
     
     def edit_employee(self):
         """Edita el empleado seleccionado"""
-        row = self.employees_table.currentRow()
-        if row < 0:
+        index = self.employees_table.currentIndex()
+        if not index.isValid():
             QMessageBox.warning(self, "Error", "Selecciona un empleado primero")
             return
         
-        item = self.employees_table.item(row, 0)
-        if item is None:
-            QMessageBox.warning(self, "Error", "No se pudo leer ID del empleado")
-            return
-        
-        employee_id = int(item.text())
-        employee = EmployeeRepository.read(employee_id)
+        # Filas ya cargadas por la tabla y el modelo de empresas
+        employee = index.data(OBJECT_ROLE)
         if employee is None:
             QMessageBox.warning(self, "Error", "No se pudo cargar el empleado")
             return
         
-        company = CompanyRepository.read(employee.company_id)
+        company = self.company_list_model.company(employee.company_id)
         if company is None:
             QMessageBox.warning(self, "Error", "No se pudo cargar la empresa")
             return
@@ -393,25 +666,18 @@ class MainWindow(QMainWindow):
                     QMessageBox.warning(self, "Error", "No se completó el diálogo correctamente")
                     return
                 EmployeeRepository.update(dialog.result)
-                self.load_employees_for_company(employee.company_id)
                 QMessageBox.information(self, "Éxito", "Empleado actualizado")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Error al editar empleado: {str(e)}")
     
     def delete_employee(self):
         """Elimina el empleado seleccionado"""
-        row = self.employees_table.currentRow()
-        if row < 0:
+        index = self.employees_table.currentIndex()
+        if not index.isValid():
             QMessageBox.warning(self, "Error", "Selecciona un empleado primero")
             return
         
-        item = self.employees_table.item(row, 0)
-        if item is None:
-            QMessageBox.warning(self, "Error", "No se pudo leer ID del empleado")
-            return
-        
-        employee_id = int(item.text())
-        employee = EmployeeRepository.read(employee_id)
+        employee = index.data(OBJECT_ROLE)
         if employee is None:
             QMessageBox.warning(self, "Error", "No se pudo cargar el empleado")
             return
@@ -423,16 +689,74 @@ class MainWindow(QMainWindow):
         
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                EmployeeRepository.delete(employee_id)
-                self.load_employees_for_company(employee.company_id)
+                EmployeeRepository.delete(employee.id)
                 QMessageBox.information(self, "Éxito", "Empleado eliminado")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Error al eliminar empleado: {str(e)}")
     
+    def validate_contacts(self):
+        """Valida y normaliza los contactos de todos los empleados"""
+        from services.contact_validator import ContactValidator
+        self.loader.request("validate_contacts", ContactValidator().run)
+    
     # ========== MÉTODOS DE MENSAJES ==========
     
+    def edit_segment(self):
+        """Define el segmento de audiencia (reemplaza a la empresa del combo)"""
+        dialog = SegmentDialog(self.company_list_model, self.message_segment, self)
+        if dialog.exec() == 1 and dialog.result is not None:
+            segment = self.message_segment = dialog.result
+            self.segment_label.setText(f"⏳ · {segment.describe()}")
+            self.loader.request("segment_count", lambda: (segment, SegmentRepository.count(segment)))
+            self.msg_company_combo.setEnabled(False)
+            self.button_clear_segment.show()
+            self.generate_preview()
+    
+    def clear_segment(self):
+        """Vuelve a enviar a la empresa seleccionada en el combo"""
+        self.message_segment = None
+        self.segment_label.clear()
+        self.msg_company_combo.setEnabled(True)
+        self.button_clear_segment.hide()
+        self.generate_preview()
+    
+    def attach_files(self):
+        """Elige los adjuntos del envío (se leen y codifican una sola vez)"""
+        paths, _ = QFileDialog.getOpenFileNames(self, "Adjuntar archivos")
+        if not paths:
+            return
+        from services.attachments import load_attachments
+        try:
+            self.message_attachments = load_attachments(paths)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
+        total = sum(a.size for a in self.message_attachments)
+        names = ", ".join(a.filename for a in self.message_attachments)
+        self.attachments_label.setText(f"{names} ({total / 1048576:.1f} MB)")
+        self.button_clear_attachments.show()
+    
+    def clear_attachments(self):
+        """Envía los mensajes sin adjuntos"""
+        self.message_attachments = []
+        self.attachments_label.clear()
+        self.button_clear_attachments.hide()
+    
+    def generate_preview_segment(self, template: str):
+        """Vista previa de los primeros mensajes del segmento (en segundo plano)"""
+        segment = self.message_segment
+        self.loader.request("segment_preview", lambda: (segment, _segment_preview(segment, template)))
+    
     def generate_preview(self):
         """Genera preview de mensajes para todos los empleados"""
+        if self.message_segment is not None:
+            template = self.message_template.toPlainText()
+            if not template.strip():
+                self.preview_area.setText("Escribe un template primero")
+                return
+            self.generate_preview_segment(template)
+            return
+        
         if not self.current_employees:
             self.preview_area.setText("No hay empleados para esta empresa")
             return
@@ -442,12 +766,12 @@ class MainWindow(QMainWindow):
             self.preview_area.setText("Escribe un template primero")
             return
         
-        company_id = self.msg_company_combo.currentData()
-        company = CompanyRepository.read(company_id)
+        company = self.company_list_model.company(self.msg_company_combo.currentData())
         if company is None:
             self.preview_area.setText("No se pudo cargar la empresa")
             return
         
+        from services.message_service import MessageService
         messages = MessageService.render_for_all_employees(
             template, self.current_employees, company.name
         )
@@ -462,6 +786,56 @@ class MainWindow(QMainWindow):
         
         self.preview_area.setText(preview)
     
+    # ========== EXPORTACIÓN ==========
+    
+    def export_data(self, entity: str, default_name: str, **kwargs):
+        """Pide el archivo destino y exporta en segundo plano (formato según la extensión)"""
+        from services.export import export_to_file
+        
+        path, selected = QFileDialog.getSaveFileName(
+            self, "Exportar", default_name, ";;".join(EXPORT_FILTERS)
+        )
+        if not path:
+            return
+        extension = EXPORT_FILTERS.get(selected, ".csv")
+        if not path.lower().endswith(tuple(EXPORT_FILTERS.values())):
+            path += extension
+        
+        self.loader.request("export", lambda: (path, export_to_file(path, entity, **kwargs)))
+    
+    def export_companies(self):
+        """Exporta todas las empresas"""
+        self.export_data("companies", "empresas.csv")
+    
+    def export_employees(self):
+        """Exporta los empleados de la empresa seleccionada"""
+        company_id = self.company_combo.currentData()
+        if not company_id:
+            QMessageBox.warning(self, "Error", "Selecciona una empresa primero")
+            return
+        self.export_data("employees", "empleados.csv", company_id=company_id)
+    
+    def export_messages(self):
+        """Exporta los mensajes renderizados para todos los empleados de la empresa"""
+        template = self.message_template.toPlainText()
+        if not template.strip():
+            QMessageBox.warning(self, "Error", "Escribe un template primero")
+            return
+        
+        if self.message_segment is not None:
+            # Las empresas del segmento se leen al exportar, en segundo plano
+            self.export_data(
+                "messages", "mensajes.jsonl", template=template, companies=None,
+                segment=self.message_segment
+            )
+            return
+        
+        company = self.company_list_model.company(self.msg_company_combo.currentData())
+        if company is None:
+            QMessageBox.warning(self, "Error", "Selecciona una empresa primero")
+            return
+        self.export_data("messages", "mensajes.jsonl", template=template, companies=[company])
+    
     def copy_recipients(self):
         """Copia todos los emails como destinatarios"""
         if not self.current_employees:
@@ -493,11 +867,14 @@ class MainWindow(QMainWindow):
                     QMessageBox.warning(self, "Error", "No se completó el diálogo correctamente")
                     return
                 # Crear servicio con la configuración
+                from services.email_service import EmailService
                 self.email_service = EmailService(dialog.result)
                 
                 # Probar conexión
                 success, message = self.email_service.connect()
                 if success:
+                    # Las campañas vencidas que esperaban credenciales salen ahora
+                    self.scheduler.wake()
                     QMessageBox.information(self, "✅ Éxito", f"{message}\nEmail configurado correctamente")
                 else:
                     self.email_service = None
@@ -507,6 +884,14 @@ class MainWindow(QMainWindow):
     
     def send_emails(self):
         """Envía emails a todos los empleados"""
+        # El envío al segmento usa la misma conexión SMTP desde otro hilo
+        if self.loader.is_loading("send_segment"):
+            QMessageBox.warning(self, "Error", "Ya hay un envío al segmento en curso")
+            return
+        if self.message_segment is not None:
+            self.send_emails_to_segment()
+            return
+        
         if not self.current_employees:
             QMessageBox.warning(self, "Error", "No hay empleados en esta empresa")
             return
@@ -524,39 +909,62 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "Escribe un template primero")
             return
         
-        # Generar asunto simple
-        subject = "Mensaje de " + (self.current_company.name if self.current_company else "Empresa")
-        
-        # Generar mensajes
-        if self.current_company is None:
+        # Empresa del tab de mensajes (la de current_employees), no la seleccionada en el tab de empresas
+        company = self.company_list_model.company(self.message_company_id)
+        if company is None:
             QMessageBox.warning(self, "Error", "No se pudo cargar la empresa")
             return
         
+        # Generar asunto simple
+        subject = "Mensaje de " + company.name
+        
+        # Generar mensajes
+        from services.message_service import MessageService
         messages = MessageService.render_for_all_employees(
             template,
             self.current_employees,
-            self.current_company.name
+            company.name
         )
         
-        # Obtener emails
+        # Obtener emails, excluyendo los marcados por la validación de contactos
         emails = list(messages.keys())
+        blocked = ContactIssueRepository.blocked_emails(emails)
+        if blocked:
+            emails = [e for e in emails if e not in blocked]
+        if not emails:
+            QMessageBox.warning(self, "Error", "Ningún destinatario tiene un email válido")
+            return
+        
+        excluded = f"\n\nExcluidos por problemas de contacto: {', '.join(sorted(blocked))}" if blocked else ""
         
         # Confirmar envío
         respuesta = QMessageBox.question(
             self, "Confirmar envío",
-            f"¿Enviar emails a {len(emails)} empleados?\n\n{', '.join(emails)}"
+            f"¿Enviar emails a {len(emails)} empleados?\n\n{', '.join(emails)}{excluded}"
         )
         
         if respuesta != QMessageBox.StandardButton.Yes:
             return
+        if blocked:
+            MESSAGES_DEFERRED.inc(len(blocked), reason="contact_issue")
         
         # Enviar
+        from services.delivery import record_deliveries
+        from services.message_archive import archive_messages
+        delivered = []
         try:
             success, message, sent_count = self.email_service.send_emails(
                 emails,
                 subject,
                 messages,
-                self.current_company.name
+                company.name,
+                delivered=delivered,
+                attachments=self.message_attachments
+            )
+            record_deliveries(company.id, self.current_employees, blocked, delivered)
+            archive_messages(
+                template, subject, company, self.current_employees, messages, delivered,
+                cc_recipients=emails
             )
             
             if success:
@@ -566,12 +974,113 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error al enviar: {str(e)}")
     
+    def send_emails_to_segment(self):
+        """Envía a los empleados del segmento, empresa por empresa y por bloques (sin CC)"""
+        if not self.email_service:
+            QMessageBox.warning(
+                self, "Error",
+                "Email no configurado.\nClick en '⚙️ Configurar Email' primero"
+            )
+            return
+        
+        template = self.message_template.toPlainText()
+        if not template.strip():
+            QMessageBox.warning(self, "Error", "Escribe un template primero")
+            return
+        # La audiencia se cuenta en segundo plano; sigue en confirm_segment_send
+        segment = self.message_segment
+        self.loader.request(
+            "segment_audience",
+            lambda: (segment, template, SegmentRepository.count_by_company(segment))
+        )
+    
+    def confirm_segment_send(self, segment, template: str, audience):
+        """Confirma el envío al segmento ya contado y lo ejecuta en segundo plano"""
+        if segment is not self.message_segment:
+            return
+        total = sum(count for _, count in audience)
+        if not total:
+            QMessageBox.warning(self, "Error", "El segmento no tiene empleados")
+            return
+        
+        respuesta = QMessageBox.question(
+            self, "Confirmar envío",
+            f"¿Enviar emails a {total} empleados de {len(audience)} empresas?\n\n"
+            f"{segment.describe()}\n\n"
+            "Cada empleado recibe solo su mensaje (sin CC)."
+        )
+        if respuesta != QMessageBox.StandardButton.Yes or self.loader.is_loading("send_segment"):
+            return
+        
+        # El envío SMTP corre fuera del hilo de la interfaz (resultado en on_data_loaded)
+        from services.delivery import send_to_segment
+        service, attachments = self.email_service, list(self.message_attachments)
+        self.loader.request(
+            "send_segment",
+            lambda: send_to_segment(service, template, segment, attachments=attachments)
+        )
+    
+    def schedule_campaign(self):
+        """Programa el envío del template al segmento (o a la empresa del combo)"""
+        template = self.message_template.toPlainText()
+        if not template.strip():
+            QMessageBox.warning(self, "Error", "Escribe un template primero")
+            return
+        
+        from models.segment import Segment
+        segment = self.message_segment
+        if segment is None:
+            company_id = self.msg_company_combo.currentData()
+            if not company_id:
+                QMessageBox.warning(self, "Error", "Selecciona una empresa o un segmento")
+                return
+            segment = Segment(company_ids=[company_id])
+        
+        dialog = ScheduleDialog(segment.describe(), self)
+        if dialog.exec() != 1 or dialog.result is None:
+            return
+        
+        from models.campaign import Campaign, to_due_at
+        name, subject, when = dialog.result
+        campaign = Campaign(
+            name=name, template=template, segment=segment,
+            due_at=to_due_at(when), subject=subject or None,
+            attachments=[a.path for a in self.message_attachments]
+        )
+        self.scheduler.schedule(campaign)
+        # La audiencia de hoy se cuenta en segundo plano (aviso en on_data_loaded)
+        self.loader.request("campaign_scheduled", lambda: (campaign, SegmentRepository.count(segment)))
+    
+    def show_campaign_scheduled(self, campaign, count: int):
+        """Confirma una campaña programada con el tamaño actual de su audiencia"""
+        note = "" if self.email_service else (
+            "\n\n⚠️ Email no configurado: la campaña sale cuando se configure en esta sesión"
+        )
+        QMessageBox.information(
+            self, "⏰ Campaña programada",
+            f"'{campaign.name}' se enviará el {campaign.local_due_at()} "
+            f"({count} empleados hoy, sin CC){note}"
+        )
+    
+    def show_campaigns(self):
+        """Muestra las campañas programadas y su resultado"""
+        CampaignsDialog(self).exec()
+    
+    def show_delivery_stats(self):
+        """Muestra los totales de envíos por período, empresa y campaña"""
+        DeliveryStatsDialog(self).exec()
+    
     def __del__(self):
         """Limpia recursos"""
         if self.email_service:
             self.email_service.disconnect()
     
+    def show_query_log(self):
+        """Muestra las consultas SQL registradas por acción y las lentas"""
+        QueryLogDialog(self).exec()
+    
     def show_variables_help(self):
         """Muestra ayuda sobre variables disponibles"""
+        from services.message_service import MessageService
         help_text = MessageService.get_variables_help()
         QMessageBox.information(self, "Variables Disponibles", help_text)
@@ -0,0 +1,496 @@
+"""
+Modelos Qt (model/view) respaldados por los repositorios
+Cargan filas por páginas (keyset) a medida que la vista las necesita
+"""
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from config.tracing import traced
+from db.events import ChangeEvent, DELETED
+from db.repository import CompanyRepository, EmployeeRepository
+
+# Rol con el ID de la entidad de cada fila
+ID_ROLE = Qt.ItemDataRole.UserRole
+# Rol con el objeto completo (Company / Employee) de cada fila
+OBJECT_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+class RowTableModel(QAbstractTableModel):
+    """
+    Modelo de tabla sobre una lista de objetos (una fila por objeto)
+    
+    Las subclases definen COLUMNS (encabezado, atributo). Las celdas se
+    calculan en data() solo para las filas visibles.
+    """
+    
+    COLUMNS: List[Tuple[str, str]] = []
+    # Entidad del bus de cambios que representa cada fila
+    ENTITY = ""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: List[Any] = []
+    
+    def apply_change(self, event: ChangeEvent):
+        """Actualiza las filas afectadas por un evento del bus de cambios"""
+        pass
+    
+    def row_object(self, row: int) -> Optional[Any]:
+        """Retorna el objeto de la fila indicada"""
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+    
+    # ----- API de QAbstractTableModel -----
+    
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+    
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.COLUMNS)
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        obj = self._rows[index.row()]
+        
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            value = getattr(obj, self.COLUMNS[index.column()][1])
+            return "" if value is None else str(value)
+        if role == ID_ROLE:
+            return obj.id
+        if role == OBJECT_ROLE:
+            return obj
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section][0]
+        return super().headerData(section, orientation, role)
+
+
+class PagedTableModel(RowTableModel):
+    """
+    Modelo de tabla que trae filas del repositorio bajo demanda
+    
+    El orden (sort) y los filtros se resuelven en SQL: cambiarlos recarga
+    la primera página. Las subclases implementan fetch_page(query, after),
+    que solo debe usar sus argumentos porque puede ejecutarse fuera del
+    hilo de la UI cuando el modelo recibe un DataLoader. Con DataLoader
+    todas las lecturas (primera página, páginas siguientes y filas
+    cambiadas) van al pool, con las claves load_key, load_key + ":more"
+    y load_key + ":patch".
+    """
+    
+    PAGE_SIZE = 200
+    DEFAULT_SORT = "id"
+    # Con más IDs en un evento conviene recargar la primera página
+    # (no debe superar PAGE_SIZE: las filas se releen en una sola página)
+    PATCH_LIMIT = 200
+    
+    def __init__(self, parent=None, loader=None, load_key: str = ""):
+        super().__init__(parent)
+        self._has_more = False
+        self.sort_key = self.DEFAULT_SORT
+        self.descending = False
+        self.filters: Dict[str, str] = {}
+        self._loader = loader
+        self._load_key = load_key
+        # IDs cambiados que todavía no se releyeron (los pedidos de una clave se combinan)
+        self._changed_ids: set = set()
+        if loader is not None:
+            loader.loaded.connect(self._on_loaded)
+    
+    def query(self) -> dict:
+        """Parámetros actuales de la consulta (copia inmutable para otros hilos)"""
+        return {
+            "sort": self.sort_key,
+            "descending": self.descending,
+            "filters": dict(self.filters),
+        }
+    
+    def fetch_page(self, query: dict, after: Optional[tuple], ids=None) -> List[Any]:
+        """
+        Lee la página siguiente a la clave `after` (None para la primera)
+        Con `ids` lee solo esas filas, si cumplen la consulta
+        """
+        raise NotImplementedError
+    
+    def after_key(self, obj) -> tuple:
+        """Clave (valor de orden, id) de una fila para pedir la página siguiente"""
+        value = getattr(obj, self.sort_key)
+        return ("" if value is None else value, obj.id)
+    
+    def reload(self):
+        """Descarta las filas cargadas y lee la primera página"""
+        if self._loader is not None:
+            self._loader.request(self._load_key, self.fetch_page, self.query(), None)
+            return
+        self.set_rows(self.fetch_page(self.query(), None))
+    
+    def _on_loaded(self, key: str, result):
+        if key == self._load_key:
+            self.set_rows(result)
+        elif key == self._load_key + ":patch":
+            query, ids, rows = result
+            self._changed_ids.difference_update(ids)
+            # Con otra consulta ya se pidió la primera página, posterior al cambio
+            if query == self.query():
+                self._patch(set(ids), rows)
+        elif key == self._load_key + ":more":
+            query, after, page = result
+            # Descartada si mientras tanto se recargó la primera página
+            if query == self.query() and after == self._last_key():
+                self._append(page)
+    
+    @traced(category="ui")
+    def set_rows(self, rows: List[Any]):
+        """Reemplaza el contenido por una primera página ya leída"""
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._has_more = len(self._rows) >= self.PAGE_SIZE
+        self.endResetModel()
+    
+    def clear(self):
+        """Vacía el modelo sin consultar el repositorio"""
+        self.beginResetModel()
+        self._rows = []
+        self._has_more = False
+        self.endResetModel()
+    
+    def set_filters(self, filters: Dict[str, str]):
+        """Aplica filtros {columna: texto contenido} y recarga"""
+        self.filters = {column: text for column, text in filters.items() if text}
+        self.reload()
+    
+    # ----- Actualización por filas -----
+    
+    def apply_change(self, event: ChangeEvent):
+        if event.entity != self.ENTITY:
+            return
+        if len(event.ids) > self.PATCH_LIMIT:
+            self.reload()
+            return
+        
+        ids = set(event.ids)
+        if event.action == DELETED:
+            self._remove_ids(ids)
+            return
+        
+        # Releer solo esas filas con el orden y los filtros actuales
+        if self._loader is None:
+            self._patch(ids, self.fetch_page(self.query(), None, ids))
+            return
+        if self._loader.is_loading(self._load_key):
+            # La primera página en curso puede ser anterior al cambio: se vuelve a pedir
+            self.reload()
+            return
+        self._changed_ids.update(ids)
+        if len(self._changed_ids) > self.PATCH_LIMIT:
+            self._changed_ids.clear()
+            self.reload()
+            return
+        query, pending = self.query(), list(self._changed_ids)
+        self._loader.request(
+            self._load_key + ":patch", lambda: (query, pending, self.fetch_page(query, None, pending))
+        )
+    
+    def _patch(self, ids: set, rows: List[Any]):
+        """Aplica las filas releídas; las que ya no cumplen la consulta se quitan"""
+        self._remove_ids(ids - {obj.id for obj in rows})
+        for obj in rows:
+            self._place(obj)
+    
+    def _remove_ids(self, ids):
+        for row in range(len(self._rows) - 1, -1, -1):
+            if self._rows[row].id in ids:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._rows[row]
+                self.endRemoveRows()
+    
+    def _precedes(self, a: tuple, b: tuple) -> bool:
+        """Indica si la clave a va antes que b en el orden actual"""
+        return a > b if self.descending else a < b
+    
+    def _place(self, obj):
+        """Reemplaza o inserta una fila en su posición, si cae en lo ya cargado"""
+        key = self.after_key(obj)
+        row = next((i for i, r in enumerate(self._rows) if r.id == obj.id), -1)
+        
+        if row >= 0:
+            before_ok = row == 0 or self._precedes(self.after_key(self._rows[row - 1]), key)
+            after_ok = (row == len(self._rows) - 1
+                        or self._precedes(key, self.after_key(self._rows[row + 1])))
+            if before_ok and after_ok:
+                self._rows[row] = obj
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+                return
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._rows[row]
+            self.endRemoveRows()
+        
+        # Búsqueda binaria de la posición
+        lo, hi = 0, len(self._rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._precedes(self.after_key(self._rows[mid]), key):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(self._rows) and self._has_more:
+            return  # Llegará con la próxima página
+        
+        self.beginInsertRows(QModelIndex(), lo, lo)
+        self._rows.insert(lo, obj)
+        self.endInsertRows()
+    
+    # ----- Orden y carga incremental -----
+    
+    def sort(self, column: int, order=Qt.SortOrder.AscendingOrder):
+        sort_key = self.COLUMNS[column][1]
+        descending = order == Qt.SortOrder.DescendingOrder
+        if (sort_key, descending) == (self.sort_key, self.descending):
+            return
+        self.sort_key = sort_key
+        self.descending = descending
+        self.reload()
+    
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        if parent.isValid() or not self._has_more:
+            return False
+        # Mientras se recarga la primera página no se agregan páginas viejas
+        return self._loader is None or not (
+            self._loader.is_loading(self._load_key) or self._loader.is_loading(self._load_key + ":more")
+        )
+    
+    @traced(category="ui")
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        
+        after = self._last_key()
+        if self._loader is not None:
+            query = self.query()
+            self._loader.request(
+                self._load_key + ":more", lambda: (query, after, self.fetch_page(query, after))
+            )
+            return
+        self._append(self.fetch_page(self.query(), after))
+    
+    def _last_key(self) -> Optional[tuple]:
+        return self.after_key(self._rows[-1]) if self._rows else None
+    
+    def _append(self, page: List[Any]):
+        """Agrega una página siguiente ya leída"""
+        self._has_more = len(page) >= self.PAGE_SIZE
+        if not page:
+            return
+        
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        self._rows.extend(page)
+        self.endInsertRows()
+
+
+COMPANY_COLUMNS = [
+    ("ID", "id"),
+    ("Nombre", "name"),
+    ("Email", "email"),
+    ("Teléfono", "phone"),
+    ("Dirección", "address"),
+]
+
+# Columna con el nombre de la empresa (la que muestran combos y completer)
+COMPANY_NAME_COLUMN = 1
+
+
+class CompanyListModel(RowTableModel):
+    """
+    Lista completa de empresas compartida por la tabla y los combos
+    
+    Las filas se mantienen ordenadas por nombre sin distinguir mayúsculas,
+    con un índice paralelo de claves para ubicar filas por búsqueda
+    binaria. Los cambios se aplican fila por fila (insertar, mover,
+    eliminar), así las vistas conservan su selección. Con DataLoader la
+    lista y las empresas cambiadas se leen en el pool (claves load_key y
+    load_key + ":patch").
+    """
+    
+    COLUMNS = COMPANY_COLUMNS
+    ENTITY = "company"
+    
+    def __init__(self, parent=None, loader=None, load_key: str = ""):
+        super().__init__(parent)
+        self._keys: List[Tuple[str, int]] = []
+        self._key_by_id: Dict[int, Tuple[str, int]] = {}
+        self._loader = loader
+        self._load_key = load_key
+        self._changed_ids: set = set()
+        if loader is not None:
+            loader.loaded.connect(self._on_loaded)
+    
+    def reload(self):
+        """Lee todas las empresas"""
+        if self._loader is not None:
+            self._loader.request(self._load_key, CompanyRepository.read_all)
+            return
+        self.set_companies(CompanyRepository.read_all())
+    
+    def _on_loaded(self, key: str, result):
+        if key == self._load_key:
+            self.set_companies(result)
+        elif key == self._load_key + ":patch":
+            ids, companies = result
+            self._changed_ids.difference_update(ids)
+            self._patch(ids, companies)
+    
+    @staticmethod
+    def _key(company) -> Tuple[str, int]:
+        return (company.name.lower(), company.id)
+    
+    @traced(category="ui")
+    def set_companies(self, companies: List[Any]):
+        """Reemplaza todas las empresas"""
+        self.beginResetModel()
+        self._rows = sorted(companies, key=self._key)
+        self._keys = [self._key(c) for c in self._rows]
+        self._key_by_id = {c.id: k for c, k in zip(self._rows, self._keys)}
+        self.endResetModel()
+    
+    def row_of(self, company_id: int) -> int:
+        """Fila de una empresa por ID, o -1 si no está"""
+        key = self._key_by_id.get(company_id)
+        if key is None:
+            return -1
+        return bisect_left(self._keys, key)
+    
+    def company(self, company_id: Optional[int]):
+        """Empresa ya cargada por ID, o None si no está"""
+        row = self.row_of(company_id) if company_id else -1
+        return self._rows[row] if row >= 0 else None
+    
+    def upsert(self, company):
+        """Agrega o actualiza una empresa en su posición ordenada"""
+        old_row = self.row_of(company.id)
+        key = self._key(company)
+        
+        if old_row < 0:
+            row = bisect_left(self._keys, key)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._rows.insert(row, company)
+            self._keys.insert(row, key)
+            self._key_by_id[company.id] = key
+            self.endInsertRows()
+            return
+        
+        # Posición nueva calculada sin la fila actual
+        del self._keys[old_row]
+        row = bisect_left(self._keys, key)
+        self._keys.insert(old_row, self._key_by_id[company.id])
+        
+        if row != old_row:
+            # Qt espera el destino en coordenadas previas al movimiento
+            destination = row if row < old_row else row + 1
+            self.beginMoveRows(QModelIndex(), old_row, old_row, QModelIndex(), destination)
+            del self._rows[old_row]
+            del self._keys[old_row]
+            self._rows.insert(row, company)
+            self._keys.insert(row, key)
+            self._key_by_id[company.id] = key
+            self.endMoveRows()
+        else:
+            self._rows[row] = company
+            self._keys[row] = key
+            self._key_by_id[company.id] = key
+        
+        self.dataChanged.emit(
+            self.index(row, 0), self.index(row, len(self.COLUMNS) - 1)
+        )
+    
+    def apply_change(self, event: ChangeEvent):
+        if event.entity != self.ENTITY:
+            return
+        if event.action == DELETED:
+            for company_id in event.ids:
+                self.remove(company_id)
+            return
+        
+        if self._loader is None:
+            self._patch(event.ids, CompanyRepository.read_many(event.ids))
+            return
+        if self._loader.is_loading(self._load_key):
+            # La lista en curso puede ser anterior al cambio: se vuelve a pedir
+            self.reload()
+            return
+        self._changed_ids.update(event.ids)
+        ids = list(self._changed_ids)
+        self._loader.request(self._load_key + ":patch", lambda: (ids, CompanyRepository.read_many(ids)))
+    
+    def _patch(self, ids, companies: List[Any]):
+        """Aplica las empresas releídas; las que ya no existen se quitan"""
+        for company_id in set(ids) - {c.id for c in companies}:
+            self.remove(company_id)
+        for company in companies:
+            self.upsert(company)
+    
+    def remove(self, company_id: int):
+        """Quita una empresa por ID"""
+        row = self.row_of(company_id)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        del self._keys[row]
+        del self._key_by_id[company_id]
+        self.endRemoveRows()
+
+
+class CompanyTableModel(PagedTableModel):
+    """Empresas paginadas, ordenadas y filtradas en SQL"""
+    
+    COLUMNS = COMPANY_COLUMNS
+    ENTITY = "company"
+    DEFAULT_SORT = "name"
+    
+    def fetch_page(self, query, after, ids=None):
+        return CompanyRepository.read_page(after, self.PAGE_SIZE, ids=ids, **query)
+
+
+class EmployeeTableModel(PagedTableModel):
+    """Empleados de una empresa, paginados, ordenados y filtrados en SQL"""
+    
+    COLUMNS = [
+        ("ID", "id"),
+        ("Nombre", "first_name"),
+        ("Apellido", "last_name"),
+        ("Email", "email"),
+        ("Teléfono", "phone"),
+        ("Posición", "position"),
+    ]
+    ENTITY = "employee"
+    DEFAULT_SORT = "first_name"
+    
+    def __init__(self, parent=None, loader=None, load_key: str = ""):
+        super().__init__(parent, loader, load_key)
+        self.company_id: Optional[int] = None
+    
+    def set_company(self, company_id: int):
+        """Cambia la empresa mostrada y recarga desde la primera página"""
+        self.company_id = company_id
+        self.reload()
+    
+    def query(self) -> dict:
+        query = super().query()
+        query["company_id"] = self.company_id
+        return query
+    
+    def fetch_page(self, query, after, ids=None):
+        query = dict(query)
+        company_id = query.pop("company_id")
+        if company_id is None:
+            return []
+        return EmployeeRepository.read_page_by_company(
+            company_id, after, self.PAGE_SIZE, ids=ids, **query
+        )
@@ -0,0 +1,63 @@
+"""
+Reporte de tiempos de arranque
+Mide el tiempo hasta el primer pintado de la ventana y el costo de los imports
+"""
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from PyQt6.QtCore import QEvent, QObject, QTimer
+from PyQt6.QtWidgets import QApplication
+
+
+def import_times(module: str, top: int = 15) -> List[Tuple[str, int]]:
+    """
+    Mide los imports de un módulo con `python -X importtime` en un proceso nuevo
+    
+    Returns:
+        Lista de (módulo, microsegundos acumulados), de mayor a menor
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    
+    times = []
+    for line in result.stderr.splitlines():
+        # Formato: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        times.append((parts[2].rstrip(), int(parts[1])))
+    
+    times.sort(key=lambda item: item[1], reverse=True)
+    return times[:top]
+
+
+class StartupReport(QObject):
+    """Imprime el reporte de arranque al primer pintado de la ventana y cierra la app"""
+    
+    def __init__(self, window, started_at: float, module: str = "ui.main_window"):
+        super().__init__(window)
+        self.started_at = started_at
+        self.module = module
+        self.first_paint_ms = None
+        window.installEventFilter(self)
+    
+    def eventFilter(self, obj, event):
+        if self.first_paint_ms is None and event.type() == QEvent.Type.Paint:
+            self.first_paint_ms = (time.perf_counter() - self.started_at) * 1000
+            obj.removeEventFilter(self)
+            # Terminar de pintar antes de medir los imports en otro proceso
+            QTimer.singleShot(0, self.report)
+        return False
+    
+    def report(self):
+        print(f"Tiempo hasta el primer pintado: {self.first_paint_ms:.1f} ms")
+        print(f"\nImports de {self.module} (acumulado, -X importtime):")
+        for name, micros in import_times(self.module):
+            print(f"  {micros / 1000:8.1f} ms  {name}")
+        QApplication.quit()
@@ -0,0 +1,138 @@
+"""
+Detector de bloqueos del bucle de eventos de Qt
+Un QTimer del hilo de la interfaz marca latidos; un hilo aparte los vigila
+y, si el bucle deja de latir más que el umbral, guarda la pila de Python
+del hilo de la interfaz (sys._current_frames) en un log rotativo.
+"""
+import logging
+import sys
+import threading
+import time
+import traceback
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Optional, Union
+
+from PyQt6.QtCore import QObject, QTimer
+
+from config.metrics import UI_STALL_SECONDS
+
+# Tamaño de cada archivo del log y cantidad de archivos anteriores que se conservan
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+
+# Archivos que no son la acción bloqueante (se saltean al buscarla en la pila)
+_INFRASTRUCTURE = ("ui/watchdog.py", "config/tracing.py", "config/metrics.py", "db/query_log.py")
+
+
+def _action(frame) -> str:
+    """Función más externa de la interfaz en la pila (ej: MainWindow.send_emails)"""
+    action = "?"
+    while frame is not None:
+        filename = frame.f_code.co_filename.replace("\\", "/")
+        if "/ui/" in filename and not filename.endswith(_INFRASTRUCTURE):
+            action = frame.f_code.co_qualname
+        frame = frame.f_back
+    return action
+
+
+class StallWatchdog(QObject):
+    """
+    Registra los bloqueos del bucle de eventos mayores a threshold_ms
+    
+    Por cada bloqueo se escribe una entrada al detectarlo (con la pila del
+    hilo de la interfaz en ese momento) y otra al terminar (con la duración
+    total). Si el hilo de la interfaz retiene el GIL (código C que no lo
+    libera) la pila se toma cuando lo suelta.
+    """
+    
+    def __init__(
+        self,
+        parent: QObject,
+        log_path: Union[str, Path],
+        threshold_ms: float = 500.0,
+        interval_ms: int = 50
+    ):
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000
+        self.interval_ms = interval_ms
+        self.log_path = Path(log_path)
+        self.stalls = 0
+        
+        self._logger = logging.getLogger("app.stalls")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._beat)
+        self._last_beat = time.monotonic()
+        self._gui_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Arranca los latidos y el hilo que los vigila (llamar desde el hilo de la interfaz)"""
+        if self._thread is not None:
+            return
+        if not self._logger.handlers:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                self.log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8", delay=True
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self._logger.addHandler(handler)
+        
+        self._gui_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._timer.start()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="ui-stall-watchdog", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Detiene la vigilancia y cierra el log"""
+        self._timer.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for handler in list(self._logger.handlers):
+            self._logger.removeHandler(handler)
+            handler.close()
+    
+    def _beat(self):
+        self._last_beat = time.monotonic()
+    
+    def _watch(self):
+        # Se revisa varias veces por umbral para detectar el bloqueo poco después de superarlo
+        check = min(self.threshold / 4, self.interval_ms / 1000)
+        stalled_since: Optional[float] = None
+        while not self._stop.wait(check):
+            beat = self._last_beat
+            if stalled_since is not None:
+                if beat != stalled_since:
+                    # Volvió a latir: el bloqueo duró hasta el primer latido (menos un intervalo normal)
+                    duration = max(beat - stalled_since - self.interval_ms / 1000, 0.0)
+                    UI_STALL_SECONDS.observe(duration)
+                    self._logger.info("Bloqueo terminado: %.0f ms", duration * 1000)
+                    stalled_since = None
+                continue
+            
+            blocked = time.monotonic() - beat
+            if blocked >= self.threshold:
+                stalled_since = beat
+                self.stalls += 1
+                self._report(blocked)
+    
+    def _report(self, blocked: float):
+        frame = sys._current_frames().get(self._gui_thread)
+        if frame is None:
+            return
+        try:
+            stack = "".join(traceback.format_stack(frame))
+            self._logger.info(
+                "Bucle de eventos bloqueado hace %.0f ms en %s\n%s", blocked * 1000, _action(frame), stack
+            )
+        finally:
+            del frame
@@ -1,8 +1,11 @@
 """
 Componentes reutilizables PyQt6
 """
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QDialog
-from PyQt6.QtCore import Qt
+from typing import Dict, List, Tuple
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QDialog, QComboBox
+)
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QFont
 
 
@@ -105,3 +108,56 @@ class StyledButton(QPushButton):
                     background-color: #2E7D32;
                 }
             """)
+
+
+class FilterBar(QWidget):
+    """Filtros por columna (texto contenido) para una tabla"""
+    
+    filters_changed = pyqtSignal(dict)
+    
+    def __init__(self, columns: List[Tuple[str, str]], delay_ms: int = 300):
+        super().__init__()
+        self._filters: Dict[str, str] = {}
+        
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.column_combo = QComboBox()
+        for header, column in columns:
+            self.column_combo.addItem(header, column)
+        self.column_combo.currentIndexChanged.connect(self.on_column_changed)
+        
+        self.text_input = QLineEdit()
+        self.text_input.setPlaceholderText("Texto a buscar...")
+        self.text_input.textEdited.connect(self.on_text_edited)
+        
+        button_clear = QPushButton("Limpiar")
+        button_clear.clicked.connect(self.clear)
+        
+        layout.addWidget(QLabel("Filtrar por:"))
+        layout.addWidget(self.column_combo)
+        layout.addWidget(self.text_input)
+        layout.addWidget(button_clear)
+        self.setLayout(layout)
+        
+        # Espera a que se deje de escribir antes de consultar
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self.emit_filters)
+    
+    def on_column_changed(self):
+        self.text_input.setText(self._filters.get(self.column_combo.currentData(), ""))
+    
+    def on_text_edited(self, text: str):
+        self._filters[self.column_combo.currentData()] = text.strip()
+        self._timer.start()
+    
+    def clear(self):
+        self._filters = {}
+        self.text_input.clear()
+        self.emit_filters()
+    
+    def emit_filters(self):
+        self._timer.stop()
+        self.filters_changed.emit({k: v for k, v in self._filters.items() if v})